@@ -0,0 +1,240 @@
+import json
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, InvalidStateError, TimeoutError as FutureTimeoutError
+from typing import Dict, List, Optional
+import dashscope
+import config
+from http_pool import connection_pool
+from metrics import metrics, load_records, percentile
+
+FINISHED = ('SUCCEEDED', 'FAILED', 'CANCELED', 'UNKNOWN')
+
+def transcript_text(result: dict) -> Optional[str]:
+    """从转录结果JSON中提取文本"""
+    if result.get('transcripts'):
+        transcript = result['transcripts'][0]
+        if 'text' in transcript:
+            return transcript['text']
+        if transcript.get('sentences'):
+            return ' '.join(sentence.get('text', '') for sentence in transcript['sentences'])
+    return result.get('text')
+
+def _resolve(future: Future, result: dict = None, error: Exception = None):
+    """设置Future的结果，等待方已超时放弃时忽略"""
+    try:
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+    except InvalidStateError:
+        pass
+
+def _fail(futures: List[Future], error: Exception):
+    """让一组录音的Future都以error失败"""
+    for future in futures:
+        _resolve(future, error=error)
+
+class TranscriptionTask:
+    """一个已提交的识别任务，可能包含多段录音"""
+    
+    def __init__(self, task_id: str, files: Dict[str, Future]):
+        self.task_id = task_id
+        self.files = files
+        self.submitted = time.monotonic()
+        self.next_poll = self.submitted
+        self.polls = 0
+        self.overdue = 0
+
+class TranscriptionTaskManager:
+    """
+    通过DashScope异步接口提交录音识别任务，并在一个后台线程中统一查询结果。
+    - 空闲时立即提交；已有任务在识别时，等待batch_window收集更多录音，合并为一个多文件任务
+    - 按最近任务的实际耗时安排查询：预计完成前不查询，之后从min_interval开始逐步放宽到max_interval
+    - 多文件任务完成后按file_url把结果分发给各自的录音
+    - 等待方都已超时放弃，或提交后超过task_timeout仍未完成（例如查询一直失败）的任务不再查询
+    """
+    
+    def __init__(self, model: str = None, batch_window: float = None, max_batch: int = None,
+                 min_interval: float = None, max_interval: float = None, task_timeout: float = None):
+        self.model = model or config.DASHSCOPE_ASR_MODEL
+        self.batch_window = config.ASR_BATCH_WINDOW if batch_window is None else batch_window
+        self.max_batch = max_batch or config.ASR_BATCH_MAX
+        self.min_interval = min_interval or config.ASR_POLL_MIN_INTERVAL
+        self.max_interval = max_interval or config.ASR_POLL_MAX_INTERVAL
+        self.task_timeout = task_timeout or config.ASR_TIMEOUT
+        self.durations = deque(maxlen=50)  # 最近任务从提交到完成的耗时（秒）
+        self._waiting: List[tuple] = []  # [(file_url, future, 加入时间)]
+        self._tasks: Dict[str, TranscriptionTask] = {}
+        self._condition = threading.Condition()
+        self._thread = None
+        self._seed_durations()
+    
+    def transcribe(self, file_url: str, timeout: float = None) -> Optional[str]:
+        """提交一段录音并等待识别文本，失败时抛出异常"""
+        future = self.submit(file_url)
+        try:
+            with metrics.span('asr_wait', model=self.model):
+                result = future.result(timeout or config.ASR_TIMEOUT)
+        except FutureTimeoutError:
+            # Python 3.11之前concurrent.futures.TimeoutError不是内置的TimeoutError
+            future.cancel()
+            raise
+        url = result.get('transcription_url')
+        if not url:
+            raise Exception("识别结果中没有transcription_url")
+        with metrics.span('asr_fetch'):
+            return transcript_text(json.loads(connection_pool.get(url).decode('utf8')))
+    
+    def submit(self, file_url: str) -> Future:
+        """加入待提交列表，返回的Future完成时得到该录音的识别结果（results中的一项）"""
+        future = Future()
+        with self._condition:
+            self._waiting.append((file_url, future, time.monotonic()))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="asr-tasks", daemon=True)
+                self._thread.start()
+            self._condition.notify_all()
+        return future
+    
+    def expected_duration(self) -> Optional[float]:
+        """最近任务耗时的中位数，样本太少时返回None"""
+        if len(self.durations) < 3:
+            return None
+        return percentile(list(self.durations), 50)
+    
+    def next_delay(self, task: TranscriptionTask, now: float) -> float:
+        """距离下一次查询的时间"""
+        expected = self.expected_duration()
+        elapsed = now - task.submitted
+        if expected and elapsed < expected * 0.9:
+            return max(self.min_interval, expected * 0.9 - elapsed)
+        task.overdue += 1
+        return min(self.max_interval, self.min_interval * 1.5 ** (task.overdue - 1))
+    
+    def _run(self):
+        while True:
+            with self._condition:
+                while True:
+                    now = time.monotonic()
+                    batch = self._take_batch(now)
+                    due = [task for task in self._tasks.values() if task.next_poll <= now]
+                    if batch or due:
+                        break
+                    wake = [task.next_poll for task in self._tasks.values()]
+                    if self._waiting:
+                        wake.append(self._waiting[0][2] + self.batch_window)
+                    self._condition.wait(max(0.0, min(wake) - now) if wake else None)
+            
+            # 这是唯一的查询线程，某个任务出错只让相关的录音失败，不能让线程退出
+            if batch:
+                try:
+                    self._submit_batch(batch)
+                except Exception as e:
+                    print(f"提交识别任务出错: {e}")
+                    _fail([future for _, future, _ in batch], e)
+            for task in due:
+                try:
+                    self._poll(task)
+                except Exception as e:
+                    print(f"处理识别任务 {task.task_id} 出错: {e}")
+                    with self._condition:
+                        self._tasks.pop(task.task_id, None)
+                    _fail([future for waiters in task.files.values() for future in waiters], e)
+    
+    def _take_batch(self, now: float) -> List[tuple]:
+        """取出可以提交的录音：空闲、已凑满或等待超过batch_window时提交"""
+        self._waiting = [item for item in self._waiting if not item[1].cancelled()]
+        if not self._waiting:
+            return []
+        if self._tasks and len(self._waiting) < self.max_batch and now - self._waiting[0][2] < self.batch_window:
+            return []
+        batch, self._waiting = self._waiting[:self.max_batch], self._waiting[self.max_batch:]
+        return batch
+    
+    def _submit_batch(self, batch: List[tuple]):
+        files = {}
+        for url, future, _ in batch:
+            files.setdefault(url, []).append(future)
+        try:
+            with metrics.span('asr_submit', model=self.model, files=len(files)):
+                response = dashscope.audio.asr.Transcription.async_call(
+                    model=self.model,
+                    file_urls=list(files),
+                    language_hints=['zh', 'en']
+                )
+            if response.status_code != 200:
+                raise Exception(f"DashScope API错误: {response.message}")
+            task_id = response.output.task_id
+            if not task_id:
+                raise Exception("DashScope没有返回task_id")
+        except Exception as e:
+            _fail([future for futures in files.values() for future in futures], e)
+            return
+        
+        task = TranscriptionTask(task_id, files)
+        print(f"提交识别任务 {task.task_id}（{len(files)} 段录音）")
+        task.next_poll = task.submitted + self.next_delay(task, task.submitted)
+        with self._condition:
+            self._tasks[task.task_id] = task
+    
+    def _poll(self, task: TranscriptionTask):
+        futures = [future for waiters in task.files.values() for future in waiters]
+        duration = time.monotonic() - task.submitted
+        expired = duration > self.task_timeout
+        if expired or all(future.done() for future in futures):
+            with self._condition:
+                self._tasks.pop(task.task_id, None)
+            print(f"不再查询识别任务 {task.task_id}（{'超时' if expired else '等待方已放弃'}）")
+            for future in futures:
+                _resolve(future, error=FutureTimeoutError(f"识别任务 {task.task_id} 超过 {self.task_timeout:g} 秒未完成"))
+            metrics.record('asr_task', duration * 1000, task_id=task.task_id, files=len(task.files), polls=task.polls,
+                           status='ABANDONED')
+            return
+        
+        task.polls += 1
+        try:
+            response = dashscope.audio.asr.Transcription.fetch(task=task.task_id)
+            status = response.output.get('task_status') if response.status_code == 200 and response.output else None
+        except Exception as e:
+            print(f"查询识别任务 {task.task_id} 失败: {e}")
+            status = None
+        
+        if status not in FINISHED:
+            now = time.monotonic()
+            task.next_poll = now + self.next_delay(task, now)
+            return
+        
+        with self._condition:
+            self._tasks.pop(task.task_id, None)
+        duration = time.monotonic() - task.submitted
+        if status == 'SUCCEEDED':
+            self.durations.append(duration)
+        metrics.record('asr_task', duration * 1000, task_id=task.task_id, files=len(task.files), polls=task.polls,
+                       status=status)
+        self._dispatch(task, status, response.output.get('results') or [])
+    
+    def _dispatch(self, task: TranscriptionTask, status: str, results: List[dict]):
+        """按file_url把多文件任务的结果分发给各自的录音"""
+        by_url = {result.get('file_url'): result for result in results}
+        for index, (url, futures) in enumerate(task.files.items()):
+            result = by_url.get(url)
+            if result is None and len(results) == len(task.files):
+                result = results[index]
+            for future in futures:
+                if result and result.get('subtask_status', 'SUCCEEDED') == 'SUCCEEDED':
+                    _resolve(future, result)
+                else:
+                    message = (result or {}).get('message') or f"任务状态 {status}"
+                    _resolve(future, error=Exception(f"识别失败: {message}"))
+    
+    def _seed_durations(self):
+        """用历史任务耗时初始化查询节奏"""
+        try:
+            records = load_records(config.METRICS_FILE)
+        except Exception:
+            return
+        for record in records[-200:]:
+            if record.get('stage') == 'asr_task' and record.get('status') == 'SUCCEEDED':
+                self.durations.append(record['ms'] / 1000)
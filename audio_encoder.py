@@ -0,0 +1,64 @@
+import io
+import struct
+import wave
+from typing import NamedTuple, Tuple
+import numpy as np
+
+class EncodedAudio(NamedTuple):
+    """编码后的音频数据及对应的文件扩展名和Content-Type"""
+    data: bytes
+    extension: str
+    content_type: str
+
+# 格式 -> (soundfile格式, soundfile子类型, 扩展名, Content-Type)
+ENCODINGS = {
+    'flac': ('FLAC', 'PCM_16', 'flac', 'audio/flac'),
+    'opus': ('OGG', 'OPUS', 'ogg', 'audio/ogg'),
+}
+
+def wav_header(data_size: int, sample_rate: int, channels: int, sample_width: int = 2) -> bytes:
+    """生成PCM WAV文件头"""
+    byte_rate = sample_rate * channels * sample_width
+    return struct.pack(
+        '<4sI4s4sIHHIIHH4sI',
+        b'RIFF', 36 + data_size, b'WAVE',
+        b'fmt ', 16, 1, channels, sample_rate, byte_rate, channels * sample_width, sample_width * 8,
+        b'data', data_size
+    )
+
+def pcm_to_wav(samples: np.ndarray, sample_rate: int, channels: int) -> bytes:
+    """把int16 PCM数组编码为WAV字节数据"""
+    payload = memoryview(np.ascontiguousarray(samples)).cast('B')
+    return b''.join([wav_header(payload.nbytes, sample_rate, channels), payload])
+
+def wav_to_pcm(wav_data: bytes) -> Tuple[np.ndarray, int, int]:
+    """解析WAV字节数据，返回(int16采样数组, 采样率, 声道数)"""
+    with wave.open(io.BytesIO(wav_data), 'rb') as wav_file:
+        channels = wav_file.getnchannels()
+        sample_rate = wav_file.getframerate()
+        if wav_file.getsampwidth() != 2:
+            raise ValueError(f"只支持16-bit PCM WAV，当前为 {wav_file.getsampwidth() * 8}-bit")
+        frames = wav_file.readframes(wav_file.getnframes())
+    return np.frombuffer(frames, dtype=np.int16).reshape(-1, channels), sample_rate, channels
+
+def encode_audio(wav_data: bytes, audio_format: str = 'wav') -> EncodedAudio:
+    """把WAV编码为指定格式(wav/flac/opus)，编码失败或不支持时回退到WAV"""
+    audio_format = (audio_format or 'wav').lower()
+    if audio_format not in ENCODINGS:
+        if audio_format != 'wav':
+            print(f"不支持的音频格式 {audio_format}，使用WAV")
+        return EncodedAudio(wav_data, 'wav', 'audio/wav')
+    
+    sf_format, subtype, extension, content_type = ENCODINGS[audio_format]
+    try:
+        import soundfile as sf
+        
+        samples, sample_rate, _ = wav_to_pcm(wav_data)
+        buffer = io.BytesIO()
+        sf.write(buffer, samples, sample_rate, format=sf_format, subtype=subtype)
+        return EncodedAudio(buffer.getvalue(), extension, content_type)
+    except ImportError:
+        print("未安装soundfile，使用WAV上传")
+    except Exception as e:
+        print(f"{audio_format}编码失败，使用WAV上传: {e}")
+    return EncodedAudio(wav_data, 'wav', 'audio/wav')
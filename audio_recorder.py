@@ -1,81 +1,322 @@
-import sounddevice as sd
 import numpy as np
+import functools
 import threading
 import time
-from typing import Optional, Callable
-import io
-import wave
+import tempfile
+from typing import List, Optional, Callable
+from metrics import metrics
+from vad import trim_silence
+from audio_encoder import pcm_to_wav
+
+def open_input_stream(**kwargs):
+    """打开麦克风输入流（参数同sounddevice.InputStream），sounddevice按需导入"""
+    import sounddevice as sd
+    
+    return sd.InputStream(**kwargs)
+
+class AudioBuffer:
+    """预分配的int16录音缓冲区，录音过长时转存到内存映射文件"""
+    
+    def __init__(self, sample_rate=16000, channels=1, initial_seconds=60, spill_seconds=600, max_seconds=3600):
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.spill_frames = int(spill_seconds * sample_rate)
+        self.max_frames = int(max_seconds * sample_rate)
+        self.frames = 0
+        self._data = np.empty((int(initial_seconds * sample_rate), channels), dtype=np.int16)
+        self._spill_file = None
+        self._overflow_warned = False
+    
+    def append(self, block: np.ndarray):
+        """写入一段音频帧（在录音回调中调用）"""
+        count = len(block)
+        if self.frames + count > len(self._data):
+            self._grow(self.frames + count)
+            count = min(count, len(self._data) - self.frames)
+            if count <= 0:
+                return
+        self._data[self.frames:self.frames + count] = block[:count]
+        self.frames += count
+    
+    def _grow(self, required: int):
+        """扩容：倍增内存缓冲区，超过阈值后改用内存映射文件"""
+        capacity = max(required, len(self._data) * 2)
+        if capacity <= self.spill_frames:
+            data = np.empty((capacity, self.channels), dtype=np.int16)
+        elif self._spill_file is None:
+            # 稀疏文件按最大长度一次性分配，后续不再扩容
+            self._spill_file = tempfile.TemporaryFile(prefix='context_switcher_audio_')
+            data = np.memmap(self._spill_file, dtype=np.int16, mode='w+',
+                             shape=(self.max_frames, self.channels))
+        else:
+            if not self._overflow_warned:
+                print(f"录音超过最大长度 {self.max_frames // self.sample_rate} 秒，后续音频将被丢弃")
+                self._overflow_warned = True
+            return
+        data[:self.frames] = self._data[:self.frames]
+        self._data = data
+    
+    def samples(self) -> np.ndarray:
+        """返回已录制音频的numpy视图（不复制）"""
+        return self._data[:self.frames]
+    
+    def view(self) -> memoryview:
+        """返回已录制PCM数据的零拷贝memoryview"""
+        return memoryview(self.samples()).cast('B')
+    
+    def duration(self) -> float:
+        """已录制时长（秒）"""
+        return self.frames / self.sample_rate
+    
+    def wav_bytes(self) -> bytes:
+        """生成WAV格式的字节数据，只做一次PCM拷贝"""
+        return pcm_to_wav(self.samples(), self.sample_rate, self.channels)
+    
+    def close(self):
+        """释放内存映射文件"""
+        if self._spill_file is not None:
+            self._data = np.empty((0, self.channels), dtype=np.int16)
+            self._spill_file.close()
+            self._spill_file = None
+
+class PreRollBuffer:
+    """固定长度的环形缓冲区，保存输入流最近一段时间的音频，按下快捷键时从按键时刻取出"""
+    
+    def __init__(self, sample_rate=16000, channels=1, seconds=2.0):
+        self.sample_rate = sample_rate
+        self._data = np.zeros((int(seconds * sample_rate), channels), dtype=np.int16)
+        self.written = 0  # 累计写入的帧数
+        self.end_time = None  # 最后一帧的时刻(time.monotonic)
+    
+    def append(self, block: np.ndarray, end_time: float):
+        """写入一段音频帧（在录音回调中调用），end_time是这段音频结束的时刻"""
+        size = len(self._data)
+        block = block[-size:]
+        start = self.written % size
+        first = min(len(block), size - start)
+        self._data[start:start + first] = block[:first]
+        self._data[:len(block) - first] = block[first:]
+        self.written += len(block)
+        self.end_time = end_time
+    
+    def since(self, timestamp: float) -> np.ndarray:
+        """返回timestamp之后的音频（复制），最多为整个缓冲区"""
+        if self.end_time is None:
+            return self._data[:0]
+        available = min(self.written, len(self._data))
+        count = max(0, min(available, int(round((self.end_time - timestamp) * self.sample_rate))))
+        indexes = np.arange(self.written - count, self.written) % len(self._data)
+        return self._data[indexes]
 
 class AudioRecorder:
-    def __init__(self, sample_rate=16000, channels=1):
+    def __init__(self, sample_rate=16000, channels=1, buffer_seconds=60, spill_seconds=600, max_seconds=3600,
+                 vad_enabled=False, vad_max_pause_ms=0, preroll_ms=200, stream_factory: Callable = None):
         self.sample_rate = sample_rate
         self.channels = channels
+        self.buffer_seconds = buffer_seconds
+        self.spill_seconds = spill_seconds
+        self.max_seconds = max_seconds
+        self.vad_enabled = vad_enabled
+        self.vad_max_pause_ms = vad_max_pause_ms
+        # 最近一次录音是否因为没有检测到语音而被丢弃
+        self.silence_rejected = False
         self.recording = False
-        self.audio_data = []
+        self.audio_buffer: Optional[AudioBuffer] = None
         self.recording_thread = None
         self.on_recording_start: Optional[Callable] = None
         self.on_recording_stop: Optional[Callable] = None
+        # 每收到一段音频帧时回调（用于实时识别），参数为PCM字节
+        self.on_audio_frame: Optional[Callable[[bytes], None]] = None
+        # 预先打开的输入流：持续把最近的音频写入环形缓冲区，按下快捷键时从按键时刻开始录音
+        self.preroll_ms = preroll_ms
+        self.stream_factory = stream_factory or open_input_stream
+        self._stream = None
+        self._preroll: Optional[PreRollBuffer] = None
+        # 录音回调与开始/停止之间的状态切换
+        self._lock = threading.Lock()
+        self._capturing = False
+        self._generation = 0  # 每次录音加一，忽略上一次录音尚未关闭的输入流的回调
+        self._pressed_at = None
+        self._first_sample_at = None
+        self._stop_at = None
+        self._stopped = threading.Event()
+        self._close_stream = threading.Event()
+        self._outgoing: List[bytes] = []  # 待转发给on_audio_frame的音频，由回调在锁外按顺序转发
         
-    def start_recording(self):
-        """开始录音"""
+    @property
+    def armed(self) -> bool:
+        return self._stream is not None
+    
+    def arm(self) -> bool:
+        """预先打开麦克风输入流，之后每次录音不用再等待设备打开；失败时回退为每次录音时打开"""
+        if self._stream is not None:
+            return True
+        try:
+            self._preroll = PreRollBuffer(self.sample_rate, self.channels, self.preroll_ms / 1000 + 2)
+            stream = self.stream_factory(callback=self._callback, channels=self.channels,
+                                         samplerate=self.sample_rate, dtype=np.int16)
+            stream.start()
+            self._stream = stream
+            print("麦克风输入流已预先打开")
+            return True
+        except Exception as e:
+            print(f"预先打开麦克风失败，改为每次录音时打开: {e}")
+            self._preroll = None
+            return False
+    
+    def disarm(self):
+        """关闭预先打开的输入流"""
+        stream, self._stream = self._stream, None
+        if stream is not None:
+            stream.stop()
+            stream.close()
+        self._preroll = None
+        
+    def start_recording(self, pressed_at: float = None):
+        """开始录音，pressed_at是按下快捷键的时刻(time.monotonic)，预先打开输入流时从该时刻开始录音"""
         if self.recording:
             return
             
+        pressed_at = pressed_at or time.monotonic()
         self.recording = True
-        self.audio_data = []
+        if self.audio_buffer:
+            self.audio_buffer.close()
+        self.audio_buffer = AudioBuffer(
+            sample_rate=self.sample_rate,
+            channels=self.channels,
+            initial_seconds=self.buffer_seconds,
+            spill_seconds=self.spill_seconds,
+            max_seconds=self.max_seconds
+        )
         
         if self.on_recording_start:
             self.on_recording_start()
             
-        self.recording_thread = threading.Thread(target=self._record_audio)
+        with self._lock:
+            self._generation += 1
+            self._stop_at = None
+            self._stopped.clear()
+            self._pressed_at = pressed_at
+            self._first_sample_at = None
+            self._outgoing = []
+            self._capturing = True
+            if self._stream is not None:
+                # 环形缓冲区里已经有按键前后的音频，之后的音频由回调直接写入
+                self._append(self._preroll.since(pressed_at - self.preroll_ms / 1000), self._preroll.end_time)
+                return
+        
+        self._close_stream = threading.Event()
+        self.recording_thread = threading.Thread(target=self._record_audio,
+                                                 args=(self._generation, self._close_stream), daemon=True)
         self.recording_thread.start()
         
-    def stop_recording(self):
-        """停止录音"""
+    def stop_recording(self, released_at: float = None):
+        """停止录音，released_at是松开快捷键的时刻，录音截止到该时刻"""
         if not self.recording:
             return None
             
+        released_at = released_at or time.monotonic()
         self.recording = False
+        with self._lock:
+            self._stop_at = released_at
         
-        if self.recording_thread:
-            self.recording_thread.join()
+        # 等待回调收到覆盖松开时刻的那一段音频，设备异常没有回调时最多等待0.2秒
+        self._stopped.wait(0.2)
+        with self._lock:
+            self._capturing = False
+        # 每次录音时打开的输入流在后台关闭，不占用停止录音的时间
+        self._close_stream.set()
+        if self._first_sample_at is not None:
+            metrics.record('capture_gap', max(0.0, self._first_sample_at - self._pressed_at) * 1000,
+                           prearmed=self.armed)
             
         if self.on_recording_stop:
             self.on_recording_stop()
             
         return self._save_audio()
     
-    def _record_audio(self):
-        """录音线程"""
-        def callback(indata, frames, time, status):
-            if self.recording:
-                self.audio_data.append(indata.copy())
+    def _record_audio(self, generation: int, close_event: threading.Event):
+        """录音线程：打开输入流，直到停止录音"""
+        try:
+            with self.stream_factory(callback=functools.partial(self._callback, generation=generation),
+                                     channels=self.channels,
+                                     samplerate=self.sample_rate,
+                                     dtype=np.int16):
+                close_event.wait()
+        except Exception as e:
+            print(f"打开麦克风失败: {e}")
+    
+    def _callback(self, indata, frames, time_info, status, generation=None):
+        """
+        输入流回调：写入环形缓冲区，录音时同时写入录音缓冲区，收到松开时刻之后的音频时结束录音。
+        转发给实时识别在释放_lock之后进行，较慢的on_audio_frame不会阻塞开始/停止录音
+        """
+        now = time.monotonic()
+        finished = False
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+            if self._preroll is not None and generation is None:
+                self._preroll.append(indata, now)
+            if not self._capturing:
+                return
+            
+            if self._stop_at is not None and now >= self._stop_at:
+                keep = len(indata) - int(round((now - self._stop_at) * self.sample_rate))
+                self._append(indata[:max(0, keep)], self._stop_at)
+                self._capturing = False
+                finished = True
+            else:
+                self._append(indata, now)
+            outgoing, self._outgoing = self._outgoing, []
         
-        with sd.InputStream(callback=callback,
-                          channels=self.channels,
-                          samplerate=self.sample_rate,
-                          dtype=np.int16):
-            while self.recording:
-                time.sleep(0.1)
+        # 只有回调线程转发，开始录音时取出的预录音频也在这里转发，顺序不会乱
+        on_audio_frame = self.on_audio_frame
+        if on_audio_frame:
+            for frame in outgoing:
+                on_audio_frame(frame)
+        # 最后一段转发完才通知停止录音，之后结束实时识别时不会漏掉末尾的音频
+        if finished:
+            self._stopped.set()
+    
+    def _append(self, block: np.ndarray, end_time: float):
+        """写入录音缓冲区，并放入待转发给实时识别的队列（持有_lock时调用），end_time是这段音频结束的时刻"""
+        if not len(block):
+            return
+        if self._first_sample_at is None:
+            self._first_sample_at = end_time - len(block) / self.sample_rate
+        self.audio_buffer.append(block)
+        if self.on_audio_frame:
+            self._outgoing.append(block.tobytes())
     
     def _save_audio(self) -> Optional[bytes]:
         """保存录音为WAV格式的字节数据"""
-        if not self.audio_data:
+        self.silence_rejected = False
+        if not self.audio_buffer or not self.audio_buffer.frames:
             return None
             
-        # 合并所有音频数据
-        audio_array = np.concatenate(self.audio_data, axis=0)
+        if not self.vad_enabled:
+            with metrics.span('encode', audio_seconds=round(self.audio_buffer.duration(), 2)):
+                return self.audio_buffer.wav_bytes()
         
-        # 创建WAV文件
-        buffer = io.BytesIO()
-        with wave.open(buffer, 'wb') as wav_file:
-            wav_file.setnchannels(self.channels)
-            wav_file.setsampwidth(2)  # 16-bit
-            wav_file.setframerate(self.sample_rate)
-            wav_file.writeframes(audio_array.tobytes())
+        # 去掉首尾静音并压缩长停顿，纯静音的录音直接丢弃，不产生任何网络请求
+        with metrics.span('vad', audio_seconds=round(self.audio_buffer.duration(), 2)) as span:
+            samples = trim_silence(self.audio_buffer.samples(), self.sample_rate, self.vad_max_pause_ms)
+            span['speech_seconds'] = round(len(samples) / self.sample_rate, 2) if samples is not None else 0
+        if samples is None:
+            print("未检测到语音，丢弃本次录音")
+            self.silence_rejected = True
+            return None
+        
+        with metrics.span('encode', audio_seconds=round(len(samples) / self.sample_rate, 2)):
+            return pcm_to_wav(samples, self.sample_rate, self.channels)
         
-        return buffer.getvalue()
+    def get_audio_view(self) -> Optional[memoryview]:
+        """获取最近一次录音PCM数据的零拷贝视图"""
+        if not self.audio_buffer or not self.audio_buffer.frames:
+            return None
+        return self.audio_buffer.view()
     
     def is_recording(self) -> bool:
         """检查是否正在录音"""
-        return self.recording 
\ No newline at end of file
+        return self.recording
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+语音识别基准测试
+在一组录好的中英文音频上比较本地模型与云端识别的实时率（识别耗时/音频时长）和字错误率。
+每段音频 xxx.wav 旁边放一个 xxx.txt 写参考文本：
+
+    fixtures/asr/
+        meeting_zh.wav
+        meeting_zh.txt
+        standup_mixed.wav
+        standup_mixed.txt
+
+    python benchmark_asr.py                                  # 本地模型 + 已配置密钥的云端引擎
+    python benchmark_asr.py --engines local --threads 1,4,8  # 比较本地模型的线程数
+    python benchmark_asr.py path/to/clips --model medium
+"""
+
+import argparse
+import re
+import sys
+import time
+from pathlib import Path
+from typing import List
+import config
+from audio_encoder import wav_to_pcm
+
+# 计算字错误率时只比较文字和数字，忽略标点、空格和大小写
+NORMALIZE_PATTERN = re.compile(r'[^0-9a-z㐀-鿿豈-﫿]+')
+
+def normalize(text: str) -> str:
+    return NORMALIZE_PATTERN.sub('', (text or '').lower())
+
+def edit_distance(reference: str, hypothesis: str) -> int:
+    """字符级编辑距离"""
+    previous = list(range(len(hypothesis) + 1))
+    for i, ref_char in enumerate(reference, 1):
+        current = [i]
+        for j, hyp_char in enumerate(hypothesis, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ref_char != hyp_char)))
+        previous = current
+    return previous[-1]
+
+def load_fixtures(directory: Path) -> List[dict]:
+    fixtures = []
+    for wav_path in sorted(directory.glob('*.wav')):
+        reference_path = wav_path.with_suffix('.txt')
+        if not reference_path.exists():
+            print(f"跳过 {wav_path.name}: 没有参考文本 {reference_path.name}")
+            continue
+        audio = wav_path.read_bytes()
+        samples, sample_rate, _ = wav_to_pcm(audio)
+        fixtures.append({
+            'name': wav_path.name,
+            'audio': audio,
+            'seconds': len(samples) / sample_rate,
+            'reference': reference_path.read_text(encoding='utf-8').strip(),
+        })
+    return fixtures
+
+def run_engine(transcribe, fixtures: List[dict], verbose: bool) -> dict:
+    """返回实时率、字错误率和失败数，识别失败的音频按全部字都错计算"""
+    elapsed = seconds = errors = chars = failures = 0
+    for fixture in fixtures:
+        started = time.perf_counter()
+        try:
+            text = transcribe(fixture['audio'])
+        except Exception as e:
+            print(f"    {fixture['name']} 识别失败: {e}")
+            text = None
+        elapsed += time.perf_counter() - started
+        seconds += fixture['seconds']
+        reference = normalize(fixture['reference'])
+        if text is None:
+            failures += 1
+            errors += len(reference)
+        else:
+            errors += edit_distance(reference, normalize(text))
+        chars += len(reference)
+        if verbose:
+            print(f"    {fixture['name']}: {text}")
+    return {'rtf': elapsed / seconds, 'cer': errors / max(chars, 1), 'failures': failures}
+
+def main():
+    parser = argparse.ArgumentParser(description="语音识别基准测试")
+    parser.add_argument('fixtures', nargs='?', default='fixtures/asr', help="音频和参考文本所在目录")
+    parser.add_argument('--engines', help="逗号分隔的引擎：local, dashscope, openai；默认本地模型加上已配置密钥的云端引擎")
+    parser.add_argument('--model', help="本地模型，默认使用LOCAL_ASR_MODEL")
+    parser.add_argument('--threads', default=str(config.LOCAL_ASR_THREADS), help="本地模型的线程数，逗号分隔时逐个比较")
+    parser.add_argument('-v', '--verbose', action='store_true', help="输出每段音频的识别结果")
+    args = parser.parse_args()
+    
+    fixtures = load_fixtures(Path(args.fixtures))
+    if not fixtures:
+        print(f"❌ {args.fixtures} 中没有可用的音频（需要 xxx.wav 和对应的 xxx.txt 参考文本）")
+        return 1
+    
+    engines = [name.strip() for name in args.engines.split(',')] if args.engines else \
+        ['local'] + (['dashscope'] if config.DASHSCOPE_API_KEY else []) + (['openai'] if config.OPENAI_API_KEY else [])
+    from local_asr import LocalWhisper
+    recognizer = None
+    
+    print("🎧 语音识别基准测试")
+    print("=" * 50)
+    total = sum(fixture['seconds'] for fixture in fixtures)
+    print(f"{len(fixtures)} 段音频，共 {total:.1f} 秒\n")
+    
+    rows = []
+    for engine in engines:
+        if engine == 'local':
+            for threads in [int(value) for value in args.threads.split(',')]:
+                local = LocalWhisper(model=args.model, threads=threads, workers=1)
+                started = time.perf_counter()
+                try:
+                    local.load()
+                except Exception as e:
+                    print(f"❌ 本地模型不可用: {e}")
+                    continue
+                load_seconds = time.perf_counter() - started
+                label = f"local/{local.model_name}/{local.compute_type}/{threads or 'auto'}线程"
+                print(f"{label}: 模型加载 {load_seconds:.1f}s（只在启动时加载一次）")
+                rows.append((label, run_engine(local.transcribe, fixtures, args.verbose)))
+        elif engine in ('dashscope', 'openai'):
+            if recognizer is None:
+                from speech_recognition import SpeechRecognizer
+                recognizer = SpeechRecognizer()
+            transcribe = getattr(recognizer, f"_transcribe_with_{engine}")
+            rows.append((engine, run_engine(transcribe, fixtures, args.verbose)))
+        else:
+            print(f"未知引擎: {engine}")
+    
+    if not rows:
+        return 1
+    
+    print(f"\n{'引擎':<36}{'实时率':>8}{'字错误率':>10}{'失败':>6}")
+    for label, result in rows:
+        print(f"{label:<36}{result['rtf']:>8.3f}{result['cer']:>10.1%}{result['failures']:>6}")
+    print("\n实时率 = 识别耗时 / 音频时长（云端引擎包含上传和排队），小于1表示比实时更快")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
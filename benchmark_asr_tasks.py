@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+识别任务吞吐基准测试
+使用test_asr_tasks.py中的假DashScope任务接口，比较改动前每段录音单独 async_call + Transcription.wait
+与任务管理器（按实际耗时查询、积压时合并为多文件任务）的单段延迟、查询次数和积压/离线重放时的吞吐（不需要API密钥）
+
+    python benchmark_asr_tasks.py [--task-seconds 2] [--jitter 1] [--recordings 20]
+"""
+
+import argparse
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+import dashscope
+import config
+from test_asr_tasks import FakeDashScope, start_fake_dashscope
+
+def old_transcribe(url: str) -> str:
+    """改动前的识别方式：每段录音一个任务，由SDK按固定节奏查询"""
+    from asr_tasks import transcript_text
+    from http_pool import connection_pool
+    import json
+    
+    task = dashscope.audio.asr.Transcription.async_call(model=config.DASHSCOPE_ASR_MODEL, file_urls=[url],
+                                                        language_hints=['zh', 'en'])
+    response = dashscope.audio.asr.Transcription.wait(task=task.output.task_id)
+    result = response.output['results'][0]
+    return transcript_text(json.loads(connection_pool.get(result['transcription_url']).decode('utf8')))
+
+def run_sequential(transcribe, fake: FakeDashScope, count: int) -> dict:
+    """一段一段地识别（正常使用时的情况）"""
+    fake.reset()
+    timings = []
+    for i in range(count):
+        url = f"https://bucket/audio/seq-{i}.wav"
+        started = time.perf_counter()
+        if transcribe(url) != fake.text_for(url):
+            raise Exception(f"识别结果不正确: {url}")
+        timings.append(time.perf_counter() - started)
+    return {'latency': statistics.mean(timings), 'lag': statistics.mean(fake.lags), 'polls': fake.polls,
+            'tasks': fake.submits}
+
+def run_backlog(transcribe, fake: FakeDashScope, count: int, workers: int) -> dict:
+    """一次积压了count段录音，由workers个识别线程处理"""
+    fake.reset()
+    urls = [f"https://bucket/audio/backlog-{i}.wav" for i in range(count)]
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        texts = list(pool.map(transcribe, urls))
+    elapsed = time.perf_counter() - started
+    if texts != [fake.text_for(url) for url in urls]:
+        raise Exception("积压录音的识别结果不正确")
+    return {'elapsed': elapsed, 'polls': fake.polls, 'tasks': fake.submits}
+
+def main():
+    parser = argparse.ArgumentParser(description="识别任务吞吐基准测试")
+    parser.add_argument('--task-seconds', type=float, default=2, help="模拟的任务基础耗时")
+    parser.add_argument('--jitter', type=float, default=1, help="任务耗时的随机波动（秒）")
+    parser.add_argument('--recordings', type=int, default=20, help="积压的录音数")
+    parser.add_argument('--sequential', type=int, default=8, help="逐段识别的录音数")
+    args = parser.parse_args()
+    
+    from metrics import isolate_metrics
+    isolate_metrics()
+    from asr_tasks import TranscriptionTaskManager
+    
+    fake = FakeDashScope(base_seconds=args.task_seconds, file_seconds=0.05, jitter=args.jitter)
+    start_fake_dashscope(fake)
+    manager = TranscriptionTaskManager(batch_window=0.3, max_batch=config.ASR_BATCH_MAX)
+    
+    print("📮 识别任务吞吐基准测试")
+    print("=" * 50)
+    print(f"任务耗时 {args.task_seconds:g}~{args.task_seconds + args.jitter:g}s，每段录音另加50ms\n")
+    
+    print(f"逐段识别 {args.sequential} 段录音")
+    print(f"{'方式':<14}{'平均延迟(s)':>12}{'完成后才查到(ms)':>18}{'查询次数':>10}")
+    sequential = {}
+    for name, transcribe in (("SDK wait", old_transcribe), ("任务管理器", manager.transcribe)):
+        result = sequential[name] = run_sequential(transcribe, fake, args.sequential)
+        print(f"{name:<14}{result['latency']:>12.2f}{result['lag'] * 1000:>18.0f}{result['polls']:>10}")
+    
+    print(f"\n积压 {args.recordings} 段录音")
+    print(f"{'方式':<24}{'总耗时(s)':>10}{'任务数':>8}{'查询次数':>10}")
+    backlog = {}
+    for name, transcribe, workers in (
+        ("SDK wait，2个识别线程", old_transcribe, config.ASR_WORKERS),
+        ("任务管理器，2个识别线程", manager.transcribe, config.ASR_WORKERS),
+        ("任务管理器，离线重放", manager.transcribe, args.recordings),
+    ):
+        result = backlog[name] = run_backlog(transcribe, fake, args.recordings, workers)
+        print(f"{name:<24}{result['elapsed']:>10.1f}{result['tasks']:>8}{result['polls']:>10}")
+    
+    checks = [
+        (sequential["任务管理器"]['lag'] < sequential["SDK wait"]['lag'], "完成后更快查询到结果"),
+        (sequential["任务管理器"]['polls'] <= sequential["SDK wait"]['polls'], "查询次数不多于SDK wait"),
+        (backlog["任务管理器，离线重放"]['tasks'] < args.recordings, "离线重放时合并为多文件任务"),
+    ]
+    print()
+    for ok, message in checks:
+        print(f"{'✅' if ok else '❌'} {message}")
+    return 0 if all(ok for ok, _ in checks) else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
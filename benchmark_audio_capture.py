@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+录音启动/停止延迟基准测试
+用假的麦克风输入流（打开设备有延迟，按固定块大小实时送出音频）比较：
+改动前每次按键打开输入流并每0.1秒轮询停止、每次打开输入流但用事件停止、预先打开输入流三种方式的
+按键到第一个采样的间隔（负数表示包含了按键前的音频）、松开按键后录音末尾缺失的音频和松开到拿到WAV数据的耗时（不需要麦克风）
+
+    python benchmark_audio_capture.py [--open-ms 150] [--block 512] [--presses 8]
+"""
+
+import argparse
+import statistics
+import sys
+import threading
+import time
+import numpy as np
+from audio_encoder import wav_to_pcm
+from audio_recorder import AudioBuffer, AudioRecorder
+
+SAMPLE_RATE = 16000
+EPOCH = time.monotonic()
+
+class FakeInputStream:
+    """
+    假的sounddevice.InputStream：构造时模拟打开设备的耗时，启动后按块实时回调。
+    第i个采样（从EPOCH算起）的值为 i % 32768，从录到的采样值可以推算出它对应的时刻
+    """
+    
+    def __init__(self, callback, channels=1, samplerate=SAMPLE_RATE, dtype=None, open_seconds=0.15,
+                 close_seconds=0.03, blocksize=512):
+        time.sleep(open_seconds)
+        self.callback = callback
+        self.channels = channels
+        self.samplerate = samplerate
+        self.close_seconds = close_seconds
+        self.blocksize = blocksize
+        self._running = threading.Event()
+        self._thread = None
+    
+    def start(self):
+        self._running.set()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+    
+    def stop(self):
+        self._running.clear()
+        if self._thread:
+            self._thread.join()
+    
+    def close(self):
+        time.sleep(self.close_seconds)
+    
+    def __enter__(self):
+        self.start()
+        return self
+    
+    def __exit__(self, *exc):
+        self.stop()
+        self.close()
+    
+    def _run(self):
+        position = int((time.monotonic() - EPOCH) * self.samplerate)
+        while self._running.is_set():
+            next_position = position + self.blocksize
+            delay = EPOCH + next_position / self.samplerate - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            block = (np.arange(position, next_position) % 32768).astype(np.int16)
+            self.callback(np.repeat(block.reshape(-1, 1), self.channels, axis=1), self.blocksize, None, None)
+            position = next_position
+
+def sample_time(value: int, near: float) -> float:
+    """采样值对应的时刻：取与near最接近的那一个周期"""
+    guess = (near - EPOCH) * SAMPLE_RATE
+    index = value + 32768 * round((guess - value) / 32768)
+    return EPOCH + index / SAMPLE_RATE
+
+class LegacyRecorder:
+    """改动前的录音方式：每次按键新开线程和输入流，录音线程每0.1秒检查一次是否停止"""
+    
+    def __init__(self, stream_factory):
+        self.stream_factory = stream_factory
+        self.recording = False
+    
+    def start_recording(self, pressed_at=None):
+        self.recording = True
+        self.audio_buffer = AudioBuffer(sample_rate=SAMPLE_RATE)
+        self.recording_thread = threading.Thread(target=self._record_audio)
+        self.recording_thread.start()
+    
+    def stop_recording(self, released_at=None):
+        self.recording = False
+        self.recording_thread.join()
+        return self.audio_buffer.wav_bytes()
+    
+    def _record_audio(self):
+        buffer = self.audio_buffer
+        
+        def callback(indata, frames, time_info, status):
+            if self.recording:
+                buffer.append(indata)
+        
+        with self.stream_factory(callback=callback, channels=1, samplerate=SAMPLE_RATE, dtype=np.int16):
+            while self.recording:
+                time.sleep(0.1)
+
+def measure(recorder, presses: int, hold: float) -> dict:
+    """多次按下/松开，返回各项延迟的中位数(ms)"""
+    starts, tails, stops = [], [], []
+    continuous = True
+    for _ in range(presses):
+        time.sleep(0.3 + np.random.uniform(0, 0.05))
+        pressed_at = time.monotonic()
+        recorder.start_recording(pressed_at)
+        time.sleep(hold)
+        released_at = time.monotonic()
+        wav_data = recorder.stop_recording(released_at)
+        stops.append((time.monotonic() - released_at) * 1000)
+        
+        samples = wav_to_pcm(wav_data)[0][:, 0].astype(np.int64)
+        starts.append((sample_time(samples[0], pressed_at) - pressed_at) * 1000)
+        tails.append((released_at - sample_time(samples[-1], released_at)) * 1000)
+        continuous = continuous and bool(np.all(np.diff(samples) % 32768 == 1))
+    return {'start': statistics.median(starts), 'tail': statistics.median(tails), 'stop': statistics.median(stops),
+            'continuous': continuous}
+
+def main():
+    parser = argparse.ArgumentParser(description="录音启动/停止延迟基准测试")
+    parser.add_argument('--open-ms', type=float, default=150, help="模拟的打开设备耗时（毫秒）")
+    parser.add_argument('--block', type=int, default=512, help="输入流每次回调的帧数")
+    parser.add_argument('--presses', type=int, default=8, help="每种方式按键的次数")
+    parser.add_argument('--hold', type=float, default=0.8, help="每次按住的秒数")
+    args = parser.parse_args()
+    
+    from metrics import isolate_metrics
+    isolate_metrics()
+    
+    def stream_factory(**kwargs):
+        return FakeInputStream(open_seconds=args.open_ms / 1000, blocksize=args.block, **kwargs)
+    
+    print("🎙️ 录音启动/停止延迟基准测试")
+    print("=" * 50)
+    print(f"打开设备 {args.open_ms:g}ms，每块 {args.block} 帧（{args.block / SAMPLE_RATE * 1000:.0f}ms），"
+          f"每种方式按键 {args.presses} 次（中位数）\n")
+    
+    prearmed = AudioRecorder(sample_rate=SAMPLE_RATE, preroll_ms=200, stream_factory=stream_factory)
+    prearmed.arm()
+    recorders = [
+        ("改动前（每次打开+轮询）", LegacyRecorder(stream_factory)),
+        ("每次打开+事件停止", AudioRecorder(sample_rate=SAMPLE_RATE, stream_factory=stream_factory)),
+        ("预先打开+200ms预录", prearmed),
+    ]
+    print(f"{'方式':<22}{'按键到首个采样(ms)':>18}{'末尾缺失(ms)':>14}{'松开到WAV(ms)':>15}{'连续':>6}")
+    results = {}
+    for name, recorder in recorders:
+        result = results[name] = measure(recorder, args.presses, args.hold)
+        print(f"{name:<22}{result['start']:>18.0f}{result['tail']:>14.0f}{result['stop']:>15.1f}"
+              f"{'✅' if result['continuous'] else '❌':>5}")
+    prearmed.disarm()
+    
+    legacy, cold, warm = (results[name] for name, _ in recorders)
+    checks = [
+        (warm['start'] <= 0, "预先打开时录音从按键时刻（含预录部分）开始"),
+        (cold['stop'] < legacy['stop'] and warm['stop'] < legacy['stop'], "用事件停止比轮询更快拿到录音"),
+        (warm['tail'] < args.block / SAMPLE_RATE * 1000 + 5, "录音截止到松开按键的时刻"),
+        (all(result['continuous'] for result in results.values()), "录音中没有丢失或重复的采样"),
+    ]
+    print()
+    for ok, message in checks:
+        print(f"{'✅' if ok else '❌'} {message}")
+    return 0 if all(ok for ok, _ in checks) else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+长录音分段识别基准测试
+用test_chunked_asr.py中的合成音频和假识别后端（耗时 = 固定开销 + 音频时长 × 实时率），
+比较不同长度的录音整段识别与分段并发识别的耗时（不需要API密钥）
+
+    python benchmark_chunked_asr.py [--minutes 1,5,10] [--rtf 0.02] [--overhead 1] [--workers 4]
+"""
+
+import argparse
+import contextlib
+import io
+import sys
+import time
+import config
+from test_chunked_asr import FakeBackend, recording
+
+class SlowBackend(FakeBackend):
+    """每次调用另加固定开销（上传、排队）"""
+    
+    def __init__(self, rtf: float, overhead: float):
+        super().__init__(seconds_per_audio_second=rtf)
+        self.overhead = overhead
+    
+    def __call__(self, wav_data: bytes):
+        time.sleep(self.overhead)
+        return super().__call__(wav_data)
+
+def main():
+    parser = argparse.ArgumentParser(description="长录音分段识别基准测试")
+    parser.add_argument('--minutes', default="1,5,10", help="逗号分隔的录音长度（分钟）")
+    parser.add_argument('--rtf', type=float, default=0.02, help="模拟的实时率（识别耗时/音频时长）")
+    parser.add_argument('--overhead', type=float, default=1.0, help="每次识别请求的固定开销（秒）")
+    parser.add_argument('--workers', type=int, default=config.ASR_CHUNK_WORKERS, help="并发识别的片段数")
+    args = parser.parse_args()
+    
+    from metrics import isolate_metrics
+    isolate_metrics()
+    from chunked_asr import ChunkedTranscriber
+    
+    print("✂️ 长录音分段识别基准测试")
+    print("=" * 50)
+    print(f"模拟识别耗时 = {args.overhead:g}s + 音频时长 × {args.rtf:g}，片段 {config.ASR_CHUNK_SECONDS:g}s，"
+          f"{args.workers} 个并发\n")
+    print(f"{'录音(分钟)':<12}{'片段数':>8}{'整段(s)':>10}{'分段(s)':>10}{'加速':>8}{'结果一致':>10}")
+    
+    success = True
+    for minutes in [float(value) for value in args.minutes.split(',')]:
+        # 每句约4.8秒
+        wav_data, words = recording(sentences=int(minutes * 60 / 4.8))
+        backend = SlowBackend(args.rtf, args.overhead)
+        chunker = ChunkedTranscriber(backend, workers=args.workers)
+        chunks = len(chunker.split(wav_data))
+        
+        started = time.perf_counter()
+        _, single = backend(wav_data)
+        single_seconds = time.perf_counter() - started
+        
+        started = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = chunker.transcribe(wav_data)
+        chunked_seconds = time.perf_counter() - started
+        
+        same = result.text.split() == single.split() == words
+        success = success and same
+        print(f"{minutes:<12g}{chunks:>8}{single_seconds:>10.2f}{chunked_seconds:>10.2f}"
+              f"{single_seconds / chunked_seconds:>7.1f}x{'✅' if same else '❌':>9}")
+    return 0 if success else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
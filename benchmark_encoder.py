@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+音频编码基准测试
+比较WAV/FLAC/Opus的编码耗时、上传体积，以及按给定上行带宽估算的"编码+上传"总耗时
+
+    python benchmark_encoder.py [clip.wav ...] [--uplink-kbps 1000]
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+import numpy as np
+from audio_encoder import encode_audio, pcm_to_wav
+
+SAMPLE_RATE = 16000
+
+def synthetic_clip(seconds: int, seed: int = 0) -> bytes:
+    """生成类似说话的测试音频：有声段与停顿交替，带底噪"""
+    rng = np.random.default_rng(seed)
+    t = np.arange(SAMPLE_RATE * seconds) / SAMPLE_RATE
+    pitch = 180 + 40 * np.sin(2 * np.pi * 0.5 * t)
+    voiced = np.sin(2 * np.pi * np.cumsum(pitch) / SAMPLE_RATE) + 0.3 * np.sin(4 * np.pi * np.cumsum(pitch) / SAMPLE_RATE)
+    envelope = (np.sin(2 * np.pi * 0.8 * t) > -0.3) * (0.5 + 0.5 * np.abs(np.sin(2 * np.pi * 4 * t)))
+    samples = 4000 * voiced * envelope + rng.normal(0, 60, len(t))
+    return pcm_to_wav(samples.astype(np.int16).reshape(-1, 1), SAMPLE_RATE, 1)
+
+def benchmark(name: str, wav_data: bytes, uplink_kbps: float, repeat: int):
+    """对一段音频测试各编码格式"""
+    seconds = (len(wav_data) - 44) / (SAMPLE_RATE * 2)
+    print(f"\n🎧 {name} ({seconds:.1f}s, WAV {len(wav_data) / 1024:.0f} KB)")
+    print(f"{'格式':<8}{'编码(ms)':>10}{'体积(KB)':>10}{'节省':>8}{'上传(ms)':>10}{'合计(ms)':>10}")
+    
+    for audio_format in ['wav', 'flac', 'opus']:
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            encoded = encode_audio(wav_data, audio_format)
+            timings.append((time.perf_counter() - started) * 1000)
+        encode_ms = sorted(timings)[len(timings) // 2]
+        upload_ms = len(encoded.data) * 8 / uplink_kbps
+        saved = 1 - len(encoded.data) / len(wav_data)
+        label = audio_format if encoded.extension != 'wav' or audio_format == 'wav' else f"{audio_format}*"
+        print(f"{label:<8}{encode_ms:>10.1f}{len(encoded.data) / 1024:>10.0f}{saved:>8.0%}"
+              f"{upload_ms:>10.0f}{encode_ms + upload_ms:>10.0f}")
+
+def main():
+    parser = argparse.ArgumentParser(description="音频编码基准测试")
+    parser.add_argument('clips', nargs='*', help="16kHz 16-bit WAV文件，不指定时使用合成音频")
+    parser.add_argument('--uplink-kbps', type=float, default=1000, help="估算上传耗时用的上行带宽(kbps)")
+    parser.add_argument('--repeat', type=int, default=5, help="每种格式重复编码次数，取中位数")
+    args = parser.parse_args()
+    
+    print("📦 音频编码基准测试")
+    print("=" * 50)
+    print(f"上行带宽: {args.uplink_kbps:.0f} kbps（* 表示编码失败已回退到WAV）")
+    
+    if args.clips:
+        clips = [(Path(path).name, Path(path).read_bytes()) for path in args.clips]
+    else:
+        clips = [(f"合成音频 {seconds}s", synthetic_clip(seconds)) for seconds in (5, 30, 120)]
+    
+    for name, wav_data in clips:
+        benchmark(name, wav_data, args.uplink_kbps, args.repeat)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
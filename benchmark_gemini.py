@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Gemini后端基准测试
+用一个模拟启动耗时的假gemini命令，比较旧的每次调用 `gemini -p 提示词`、命令行从stdin传入提示词、
+以及进程内常驻客户端（模拟网络耗时的假google-genai客户端）三种方式的耗时，并测试超长提示词（不需要API密钥）
+
+    python benchmark_gemini.py [--startup-ms 800] [--network-ms 300] [--runs 5]
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from types import SimpleNamespace
+import config
+from gemini_client import GeminiClient
+
+RESPONSE = "# 上下文切换器\n\n## 项目A\n\n**当前状态**: 开发中\n"
+
+# 假gemini命令：先等待模拟的启动和认证耗时，再读取提示词（-p参数或stdin）并逐行输出
+STUB = """#!{python}
+import sys, time
+time.sleep({startup_ms} / 1000)
+args = sys.argv[1:]
+prompt = args[args.index('-p') + 1] if '-p' in args else sys.stdin.read()
+time.sleep({network_ms} / 1000)
+sys.stdout.write({response!r} + "提示词长度: %d\\n" % len(prompt))
+"""
+
+class FakeModels:
+    """模拟google-genai客户端的models接口，每次请求只有网络耗时"""
+    
+    def __init__(self, network_ms: float):
+        self.network_ms = network_ms
+    
+    def get(self, model):
+        return SimpleNamespace(name=model)
+    
+    def generate_content_stream(self, model, contents, config):
+        time.sleep(self.network_ms / 1000)
+        for line in RESPONSE.splitlines(keepends=True):
+            yield SimpleNamespace(text=line)
+        yield SimpleNamespace(text=f"提示词长度: {len(contents)}\n")
+
+def old_subprocess(command: str, prompt: str) -> str:
+    """改动前的调用方式：每次启动一个进程，提示词放在命令行参数里"""
+    result = subprocess.run([command, '-p', prompt], capture_output=True, text=True, timeout=60)
+    if result.returncode != 0:
+        raise Exception(result.stderr.strip())
+    return result.stdout.strip()
+
+def measure(call, prompt: str, runs: int):
+    """返回(中位耗时ms, 结果或异常)"""
+    timings = []
+    result = None
+    for _ in range(runs):
+        started = time.perf_counter()
+        try:
+            result = call(prompt)
+        except Exception as e:
+            return None, e
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings), result
+
+def main():
+    parser = argparse.ArgumentParser(description="Gemini后端基准测试")
+    parser.add_argument('--startup-ms', type=float, default=800, help="模拟的命令行启动和认证耗时")
+    parser.add_argument('--network-ms', type=float, default=300, help="模拟的模型响应耗时")
+    parser.add_argument('--runs', type=int, default=5, help="每种方式的调用次数")
+    args = parser.parse_args()
+    
+    with tempfile.TemporaryDirectory() as temp_dir:
+        stub = Path(temp_dir) / "gemini"
+        stub.write_text(STUB.format(python=sys.executable, startup_ms=args.startup_ms, network_ms=args.network_ms,
+                                    response=RESPONSE), encoding='utf-8')
+        stub.chmod(0o755)
+        config.GOOGLE_CLOUD_PROJECT = ""
+        
+        cli = GeminiClient(backend="cli", command=str(stub))
+        api = GeminiClient(backend="api", client=SimpleNamespace(models=FakeModels(args.network_ms)))
+        api.warm_up()
+        methods = [
+            ("每次 gemini -p", lambda prompt: old_subprocess(str(stub), prompt)),
+            ("命令行+stdin", cli.generate),
+            ("常驻客户端", api.generate),
+        ]
+        
+        print("♊ Gemini后端基准测试")
+        print("=" * 50)
+        print(f"模拟启动和认证 {args.startup_ms:.0f}ms，模型响应 {args.network_ms:.0f}ms，每种方式 {args.runs} 次\n")
+        print(f"{'方式':<16}{'普通提示词(ms)':>16}{'1MB提示词':>16}")
+        
+        small = "合并测试\n" * 200
+        large = "很长的上下文内容。" * 40000
+        success = True
+        for name, call in methods:
+            cells = []
+            for prompt in (small, large):
+                elapsed, result = measure(call, prompt, args.runs)
+                if elapsed is None:
+                    cells.append(f"失败({type(result).__name__})")
+                elif not result.endswith(f"提示词长度: {len(prompt)}"):
+                    cells.append("结果不正确")
+                    success = False
+                else:
+                    cells.append(f"{elapsed:.0f}")
+            print(f"{name:<16}{cells[0]:>16}{cells[1]:>16}")
+            if name != "每次 gemini -p" and not all(cell.isdigit() for cell in cells):
+                success = False
+        
+        print(f"\n{'✅' if success else '❌'} 新的两种方式都能处理超长提示词（单个命令行参数上限约 {os.sysconf('SC_PAGE_SIZE') * 32 // 1024}KB）")
+    return 0 if success else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
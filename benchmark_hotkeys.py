@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+快捷键匹配微基准测试
+用test_hotkey_manager.py中模拟的按键对象重放一段以普通打字为主、夹杂快捷键的按键序列，
+比较改动前每次按键做字符串处理并逐个检查组合键、与编译后的位掩码匹配的单次按键耗时，
+以及回调较慢时监听线程被阻塞的时间（不需要键盘监听权限）
+
+    python benchmark_hotkeys.py [--events 200000] [--callback-ms 200]
+"""
+
+import argparse
+import random
+import sys
+import time
+from hotkey_manager import HotkeyBinding, HotkeyManager
+from test_hotkey_manager import Key, char
+
+class LegacyHotkeyManager:
+    """改动前的匹配方式：只有一个快捷键，回调在监听线程中同步执行"""
+    
+    def __init__(self, hotkey, on_start_recording, on_stop_recording):
+        self.hotkey = hotkey
+        self.on_start_recording = on_start_recording
+        self.on_stop_recording = on_stop_recording
+        self.pressed_keys = set()
+        self.recording = False
+    
+    def _on_press(self, key):
+        try:
+            if hasattr(key, 'char'):
+                key_name = key.char.lower()
+            else:
+                key_name = str(key).replace('Key.', '').lower()
+            self.pressed_keys.add(key_name)
+            if self._is_target_hotkey_pressed() and not self.recording:
+                self.recording = True
+                if self.on_start_recording:
+                    self.on_start_recording()
+        except Exception as e:
+            print(f"按键处理错误: {e}")
+    
+    def _on_release(self, key):
+        try:
+            if hasattr(key, 'char'):
+                key_name = key.char.lower()
+            else:
+                key_name = str(key).replace('Key.', '').lower()
+            self.pressed_keys.discard(key_name)
+            if not self._is_target_hotkey_pressed() and self.recording:
+                self.recording = False
+                if self.on_stop_recording:
+                    self.on_stop_recording()
+        except Exception as e:
+            print(f"按键释放处理错误: {e}")
+    
+    def _is_target_hotkey_pressed(self) -> bool:
+        return all(key in self.pressed_keys for key in self.hotkey)
+
+class Discard:
+    """代替分发队列，丢弃事件"""
+    
+    def put(self, item):
+        pass
+
+def key_events(count: int, seed: int = 0):
+    """[(是否按下, 按键), ...]：普通打字，偶尔带shift，每200次按键按一次录音快捷键"""
+    rng = random.Random(seed)
+    letters = [char(c) for c in "abcdefghijklmnopqrstuvwxyz ,."]
+    events = []
+    while len(events) < count:
+        if rng.random() < 0.005:
+            chord = [Key.cmd, Key.shift, char('e')]
+        elif rng.random() < 0.05:
+            chord = [Key.shift, char(rng.choice("abcdefg").upper())]
+        else:
+            chord = [rng.choice(letters)]
+        events += [(True, key) for key in chord] + [(False, key) for key in reversed(chord)]
+    return events[:count]
+
+def per_event_ns(manager, events) -> float:
+    on_press, on_release = manager._on_press, manager._on_release
+    started = time.perf_counter()
+    for pressed, key in events:
+        if pressed:
+            on_press(key)
+        else:
+            on_release(key)
+    return (time.perf_counter() - started) / len(events) * 1e9
+
+def main():
+    parser = argparse.ArgumentParser(description="快捷键匹配微基准测试")
+    parser.add_argument('--events', type=int, default=200000, help="重放的按键事件数")
+    parser.add_argument('--callback-ms', type=float, default=200, help="模拟的开始录音回调耗时（毫秒）")
+    args = parser.parse_args()
+    
+    print("⌨️ 快捷键匹配微基准测试")
+    print("=" * 50)
+    events = key_events(args.events)
+    noop = lambda *_: None
+    
+    legacy = LegacyHotkeyManager({'cmd', 'shift', 'e'}, noop, noop)
+    compiled = HotkeyManager([
+        HotkeyBinding('record', "cmd+shift+e", noop, noop),
+        HotkeyBinding('record:a', "cmd+shift+1", noop, noop),
+        HotkeyBinding('record:b', "cmd+shift+2", noop, noop),
+        HotkeyBinding('cancel', "cmd+shift+esc", noop),
+        HotkeyBinding('replay', "ctrl+shift+r", noop),
+    ])
+    # 只测匹配，不执行回调
+    compiled._events = Discard()
+    
+    print(f"{len(events)} 次按键事件（约0.5%是录音快捷键）\n")
+    print(f"{'方式':<28}{'每次按键(ns)':>14}")
+    results = {}
+    for name, manager in (("改动前（1个快捷键）", legacy), ("编译后的位掩码（5个快捷键）", compiled)):
+        per_event_ns(manager, events[:10000])
+        results[name] = min(per_event_ns(manager, events) for _ in range(3))
+        print(f"{name:<28}{results[name]:>14.0f}")
+    
+    # 开始录音的回调较慢时，监听线程被阻塞多久（期间系统按键事件会延迟）
+    slow = lambda *_: time.sleep(args.callback_ms / 1000)
+    legacy = LegacyHotkeyManager({'cmd', 'shift', 'e'}, slow, noop)
+    compiled = HotkeyManager([HotkeyBinding('record', "cmd+shift+e", slow, noop)])
+    blocked = {}
+    for name, manager in (("改动前", legacy), ("分发队列", compiled)):
+        started = time.perf_counter()
+        for key in (Key.cmd, Key.shift, char('e')):
+            manager._on_press(key)
+        blocked[name] = (time.perf_counter() - started) * 1000
+    print(f"\n开始录音回调耗时 {args.callback_ms:g}ms 时监听线程被阻塞: "
+          f"改动前 {blocked['改动前']:.1f}ms，分发队列 {blocked['分发队列']:.3f}ms")
+    
+    legacy_ns, compiled_ns = results.values()
+    checks = [
+        (compiled_ns < legacy_ns, "编译后的匹配每次按键更快（且支持多个快捷键）"),
+        (blocked['分发队列'] < 1, "较慢的回调不阻塞监听线程"),
+    ]
+    print()
+    for ok, message in checks:
+        print(f"{'✅' if ok else '❌'} {message}")
+    return 0 if all(ok for ok, _ in checks) else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
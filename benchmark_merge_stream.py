@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+流式合并基准测试
+启动一个本地的假OpenAI兼容服务（按固定速度逐个token输出），比较流式与非流式合并的首个token耗时和总耗时，
+以及模型返回不可用内容时流式输出能多早中止（不需要API密钥）
+
+    python benchmark_merge_stream.py [--first-token-ms 400] [--token-ms 10] [--tokens 400]
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+from aiohttp import web
+import config
+from fake_server import start_fake_server
+
+GOOD_RESPONSE = "# 上下文切换器\n\n" + "".join(
+    f"## 项目{i}\n\n**更新时间**: 2024-01-05 10:00:00\n**当前状态**: 开发中\n\n**todo列表**:\n- [ ] 任务{i}\n\n"
+    for i in range(40)
+)
+BAD_RESPONSE = "抱歉，我无法确定这段内容属于哪个项目。" * 60
+
+class FakeOpenAI:
+    """按设定的速度输出固定内容的假chat completions服务"""
+    
+    def __init__(self, first_token_ms: float, token_ms: float, tokens: int):
+        self.first_token_ms = first_token_ms
+        self.token_ms = token_ms
+        self.tokens = tokens
+        self.response = GOOD_RESPONSE
+        self.aborted = 0  # 客户端提前断开的次数
+    
+    def chunks(self):
+        size = max(1, len(self.response) // self.tokens)
+        return [self.response[i:i + size] for i in range(0, len(self.response), size)]
+    
+    async def completions(self, request):
+        body = await request.json()
+        await asyncio.sleep(self.first_token_ms / 1000)
+        base = {"id": "fake", "created": int(time.time()), "model": body.get("model", "fake")}
+        
+        if not body.get("stream"):
+            await asyncio.sleep(self.token_ms * len(self.chunks()) / 1000)
+            return web.json_response({**base, "object": "chat.completion", "choices": [{
+                "index": 0, "message": {"role": "assistant", "content": self.response}, "finish_reason": "stop"
+            }]})
+        
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        try:
+            for chunk in self.chunks():
+                data = {**base, "object": "chat.completion.chunk", "choices": [{
+                    "index": 0, "delta": {"content": chunk}, "finish_reason": None
+                }]}
+                await response.write(f"data: {json.dumps(data, ensure_ascii=False)}\n\n".encode())
+                await asyncio.sleep(self.token_ms / 1000)
+            await response.write(b"data: [DONE]\n\n")
+        except (ConnectionResetError, asyncio.CancelledError):
+            # 客户端提前中止
+            self.aborted += 1
+        return response
+
+def run_merge(recognizer, streaming: bool, check=None):
+    """返回(首个token耗时ms, 总耗时ms, 结果或异常)"""
+    from providers import ProviderError
+    config.MERGE_STREAMING = streaming
+    started = time.perf_counter()
+    first = []
+    
+    def on_progress(chars):
+        if not first:
+            first.append(time.perf_counter())
+    
+    try:
+        result = recognizer._call_merge_provider("合并测试", on_progress, check)
+    except ProviderError as e:
+        result = e.errors[0]
+    total = (time.perf_counter() - started) * 1000
+    ttft = (first[0] - started) * 1000 if first else total
+    return ttft, total, result
+
+def main():
+    parser = argparse.ArgumentParser(description="流式合并基准测试")
+    parser.add_argument('--first-token-ms', type=float, default=400, help="模拟的首个token延迟")
+    parser.add_argument('--token-ms', type=float, default=10, help="模拟的每个token间隔")
+    parser.add_argument('--tokens', type=int, default=400, help="模拟的输出token数")
+    args = parser.parse_args()
+    
+    from metrics import isolate_metrics
+    isolate_metrics()
+    
+    fake = FakeOpenAI(args.first_token_ms, args.token_ms, args.tokens)
+    port = start_fake_server([('POST', '/v1/chat/completions', fake.completions)])
+    config.CONTEXT_MERGE_PROVIDER = "openai"
+    config.OPENAI_API_KEY = config.OPENAI_API_KEY or "fake"
+    config.OPENAI_BASE_URL = f"http://127.0.0.1:{port}/v1"
+    from speech_recognition import SpeechRecognizer, _markdown_check
+    recognizer = SpeechRecognizer()
+    
+    print("🌊 流式合并基准测试")
+    print("=" * 50)
+    print(f"首个token {args.first_token_ms:.0f}ms，每个token {args.token_ms:.0f}ms，共 {len(fake.chunks())} 个token\n")
+    print(f"{'方式':<12}{'首个token(ms)':>14}{'总耗时(ms)':>12}")
+    
+    for name, streaming in (("非流式", False), ("流式", True)):
+        ttft, total, result = run_merge(recognizer, streaming)
+        if result != GOOD_RESPONSE:
+            print(f"❌ {name} 返回内容不正确")
+            return 1
+        print(f"{name:<12}{ttft:>14.0f}{total:>12.0f}")
+    
+    fake.response = BAD_RESPONSE
+    check = _markdown_check(len(GOOD_RESPONSE) * 2)
+    _, full_total, _ = run_merge(recognizer, False)
+    _, abort_total, result = run_merge(recognizer, True, check)
+    if not isinstance(result, Exception):
+        print("❌ 不可用的输出没有被提前中止")
+        return 1
+    print(f"\n🛑 不可用的输出: 非流式 {full_total:.0f}ms 后才拿到结果，流式 {abort_total:.0f}ms 时中止（{result}）")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
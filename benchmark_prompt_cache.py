@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+提示词缓存基准测试
+启动一个模拟前缀缓存的假OpenAI兼容服务（与之前的请求相同的前缀按128字符对齐后视为命中缓存，
+未命中的部分按字符数增加首个token耗时），连续合并多次，比较旧的提示词布局（上下文在说明中间，按文件顺序）
+与新布局（固定说明在前，项目按更新时间从早到晚排列，新内容和当前时间在最后）的缓存命中率和首个token耗时（不需要API密钥）
+
+    python benchmark_prompt_cache.py [--projects 30] [--merges 12] [--prefill-us 50]
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from aiohttp import web
+import config
+from context_model import ContextDocument
+from fake_server import start_fake_server
+from metrics import load_records, metrics
+
+CACHE_BLOCK = 128  # 缓存按块对齐
+CACHE_MIN = 1024   # 太短的提示词不缓存
+
+# 改动前的全量合并提示词
+OLD_PROMPT = """
+你会获得一个项目的新进展，请你根据新的描述信息，提取出所属项目，然后提取出其中提到的目标、当前状态、todo、block点等信息(如果没有，则无需合并）。
+然后将新的内容与现有的上下文进行智能合并。保持markdown格式，按项目分组。请注意你不能发明新的内容，只能按照原始的新旧内容合并在一起，如果新旧内容存在冲突条目，则用新内容覆盖旧内容。
+
+现有项目信息：
+{existing_context}
+
+更新项目信息：
+{new_content}
+
+请按照以下格式合并：
+- 每个项目使用二级标题（## 项目名）
+- 从新内容中整理出：更新时间、最终目标、当前状态、todo列表、block点
+- 如果新内容涉及已有项目，请更新该项目的信息
+- 如果是新项目，请创建新的项目段落
+- 保持时间顺序和逻辑性
+
+当前时间:
+{now}
+
+请返回合并后的完整markdown内容：
+"""
+
+class FakeCachingOpenAI:
+    """记住之前的提示词，按最长相同前缀计算命中缓存的部分"""
+    
+    def __init__(self, first_token_ms: float, prefill_us: float):
+        self.first_token_ms = first_token_ms
+        self.prefill_us = prefill_us
+        self.response = ""
+        self.seen = []
+    
+    def cached_prefix(self, text: str) -> int:
+        longest = 0
+        for previous in self.seen:
+            limit = min(len(text), len(previous))
+            i = 0
+            while i < limit and text[i] == previous[i]:
+                i += 1
+            longest = max(longest, i)
+        longest -= longest % CACHE_BLOCK
+        return longest if longest >= CACHE_MIN else 0
+    
+    async def completions(self, request):
+        body = await request.json()
+        text = "\n".join(message['content'] for message in body['messages'])
+        cached = self.cached_prefix(text)
+        self.seen.append(text)
+        await asyncio.sleep((self.first_token_ms + (len(text) - cached) * self.prefill_us / 1000) / 1000)
+        
+        base = {"id": "fake", "created": int(time.time()), "model": body.get("model", "fake"),
+                "object": "chat.completion.chunk"}
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        for i in range(0, len(self.response), 200):
+            data = {**base, "choices": [{"index": 0, "delta": {"content": self.response[i:i + 200]}, "finish_reason": None}]}
+            await response.write(f"data: {json.dumps(data, ensure_ascii=False)}\n\n".encode())
+        if (body.get("stream_options") or {}).get("include_usage"):
+            # 用字符数代替token数
+            usage = {"prompt_tokens": len(text), "completion_tokens": len(self.response),
+                     "total_tokens": len(text) + len(self.response), "prompt_tokens_details": {"cached_tokens": cached}}
+            data = {**base, "choices": [], "usage": usage}
+            await response.write(f"data: {json.dumps(data, ensure_ascii=False)}\n\n".encode())
+        await response.write(b"data: [DONE]\n\n")
+        return response
+
+def build_context(count: int, started: datetime) -> str:
+    parts = ["# 上下文切换器\n\n"]
+    for i in range(count):
+        updated = (started + timedelta(hours=i)).strftime("%Y-%m-%d %H:%M:%S")
+        todos = "".join(f"- [ ] 项目{i}的任务{j}，需要整理需求并完成开发和测试\n" for j in range(8))
+        parts.append(f"## 项目{i}\n\n**更新时间**: {updated}\n**最终目标**: 完成项目{i}的第一个版本并上线\n"
+                     f"**当前状态**: 开发中\n\n**todo列表**:\n{todos}\n")
+    return ''.join(parts)
+
+def plan_merges(count: int, merges: int, seed: int = 0):
+    """大多数时候继续推进最近更新过的几个项目，偶尔切换到其他项目"""
+    rng = random.Random(seed)
+    recent = list(range(count - 3, count))
+    for _ in range(merges):
+        project = rng.choice(recent) if rng.random() < 0.7 else rng.randrange(count)
+        if project in recent:
+            recent.remove(project)
+        recent = (recent + [project])[-3:]
+        yield project
+
+def run_layout(recognizer, fake: FakeCachingOpenAI, layout: str, args) -> dict:
+    """按顺序执行所有合并，返回首个token耗时和缓存命中统计"""
+    started = datetime(2024, 1, 1, 9, 0, 0)
+    context = build_context(args.projects, started)
+    fake.seen = []
+    trace_ids = []
+    ttfts = []
+    ok = True
+    
+    for step, project in enumerate(plan_merges(args.projects, args.merges)):
+        name = f"项目{project}"
+        new_content = f"{name}的最新进展：完成了第{step}个里程碑，下一步开始联调"
+        now = (started + timedelta(days=2, minutes=step)).strftime("%Y-%m-%d %H:%M:%S")
+        expected = ContextDocument(context).apply_patch([{"project": name, "fields": {"状态": f"完成第{step}个里程碑"},
+                                                          "todo_add": ["开始联调"]}], now)
+        # 假服务返回的内容按更新时间排列，与新布局中模型看到的顺序一致
+        expected_document = ContextDocument(expected)
+        fake.response = "".join(body for _, body in expected_document.by_staleness())
+        
+        first = []
+        
+        def on_progress(chars):
+            if not first:
+                first.append(time.perf_counter())
+        
+        metrics.start_trace()
+        trace_ids.append(metrics.current_trace())
+        begin = time.perf_counter()
+        if layout == "new":
+            merged = recognizer.merge_context(context, new_content, on_progress=on_progress)
+            ok = ok and ContextDocument(merged).names() == ContextDocument(expected).names()
+        else:
+            prompt = OLD_PROMPT.format(existing_context=context, new_content=new_content, now=now)
+            recognizer._call_merge_provider(prompt, on_progress)
+        ttfts.append((first[0] - begin) * 1000)
+        context = expected
+    
+    calls = [record for record in load_records(metrics.path)
+             if record['stage'] == 'llm_call' and record.get('trace') in trace_ids]
+    # 第一次请求没有可以命中的缓存，不计入
+    warm = calls[1:]
+    return {
+        'ttft': sum(ttfts[1:]) / len(ttfts[1:]),
+        'hit': sum(record['cached_tokens'] for record in warm) / sum(record['prompt_tokens'] for record in warm),
+        'order_kept': ok,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="提示词缓存基准测试")
+    parser.add_argument('--projects', type=int, default=30, help="上下文中的项目数")
+    parser.add_argument('--merges', type=int, default=12, help="连续合并次数")
+    parser.add_argument('--first-token-ms', type=float, default=200, help="全部命中缓存时的首个token延迟")
+    parser.add_argument('--prefill-us', type=float, default=50, help="每个未命中缓存的字符增加的耗时（微秒）")
+    args = parser.parse_args()
+    
+    fake = FakeCachingOpenAI(args.first_token_ms, args.prefill_us)
+    port = start_fake_server([('POST', '/v1/chat/completions', fake.completions)])
+    config.CONTEXT_MERGE_PROVIDER = "openai"
+    config.CONTEXT_MERGE_MODE = "full"
+    config.MERGE_STREAMING = True
+    config.OPENAI_API_KEY = config.OPENAI_API_KEY or "fake"
+    config.OPENAI_BASE_URL = f"http://127.0.0.1:{port}/v1"
+    from speech_recognition import SpeechRecognizer
+    
+    with tempfile.TemporaryDirectory() as temp_dir:
+        metrics.path = Path(temp_dir) / "metrics.jsonl"
+        metrics.enabled = True
+        recognizer = SpeechRecognizer()
+        
+        print("🧊 提示词缓存基准测试")
+        print("=" * 50)
+        print(f"{args.projects}个项目，连续合并{args.merges}次\n")
+        print(f"{'布局':<14}{'缓存命中率':>12}{'首个token(ms)':>16}")
+        results = {}
+        for layout, label in (("old", "旧布局"), ("new", "按更新时间排列")):
+            results[layout] = run_layout(recognizer, fake, layout, args)
+            print(f"{label:<14}{results[layout]['hit']:>12.0%}{results[layout]['ttft']:>16.0f}")
+    
+    checks = [
+        (results['new']['order_kept'], "合并结果保持文件中原来的项目顺序"),
+        (results['new']['hit'] > results['old']['hit'], "新布局的缓存命中率更高"),
+        (results['new']['ttft'] < results['old']['ttft'], "新布局的首个token更快"),
+    ]
+    print()
+    for ok, message in checks:
+        print(f"{'✅' if ok else '❌'} {message}")
+    return 0 if all(ok for ok, _ in checks) else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,119 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, NamedTuple, Optional, Tuple
+import config
+from audio_encoder import pcm_to_wav, wav_to_pcm
+from metrics import metrics
+from vad import split_at_pauses
+
+class ChunkedText(NamedTuple):
+    """分段识别的结果：拼接后的文本、各片段实际使用的后端、识别失败的片段序号，有片段被跳过时附带给用户的提示"""
+    text: Optional[str]
+    providers: List[str]
+    failed: List[int]
+    warning: Optional[str] = None
+
+def _normalized(text: str) -> Tuple[str, List[int]]:
+    """只保留文字和数字（小写），同时返回每个保留字符在原文中的位置"""
+    chars, positions = [], []
+    for position, char in enumerate(text):
+        if char.isalnum():
+            chars.append(char.lower())
+            positions.append(position)
+    return ''.join(chars), positions
+
+def stitch_texts(texts: List[Optional[str]], min_overlap: int = 3, max_overlap: int = 30) -> str:
+    """
+    按顺序拼接各片段的文本。相邻片段在重叠处会把同一段话识别两次：
+    前一段结尾和后一段开头（忽略标点、空格和大小写）相同的至少min_overlap个字只保留一次
+    """
+    result = ""
+    for text in texts:
+        text = (text or "").strip()
+        if not text:
+            continue
+        if not result:
+            result = text
+            continue
+        
+        tail, _ = _normalized(result[-max_overlap * 4:])
+        head, positions = _normalized(text)
+        for size in range(min(max_overlap, len(tail), len(head)), min_overlap - 1, -1):
+            if tail[-size:] == head[:size]:
+                text = text[positions[size - 1] + 1:].lstrip()
+                break
+        if not text:
+            continue
+        # 英文单词之间补空格，中文直接相连
+        separator = " " if result[-1].isascii() and result[-1].isalnum() and text[0].isascii() and text[0].isalnum() else ""
+        result = result + separator + text
+    return result
+
+class ChunkedTranscriber:
+    """
+    长录音在停顿处切成有重叠的片段，在有界线程池中并发识别，再按顺序拼接并去掉重叠处的重复内容。
+    transcribe与ProviderGroup.run相同：传入WAV字节数据，返回(后端名称, 文本)，失败时抛出异常。
+    单个片段失败时只重试该片段，重试后仍失败的片段跳过，其余片段照常拼接
+    """
+    
+    def __init__(self, transcribe: Callable[[bytes], Tuple[str, str]], chunk_seconds: float = None,
+                 max_seconds: float = None, overlap_ms: int = None, workers: int = None, retries: int = None):
+        self._transcribe = transcribe
+        self.chunk_seconds = chunk_seconds or config.ASR_CHUNK_SECONDS
+        self.max_seconds = max_seconds or config.ASR_CHUNK_MAX_SECONDS
+        self.overlap_ms = config.ASR_CHUNK_OVERLAP_MS if overlap_ms is None else overlap_ms
+        self.retries = config.ASR_CHUNK_RETRIES if retries is None else retries
+        # 所有录音共用一个线程池，同时识别的片段数有上限
+        self._executor = ThreadPoolExecutor(max_workers=workers or config.ASR_CHUNK_WORKERS,
+                                            thread_name_prefix="asr-chunk")
+    
+    def split(self, wav_data: bytes) -> List[Tuple[float, bytes]]:
+        """切分录音，返回[(起始秒, WAV字节数据), ...]，不需要切分时返回原始数据"""
+        samples, sample_rate, channels = wav_to_pcm(wav_data)
+        ranges = split_at_pauses(samples, sample_rate, self.chunk_seconds, self.max_seconds, self.overlap_ms)
+        if len(ranges) == 1:
+            return [(0.0, wav_data)]
+        return [(start / sample_rate, pcm_to_wav(samples[start:end], sample_rate, channels)) for start, end in ranges]
+    
+    def transcribe(self, wav_data: bytes) -> ChunkedText:
+        """识别一段录音，所有片段都失败时抛出异常"""
+        chunks = self.split(wav_data)
+        if len(chunks) == 1:
+            answered, text = self._transcribe(wav_data)
+            return ChunkedText(text, [answered], [])
+        
+        print(f"长录音切分为 {len(chunks)} 段并发识别")
+        trace_id = metrics.current_trace()
+        with metrics.span('asr_chunks', chunks=len(chunks)) as span:
+            futures = [self._executor.submit(self._transcribe_chunk, index, chunk, trace_id)
+                       for index, chunk in enumerate(chunks)]
+            results = [future.result() for future in futures]
+            failed = [index for index, result in enumerate(results) if result is None]
+            span['failed'] = len(failed)
+        
+        if len(failed) == len(chunks):
+            raise Exception(f"{len(chunks)} 个片段全部识别失败")
+        for index in failed:
+            print(f"⚠️ 第 {index + 1} 段（{chunks[index][0]:.0f}s 起）识别失败，跳过")
+        warning = None
+        if failed:
+            skipped = "、".join(f"{chunks[index][0]:.0f}s 起" for index in failed)
+            warning = f"{len(chunks)} 段中有 {len(failed)} 段识别失败（{skipped}），这部分内容已跳过"
+        
+        providers = sorted({result[0] for result in results if result})
+        text = stitch_texts([result[1] if result else None for result in results])
+        return ChunkedText(text, providers, failed, warning)
+    
+    def _transcribe_chunk(self, index: int, chunk: Tuple[float, bytes], trace_id: Optional[str]) -> Optional[Tuple[str, str]]:
+        """识别一个片段，失败时重试，重试后仍失败返回None"""
+        metrics.set_trace(trace_id)
+        offset, wav_data = chunk
+        for attempt in range(self.retries + 1):
+            try:
+                with metrics.span('asr_chunk', index=index, offset=round(offset, 1), attempt=attempt):
+                    return self._transcribe(wav_data)
+            except Exception as e:
+                print(f"第 {index + 1} 段识别失败（第 {attempt + 1} 次）: {e}")
+                if attempt < self.retries:
+                    time.sleep(attempt + 1)
+        return None
@@ -13,13 +13,48 @@ OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1")
 DASHSCOPE_API_KEY = os.getenv("DASHSCOPE_API_KEY", "")
 DASHSCOPE_ASR_MODEL = os.getenv("DASHSCOPE_ASR_MODEL", "paraformer-v2")
 DASHSCOPE_LLM_MODEL = os.getenv("DASHSCOPE_LLM_MODEL", "qwen-turbo")
+DASHSCOPE_REALTIME_ASR_MODEL = os.getenv("DASHSCOPE_REALTIME_ASR_MODEL", "paraformer-realtime-v2")
+
+# 实时识别配置：按住快捷键时边录边识别，失败时回退到批量识别
+ASR_STREAMING = os.getenv("ASR_STREAMING", "false").lower() == "true"
+STREAMING_ASR_TIMEOUT = float(os.getenv("STREAMING_ASR_TIMEOUT", "3"))  # 松开按键后等待最终结果的秒数
+ASR_PROVIDERS = [name.strip().lower() for name in os.getenv("ASR_PROVIDERS", "").split(",") if name.strip()]  # dashscope, openai, local；为空时有DashScope密钥用dashscope，否则用openai
+ASR_TIMEOUT = float(os.getenv("ASR_TIMEOUT", "120"))  # 单个识别后端的超时（秒）
+ASR_HEDGE = os.getenv("ASR_HEDGE", "false").lower() == "true"  # 当前后端超过其p90未返回时同时请求下一个后端
+ASR_HEDGE_DELAY = float(os.getenv("ASR_HEDGE_DELAY", "10"))  # 耗时样本不足时的对冲等待（秒）
+ASR_BATCH_WINDOW = float(os.getenv("ASR_BATCH_WINDOW", "0.3"))  # 已有识别任务在进行时，等待多久收集更多录音合并提交（秒）
+ASR_BATCH_MAX = int(os.getenv("ASR_BATCH_MAX", "10"))  # 一个识别任务最多包含的录音数
+ASR_POLL_MIN_INTERVAL = float(os.getenv("ASR_POLL_MIN_INTERVAL", "0.25"))  # 查询识别任务的最短间隔（秒）
+ASR_POLL_MAX_INTERVAL = float(os.getenv("ASR_POLL_MAX_INTERVAL", "5"))  # 查询识别任务的最长间隔（秒）
+
+# 长录音分段识别：超过ASR_CHUNK_MAX_SECONDS的录音在停顿处切成多段并发识别，按顺序拼接
+ASR_CHUNK_SECONDS = float(os.getenv("ASR_CHUNK_SECONDS", "60"))  # 目标片段长度（秒）
+ASR_CHUNK_MAX_SECONDS = float(os.getenv("ASR_CHUNK_MAX_SECONDS", "90"))  # 片段最大长度（秒），更短的录音不切分
+ASR_CHUNK_OVERLAP_MS = int(os.getenv("ASR_CHUNK_OVERLAP_MS", "1000"))  # 相邻片段的重叠（毫秒）
+ASR_CHUNK_WORKERS = int(os.getenv("ASR_CHUNK_WORKERS", "4"))  # 并发识别的片段数
+ASR_CHUNK_RETRIES = int(os.getenv("ASR_CHUNK_RETRIES", "2"))  # 单个片段识别失败后的重试次数
+
+# 后端熔断配置
+PROVIDER_FAILURE_THRESHOLD = int(os.getenv("PROVIDER_FAILURE_THRESHOLD", "3"))  # 连续失败多少次后熔断
+PROVIDER_RESET_SECONDS = float(os.getenv("PROVIDER_RESET_SECONDS", "60"))  # 熔断后多久再试探
 
 # 上下文合并配置
 CONTEXT_MERGE_PROVIDER = os.getenv("CONTEXT_MERGE_PROVIDER", "openai")  # openai, dashscope, 或 gemini
 CONTEXT_MERGE_MODEL = os.getenv("CONTEXT_MERGE_MODEL", "gpt-3.5-turbo")  # 默认使用OpenAI
+MERGE_STREAMING = os.getenv("MERGE_STREAMING", "true").lower() == "true"  # 合并时流式接收输出
+CONTEXT_MERGE_MODE = os.getenv("CONTEXT_MERGE_MODE", "full")  # full: 全量合并, section: 只发送相关项目段落, json: 模型只返回JSON补丁
+MERGE_PROVIDERS = [name.strip().lower() for name in os.getenv("MERGE_PROVIDERS", "").split(",") if name.strip()]  # 按顺序尝试的合并后端，为空时只用CONTEXT_MERGE_PROVIDER
+MERGE_TIMEOUT = float(os.getenv("MERGE_TIMEOUT", "60"))  # 单个合并后端的超时（秒）
+MERGE_HEDGE = os.getenv("MERGE_HEDGE", "false").lower() == "true"  # 当前后端超过其p90未返回时同时请求下一个后端
+MERGE_HEDGE_DELAY = float(os.getenv("MERGE_HEDGE_DELAY", "15"))  # 耗时样本不足时的对冲等待（秒）
 
 # Gemini配置
 GOOGLE_CLOUD_PROJECT = os.getenv("GOOGLE_CLOUD_PROJECT", "")
+GOOGLE_CLOUD_LOCATION = os.getenv("GOOGLE_CLOUD_LOCATION", "us-central1")
+GEMINI_API_KEY = os.getenv("GEMINI_API_KEY", "")
+GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-2.5-flash")
+GEMINI_BACKEND = os.getenv("GEMINI_BACKEND", "auto")  # api: 进程内google-genai客户端, cli: gemini命令行, auto: 有凭据且已安装google-genai时用api
+GEMINI_COMMAND = os.getenv("GEMINI_COMMAND", "gemini")  # cli模式使用的命令
 
 # OSS配置
 OSS_ACCESS_KEY_ID = os.getenv("OSS_ACCESS_KEY_ID", "")
@@ -27,16 +62,78 @@ OSS_ACCESS_KEY_SECRET = os.getenv("OSS_ACCESS_KEY_SECRET", "")
 OSS_ENDPOINT = os.getenv("OSS_ENDPOINT", "https://oss-cn-beijing.aliyuncs.com")
 OSS_BUCKET_NAME = os.getenv("OSS_BUCKET_NAME", "")
 OSS_BUCKET_DOMAIN = os.getenv("OSS_BUCKET_DOMAIN", "")
+OSS_CLEANUP_BATCH_DELAY = float(os.getenv("OSS_CLEANUP_BATCH_DELAY", "2"))  # 合并删除请求的等待时间（秒）
+OSS_ORPHAN_TTL_HOURS = float(os.getenv("OSS_ORPHAN_TTL_HOURS", "24"))  # 启动时清理audio/下超过该时间的遗留音频
 
 # 文件路径配置
 DESKTOP_PATH = Path.home() / "Desktop"
 CONTEXT_FILE = DESKTOP_PATH / "context_switcher_context.md"
 HISTORY_FILE = DESKTOP_PATH / "context_switcher_history.md"
+DATA_DIR = Path(os.getenv("CONTEXT_SWITCHER_DATA_DIR", str(Path.home() / ".context_switcher")))  # 程序内部数据目录
+CONTEXT_LOCK_FILE = DATA_DIR / "context.lock"  # 写入上下文文件时的进程间锁
+CONTEXT_WRITE_RETRIES = int(os.getenv("CONTEXT_WRITE_RETRIES", "3"))  # 合并期间上下文被修改时重新合并的次数
+
+# 连接池配置
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "10"))
+HTTP_KEEPALIVE_IDLE_SECONDS = float(os.getenv("HTTP_KEEPALIVE_IDLE_SECONDS", "30"))  # 空闲超过该时间后按下快捷键会重新预热连接
+NETWORK_CHECK_INTERVAL = float(os.getenv("NETWORK_CHECK_INTERVAL", "10"))  # 检测网络变化的间隔（秒）
+
+# 耗时统计配置
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+METRICS_FILE = DATA_DIR / "metrics.jsonl"
+METRICS_MAX_BYTES = int(os.getenv("METRICS_MAX_BYTES", str(5 * 1024 * 1024)))
+METRICS_BACKUP_COUNT = int(os.getenv("METRICS_BACKUP_COUNT", "3"))
+
+# 识别结果缓存配置
+TRANSCRIPTION_CACHE_ENABLED = os.getenv("TRANSCRIPTION_CACHE_ENABLED", "true").lower() == "true"
+TRANSCRIPTION_CACHE_DIR = DATA_DIR / "transcription_cache"
+TRANSCRIPTION_CACHE_MAX_BYTES = int(float(os.getenv("TRANSCRIPTION_CACHE_MAX_MB", "50")) * 1024 * 1024)
+
+# 本地离线识别配置（faster-whisper）
+LOCAL_ASR_MODEL = os.getenv("LOCAL_ASR_MODEL", "small")  # 模型名称（tiny/base/small/medium/large-v3等）或本地模型目录
+LOCAL_ASR_COMPUTE_TYPE = os.getenv("LOCAL_ASR_COMPUTE_TYPE", "int8")  # CPU上使用int8量化推理
+LOCAL_ASR_THREADS = int(os.getenv("LOCAL_ASR_THREADS", "0"))  # 每次识别使用的CPU线程数，0表示自动
+LOCAL_ASR_BEAM_SIZE = int(os.getenv("LOCAL_ASR_BEAM_SIZE", "5"))
+LOCAL_ASR_LANGUAGE = os.getenv("LOCAL_ASR_LANGUAGE", "zh")  # 为空时自动检测语言
+LOCAL_ASR_PROMPT = os.getenv("LOCAL_ASR_PROMPT", "以下是普通话的句子，其中可能夹杂英文。")  # 引导模型输出简体中文和标点
+LOCAL_ASR_MODEL_DIR = DATA_DIR / "models"  # 模型下载目录
+
+# 历史记录配置
+HISTORY_BACKEND = os.getenv("HISTORY_BACKEND", "sqlite")  # sqlite(差异存储，带索引) 或 markdown(追加到HISTORY_FILE)
+HISTORY_DB_FILE = DATA_DIR / "history.db"
+HISTORY_KEYFRAME_INTERVAL = int(os.getenv("HISTORY_KEYFRAME_INTERVAL", "20"))  # 每隔多少个版本保存一次完整快照
+HISTORY_EXPORT_LIMIT = int(os.getenv("HISTORY_EXPORT_LIMIT", "200"))  # 打开历史记录时导出最近的版本数
+HISTORY_EXPORT_FILE = DATA_DIR / "history_export.md"  # 打开历史记录时导出到这里，不覆盖HISTORY_FILE中改用sqlite之前的记录
+HISTORY_EMBEDDING_MODEL = os.getenv("HISTORY_EMBEDDING_MODEL", "")  # 本地向量模型（sentence-transformers），为空时只做关键词搜索
+
+# 待删除的OSS音频列表
+OSS_PENDING_DELETES_FILE = DATA_DIR / "oss_pending_deletes.json"
 
 # 录音配置
 SAMPLE_RATE = 16000
 CHANNELS = 1
 CHUNK_SIZE = 1024
+RECORDING_BUFFER_SECONDS = int(os.getenv("RECORDING_BUFFER_SECONDS", "60"))  # 预分配的内存缓冲区长度
+RECORDING_SPILL_SECONDS = int(os.getenv("RECORDING_SPILL_SECONDS", "600"))  # 超过该长度改用内存映射文件
+MAX_RECORDING_SECONDS = int(os.getenv("MAX_RECORDING_SECONDS", "3600"))  # 单次录音最大长度
+AUDIO_PREARM = os.getenv("AUDIO_PREARM", "false").lower() == "true"  # 启动时打开麦克风并保持，按下快捷键时不用等待设备打开
+RECORDING_PREROLL_MS = int(os.getenv("RECORDING_PREROLL_MS", "200"))  # 预先打开麦克风时，录音包含按键前的这段音频（毫秒）
+VAD_ENABLED = os.getenv("VAD_ENABLED", "true").lower() == "true"  # 上传前去掉首尾静音，纯静音录音直接丢弃
+VAD_MAX_PAUSE_MS = int(os.getenv("VAD_MAX_PAUSE_MS", "0"))  # 大于0时把更长的停顿压缩到该长度
+AUDIO_UPLOAD_FORMAT = os.getenv("AUDIO_UPLOAD_FORMAT", "wav")  # wav, flac(无损) 或 opus(有损，体积最小)
+
+# 处理队列配置
+JOB_QUEUE_SIZE = int(os.getenv("JOB_QUEUE_SIZE", "5"))  # 最多同时排队处理的录音数
+ASR_WORKERS = int(os.getenv("ASR_WORKERS", "2"))  # 并发语音识别的线程数
 
 # 快捷键配置
-RECORD_HOTKEY = {'cmd', 'shift', 'e'} 
\ No newline at end of file
+# 写法如 cmd+shift+e；功能键用pynput的名称（cmd, shift, alt, ctrl, esc, space, f1...），为空时不启用
+RECORD_HOTKEY = os.getenv("RECORD_HOTKEY", "cmd+shift+e")  # 按住录音，松开停止
+CANCEL_HOTKEY = os.getenv("CANCEL_HOTKEY", "cmd+shift+esc")  # 录音时按下，放弃本次录音
+REPLAY_HOTKEY = os.getenv("REPLAY_HOTKEY", "ctrl+shift+r")  # 重新处理上一段录音
+# 按住录音并合并到指定项目，如 cmd+shift+1=上下文切换器;cmd+shift+2=博客
+PROJECT_HOTKEYS = dict(item.strip().split("=", 1) for item in os.getenv("PROJECT_HOTKEYS", "").split(";") if "=" in item)
+
+# 状态栏配置
+STATUS_REFRESH_INTERVAL = float(os.getenv("STATUS_REFRESH_INTERVAL", "0.2"))  # 主线程刷新标题和状态项的间隔（秒）
+NOTIFICATION_MIN_INTERVAL = float(os.getenv("NOTIFICATION_MIN_INTERVAL", "3"))  # 两条系统通知之间的最短间隔（秒），期间同一标题的通知合并为一条
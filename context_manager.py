@@ -1,13 +1,130 @@
+import fcntl
+import hashlib
 import os
+import re
+import tempfile
+import threading
+from contextlib import contextmanager
 from datetime import datetime
 from pathlib import Path
+from typing import List, Optional, Tuple
 import config
 
+# 项目段落以二级标题开头: ## 项目名
+SECTION_HEADING = re.compile(r'^## +(.+?)\s*$', re.MULTILINE)
+
+
+def split_sections(content: str) -> Tuple[str, List[Tuple[str, str]]]:
+    """将上下文拆分为(文件头, [(项目名, 段落内容), ...])，段落内容包含标题行"""
+    matches = list(SECTION_HEADING.finditer(content))
+    if not matches:
+        return content, []
+
+    header = content[:matches[0].start()]
+    sections = []
+    for i, match in enumerate(matches):
+        end = matches[i + 1].start() if i + 1 < len(matches) else len(content)
+        sections.append((match.group(1), content[match.start():end]))
+    return header, sections
+
+
+def join_sections(header: str, sections: List[Tuple[str, str]]) -> str:
+    """将文件头和项目段落重新拼接为完整上下文"""
+    parts = [header]
+    for _, body in sections:
+        # 保证相邻段落之间至少有一个空行
+        if parts[-1] and not parts[-1].endswith('\n\n'):
+            parts[-1] = parts[-1].rstrip('\n') + '\n\n'
+        parts.append(body)
+    result = ''.join(parts)
+    return result if result.endswith('\n') else result + '\n'
+
+
+def splice_sections(existing_context: str, updated_sections: str) -> str:
+    """将更新后的项目段落替换回原上下文，新项目追加到末尾"""
+    header, sections = split_sections(existing_context)
+    _, updates = split_sections(updated_sections)
+
+    index = {name: i for i, (name, _) in enumerate(sections)}
+    for name, body in updates:
+        if name in index:
+            sections[index[name]] = (name, body)
+        else:
+            index[name] = len(sections)
+            sections.append((name, body))
+
+    return join_sections(header, sections)
+
+
+def restore_order(original: str, merged: str) -> str:
+    """按original中的项目顺序重新排列merged中的项目段落，新项目保持在末尾"""
+    header, sections = split_sections(merged)
+    order = {name: i for i, (name, _) in enumerate(split_sections(original)[1])}
+    ordered = sorted(sections, key=lambda item: order.get(item[0], len(order)))
+    if ordered == sections:
+        return merged
+    return join_sections(header, ordered)
+
+
+def rebase_sections(base: str, merged: str, current: str) -> Optional[str]:
+    """
+    合并是基于base计算的，但文件已被改成current时，把合并改动的项目段落套用到current上。
+    合并改动了文件头、删除了项目，或与current改动了同一个项目时无法自动处理，返回None
+    """
+    base_header, base_sections = split_sections(base)
+    merged_header, merged_sections = split_sections(merged)
+    current_header, current_sections = split_sections(current)
+    before = {name: body.strip() for name, body in base_sections}
+    after = {name: body.strip() for name, body in merged_sections}
+    concurrent = {name: body.strip() for name, body in current_sections}
+    
+    if merged_header.strip() != base_header.strip() or set(before) - set(after):
+        return None
+    
+    changed = [(name, body) for name, body in merged_sections if before.get(name) != body.strip()]
+    for name, _ in changed:
+        if concurrent.get(name) != before.get(name):
+            return None
+    if not changed:
+        return current
+    return splice_sections(current, join_sections('', changed))
+
+
+def content_version(content: str) -> str:
+    """上下文内容的版本号（内容哈希），用于检测读取之后文件是否被修改"""
+    return hashlib.sha1(content.encode('utf-8')).hexdigest()
+
+
+class ContextConflictError(Exception):
+    """写入时发现上下文已被其他线程、进程或编辑器修改"""
+    
+    def __init__(self, current_content: str, current_version: str):
+        super().__init__("上下文文件在合并期间被修改")
+        self.current_content = current_content
+        self.current_version = current_version
+
+
 class ContextManager:
     def __init__(self):
         self.context_file = config.CONTEXT_FILE
         self.history_file = config.HISTORY_FILE
+        self.lock_file = config.CONTEXT_LOCK_FILE
+        self.history_store = None
+        self.history_search = None
+        if config.HISTORY_BACKEND == "sqlite":
+            # history_store依赖本模块的split_sections，在这里导入避免循环导入
+            from history_store import HistoryStore
+            from history_search import HistorySearch
+            self.history_store = HistoryStore(config.HISTORY_DB_FILE, config.HISTORY_KEYFRAME_INTERVAL)
+            self.history_search = HistorySearch(self.history_store, config.HISTORY_EMBEDDING_MODEL)
         self._ensure_files_exist()
+        
+        # 解析后的上下文常驻内存，文件被修改后才重新读取
+        from context_model import ContextFileWatcher
+        self._document = None
+        self._document_lock = threading.Lock()
+        self.watcher = ContextFileWatcher(self.context_file)
+        self.watcher.start()
     
     def _ensure_files_exist(self):
         """确保文件存在"""
@@ -24,21 +141,104 @@ class ContextManager:
     
     def read_context(self) -> str:
         """读取当前上下文"""
+        return self.read_context_versioned()[0]
+    
+    def read_context_versioned(self) -> Tuple[str, str]:
+        """读取当前上下文和它的版本号，写入时传回版本号即可检测并发修改"""
+        document = self.document()
+        return document.content, document.version
+    
+    def document(self):
+        """解析后的上下文（ContextDocument），文件未被修改时直接返回内存中的结果"""
+        from context_model import ContextDocument
+        with self._document_lock:
+            if self._document is None or self.watcher.is_stale():
+                # 先清除失效标记再读取，读取期间发生的修改会再次标记失效
+                self.watcher.mark_fresh()
+                self._document = ContextDocument(self._read_file())
+            return self._document
+    
+    def _read_file(self) -> str:
         try:
             return self.context_file.read_text(encoding='utf-8')
         except Exception as e:
             print(f"读取上下文文件失败: {e}")
             return ""
     
-    def write_context(self, content: str):
-        """写入上下文"""
+    def write_context(self, content: str, expected_version: str = None) -> Optional[str]:
+        """
+        写入上下文，返回新版本号。
+        先写同目录下的临时文件并fsync，再原子替换，崩溃时文件要么是旧内容要么是新内容。
+        写入期间持有进程间文件锁；指定expected_version时，如果文件已不是该版本，
+        抛出ContextConflictError而不覆盖别人的修改
+        """
+        with self._file_lock():
+            if expected_version is not None:
+                # 版本检查总是读磁盘，不依赖文件监听的及时性
+                current = self._read_file()
+                if content_version(current) != expected_version:
+                    raise ContextConflictError(current, content_version(current))
+            
+            try:
+                self._atomic_write(content)
+            except Exception as e:
+                print(f"写入上下文文件失败: {e}")
+                return None
+            
+            from context_model import ContextDocument
+            with self._document_lock:
+                self.watcher.mark_fresh()
+                self._document = ContextDocument(content)
+            return self._document.version
+    
+    @contextmanager
+    def _file_lock(self):
+        """进程间互斥锁（flock），同一进程内的多个线程也会互相等待"""
+        self.lock_file.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.lock_file, 'a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+    
+    def _atomic_write(self, content: str):
+        """临时文件 + fsync + rename"""
+        directory = self.context_file.parent
+        fd, temp_path = tempfile.mkstemp(prefix=f".{self.context_file.name}.", suffix=".tmp", dir=directory)
         try:
-            self.context_file.write_text(content, encoding='utf-8')
-        except Exception as e:
-            print(f"写入上下文文件失败: {e}")
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write(content)
+                f.flush()
+                os.fsync(f.fileno())
+            if self.context_file.exists():
+                os.chmod(temp_path, self.context_file.stat().st_mode & 0o777)
+            os.replace(temp_path, self.context_file)
+        except BaseException:
+            Path(temp_path).unlink(missing_ok=True)
+            raise
+        
+        # 同步目录项，保证rename本身也已落盘
+        dir_fd = os.open(directory, os.O_RDONLY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
     
     def add_history(self, original_content: str, new_content: str, merged_content: str):
         """添加历史记录"""
+        if self.history_store:
+            try:
+                revision_id = self.history_store.add_revision(original_content, new_content, merged_content)
+            except Exception as e:
+                print(f"写入历史记录失败: {e}")
+                return
+            try:
+                self.history_search.index_revision(revision_id, new_content, original_content, merged_content)
+            except Exception as e:
+                print(f"更新历史记录索引失败: {e}")
+            return
+        
         try:
             timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
             history_entry = f"""
@@ -63,6 +263,29 @@ class ContextManager:
         except Exception as e:
             print(f"写入历史记录失败: {e}")
     
+    def export_history(self):
+        """
+        返回可以直接打开的markdown历史记录文件，使用sqlite存储时先把最近的版本导出到HISTORY_EXPORT_FILE。
+        不导出到history_file：其中可能有改用sqlite之前追加的记录，数据库里没有这些记录
+        """
+        if self.history_store:
+            try:
+                return self.history_store.export_markdown(config.HISTORY_EXPORT_FILE, limit=config.HISTORY_EXPORT_LIMIT)
+            except Exception as e:
+                print(f"导出历史记录失败: {e}")
+        return self.history_file
+    
+    def search_history(self, query: str, project: str = None, limit: int = 10, semantic: bool = False) -> List[dict]:
+        """搜索历史记录，只支持sqlite存储"""
+        if not self.history_search:
+            print("markdown历史记录不支持搜索，请设置 HISTORY_BACKEND=sqlite")
+            return []
+        try:
+            return self.history_search.search(query, project, limit, semantic)
+        except Exception as e:
+            print(f"搜索历史记录失败: {e}")
+            return []
+    
     def backup_context(self):
         """备份当前上下文"""
         try:
@@ -0,0 +1,441 @@
+#!/usr/bin/env python3
+"""
+上下文文档模型
+把上下文markdown解析为 项目 → 字段（更新时间、目标、状态、todo、block）的结构，常驻内存，
+文件被修改时由文件监听（watchdog，未安装时退化为检查文件修改时间）使之失效。
+
+    python context_model.py projects   # 各项目的更新时间和状态
+    python context_model.py todo       # 未完成的todo
+    python context_model.py block      # 各项目的block点
+"""
+
+import json
+import re
+import sys
+import threading
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Tuple
+from context_manager import split_sections, join_sections, content_version
+
+# 字段名 → 可以识别的标签写法（小写、去掉空格后按包含匹配，有多个时取最长的写法，如"解决block后"不算block点）
+FIELD_LABELS = {
+    '更新时间': ['更新时间', '最后更新', 'updated'],
+    '目标': ['最终目标', '项目目标', '目标', 'goal'],
+    '状态': ['当前状态', '状态', '当前进展', '进展', 'status'],
+    'todo': ['todo', '待办', '下一步'],
+    'block': ['block', '阻塞', '卡点', '风险', 'blocker'],
+    '后续': ['解决block后', '解决阻塞后', '后续计划'],
+}
+
+# "### 标签"，或 "**标签**: 值"、"- **标签**：值"、"标签: 值"
+LABEL_HEADING = re.compile(r'^\s*#{3,6}\s*(?P<label>.+?)\s*$')
+LABEL_LINE = re.compile(r'^\s*(?:[-*]\s+)?(?:\*\*(?P<bold>[^*]+?)\*\*\s*[:：]?|(?P<plain>[^:：*\s][^:：]{0,15})[:：])\s*(?P<value>.*)$')
+# 渲染时使用的标签，与合并提示词中的叫法一致
+RENDER_LABELS = {'更新时间': '更新时间', '目标': '最终目标', '状态': '当前状态', 'todo': 'todo列表', 'block': 'block点',
+                 '后续': '解决Block后'}
+# JSON补丁中每条更新允许的键
+PATCH_LIST_KEYS = ('todo_add', 'todo_done', 'block_add', 'block_resolved')
+LIST_ITEM = re.compile(r'^\s*(?:[-*+]|\d+[.)])\s+(?:\[(?P<mark>[ xX])\]\s*)?(?P<text>.+?)\s*$')
+
+class TodoItem(NamedTuple):
+    text: str
+    done: bool = False
+
+def match_field(label: str) -> Optional[str]:
+    """把标签文字对应到字段名"""
+    label = re.sub(r'\s+', '', label).strip('*#:：').lower()
+    matches = [(len(candidate), field) for field, labels in FIELD_LABELS.items()
+               for candidate in labels if candidate in label]
+    return max(matches)[1] if matches else None
+
+class Project:
+    """一个项目段落，body是原始markdown（包含标题行），字段是从中解析出来的"""
+    
+    def __init__(self, name: str, body: str):
+        self.name = name
+        self.body = body
+        self.fields: Dict[str, str] = {}
+        self.todos: List[TodoItem] = []
+        self.blocks: List[str] = []
+        self.notes: List[str] = []  # 第一个字段之前无法归类的内容
+        self.extras: List[str] = []  # 无法识别的标签行及其后的内容，原样保留
+        self._segments: List[Tuple[Optional[str], List[str]]] = [(None, [])]  # 原文按字段分段: (字段名或None, 原始行)
+        self._parse()
+    
+    def _parse(self):
+        field = None
+        unlabelled = self.notes
+        for line in self.body.splitlines()[1:]:
+            if not line.strip():
+                self._segments[-1][1].append(line)
+                continue
+            item = LIST_ITEM.match(line)
+            label = self._label(line, allow_plain=field is None or not item)
+            if label:
+                field, value = label
+                self._segments.append((field, [line]))
+                if value:
+                    self._add(field, value, None)
+                continue
+            if not item and self._unknown_label(line):
+                # 不属于任何字段的标签，不能并入上一个字段
+                field, unlabelled = None, self.extras
+                self._segments.append((None, []))
+            self._segments[-1][1].append(line)
+            if field is None:
+                unlabelled.append(line)
+            elif item:
+                self._add(field, item.group('text'), item.group('mark'))
+            else:
+                self._add(field, line.strip(), None)
+    
+    @staticmethod
+    def _label(line: str, allow_plain: bool) -> Optional[Tuple[str, str]]:
+        """识别字段标签行，返回(字段名, 同一行上的值)"""
+        heading = LABEL_HEADING.match(line)
+        if heading:
+            field = match_field(heading.group('label'))
+            return (field, '') if field else None
+        
+        match = LABEL_LINE.match(line)
+        if not match:
+            return None
+        label = match.group('bold')
+        if label is None:
+            # 列表项里不加粗的"xx: yy"是普通内容，不当作标签
+            if not allow_plain:
+                return None
+            label = match.group('plain')
+        field = match_field(label)
+        if not field:
+            return None
+        return field, match.group('value').strip()
+    
+    @staticmethod
+    def _unknown_label(line: str) -> bool:
+        """标题或加粗的标签行（已确认不对应任何字段）"""
+        if LABEL_HEADING.match(line):
+            return True
+        match = LABEL_LINE.match(line)
+        return bool(match and match.group('bold'))
+    
+    def _add(self, field: str, value: str, mark: Optional[str]):
+        if field == 'todo':
+            self.todos.append(TodoItem(value, mark in ('x', 'X')))
+        elif field == 'block':
+            self.blocks.append(value)
+        elif field in self.fields:
+            self.fields[field] += '\n' + value
+        else:
+            self.fields[field] = value
+    
+    @property
+    def open_todos(self) -> List[str]:
+        return [todo.text for todo in self.todos if not todo.done]
+
+    def apply(self, update: dict, now: str):
+        """应用一条JSON补丁更新，只重新渲染有变化的字段，其余内容保持原文"""
+        before = self._values()
+        self.fields.update(update.get('fields', {}))
+        self.fields['更新时间'] = now
+        
+        for text in update.get('todo_done', []):
+            index = self._find(self.todos, text, lambda todo: todo.text)
+            if index is None:
+                self.todos.append(TodoItem(text, True))
+            else:
+                self.todos[index] = self.todos[index]._replace(done=True)
+        existing = {todo.text for todo in self.todos}
+        self.todos.extend(TodoItem(text) for text in update.get('todo_add', []) if text not in existing)
+        
+        for text in update.get('block_resolved', []):
+            index = self._find(self.blocks, text, lambda block: block)
+            if index is not None:
+                del self.blocks[index]
+        self.blocks.extend(text for text in update.get('block_add', []) if text not in self.blocks)
+        
+        after = self._values()
+        changed = {field for field in FIELD_LABELS if before.get(field) != after.get(field)}
+        if changed:
+            self.body = self._rerender(changed)
+    
+    def _values(self) -> dict:
+        values = {field: value for field, value in self.fields.items() if value}
+        values['todo'] = list(self.todos)
+        values['block'] = list(self.blocks)
+        return values
+    
+    @staticmethod
+    def _find(items: list, text: str, key) -> Optional[int]:
+        """先找完全相同的条目，再找互相包含的条目"""
+        texts = [key(item) for item in items]
+        if text in texts:
+            return texts.index(text)
+        for i, candidate in enumerate(texts):
+            if text in candidate or candidate in text:
+                return i
+        return None
+    
+    def _field_lines(self, field: str) -> List[str]:
+        """按固定格式渲染一个字段，没有内容时为空"""
+        if field == 'todo':
+            items = [f"- [{'x' if todo.done else ' '}] {todo.text}" for todo in self.todos]
+        elif field == 'block':
+            items = [f"- {block}" for block in self.blocks]
+        else:
+            return [f"**{RENDER_LABELS[field]}**: {self.fields[field]}"] if self.fields.get(field) else []
+        return [f"**{RENDER_LABELS[field]}**:"] + items if items else []
+    
+    def render(self) -> str:
+        """按固定格式渲染项目段落"""
+        lines = [f"## {self.name}", ""]
+        if self.notes:
+            lines += self.notes + [""]
+        for field in ('更新时间', '目标', '状态'):
+            lines += self._field_lines(field)
+        for field in ('todo', 'block', '后续'):
+            if self._field_lines(field):
+                lines += [""] + self._field_lines(field)
+        if self.extras:
+            lines += [""] + self.extras
+        return "\n".join(lines) + "\n"
+    
+    def _rerender(self, changed: set) -> str:
+        """
+        只把changed中的字段按固定格式重新渲染，替换它在原文中第一次出现的位置（之后重复出现的删除），
+        其余行保持原文；原文中没有的字段插在按FIELD_LABELS顺序排在它前面的字段之后
+        """
+        if not any(field for field, _ in self._segments):
+            return self.render()
+        order = list(FIELD_LABELS)
+        present = {field for field, _ in self._segments}
+        inserts: Dict[int, List[str]] = {}
+        for field in order:
+            if field in changed and field not in present:
+                earlier = [i for i, (name, _) in enumerate(self._segments) if name in order[:order.index(field)]]
+                inserts.setdefault(earlier[-1] if earlier else 0, []).append(field)
+        
+        lines = self.body.splitlines()[:1]
+        rendered = set()
+        for i, (field, raw) in enumerate(self._segments):
+            content = len(raw)
+            while content and not raw[content - 1].strip():
+                content -= 1
+            trailing = raw[content:]
+            if field in changed:
+                if field in rendered:
+                    continue
+                rendered.add(field)
+                replacement = self._field_lines(field)
+                if not replacement and not lines[-1].strip():
+                    trailing = []  # 字段被清空，不留下多余的空行
+                lines += replacement
+            else:
+                lines += raw[:content]
+            for name in inserts.get(i, []):
+                # 紧跟在标题后或成块的字段前空一行
+                if lines[-1].strip() and (len(lines) == 1 or name in ('todo', 'block', '后续')):
+                    lines.append("")
+                lines += self._field_lines(name)
+            if inserts.get(i) and not trailing and i + 1 < len(self._segments):
+                trailing = [""]
+            lines += trailing
+        return "\n".join(lines) + "\n"
+
+class ContextDocument:
+    """解析后的整个上下文文件"""
+    
+    def __init__(self, content: str):
+        self.content = content
+        self.version = content_version(content)
+        self.header, sections = split_sections(content)
+        # 按文件顺序保存全部段落，同名段落（例如合并失败时追加的多个"新内容"）也各自保留
+        self.entries: List[Project] = [Project(name, body) for name, body in sections]
+        self.projects: Dict[str, Project] = {}  # 同名段落按名字查找时取第一个
+        for project in self.entries:
+            self.projects.setdefault(project.name, project)
+    
+    def names(self) -> List[str]:
+        return list(self.projects)
+    
+    def section(self, name: str) -> Optional[str]:
+        project = self.projects.get(name)
+        return project.body if project else None
+    
+    def sections(self) -> List[Tuple[str, str]]:
+        return [(project.name, project.body) for project in self.entries]
+    
+    def by_staleness(self) -> List[Tuple[str, str]]:
+        """全部段落按更新时间从早到晚排列，没有更新时间的排在最前，相同时保持文件中的顺序"""
+        ordered = sorted(self.entries, key=lambda project: project.fields.get('更新时间', ''))
+        return [(project.name, project.body) for project in ordered]
+    
+    def render(self) -> str:
+        return join_sections(self.header, self.sections())
+    
+    def open_todos(self) -> Dict[str, List[str]]:
+        """{项目名: [未完成的todo, ...]}"""
+        return {name: project.open_todos for name, project in self.projects.items() if project.open_todos}
+    
+    def blocks(self) -> Dict[str, List[str]]:
+        """{项目名: [block点, ...]}"""
+        return {name: project.blocks for name, project in self.projects.items() if project.blocks}
+    
+    def apply_patch(self, updates: List[dict], now: str) -> str:
+        """
+        应用parse_patch校验过的更新，返回新的上下文内容。
+        只有被更新的项目中有变化的字段按固定格式重新渲染，其他内容保持原文；
+        同名段落只更新第一个，缓存中的文档本身不会被修改
+        """
+        sections = self.sections()
+        index: Dict[str, int] = {}
+        for i, (name, _) in enumerate(sections):
+            index.setdefault(name, i)
+        for update in updates:
+            name = update['project']
+            body = sections[index[name]][1] if name in index else f"## {name}\n"
+            project = Project(name, body)
+            project.apply(update, now)
+            if name in index:
+                sections[index[name]] = (name, project.body)
+            else:
+                index[name] = len(sections)
+                sections.append((name, project.body))
+        return join_sections(self.header, sections)
+
+def parse_patch(text: str) -> List[dict]:
+    """
+    解析并校验模型返回的JSON补丁:
+    {"updates": [{"project": "项目名", "fields": {"目标": "...", "状态": "..."},
+                  "todo_add": [...], "todo_done": [...], "block_add": [...], "block_resolved": [...]}]}
+    格式不对时抛出ValueError
+    """
+    try:
+        data = json.loads(text)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"不是有效的JSON: {e}")
+    updates = data.get('updates') if isinstance(data, dict) else data
+    if not isinstance(updates, list):
+        raise ValueError("缺少updates列表")
+    
+    result = []
+    for update in updates:
+        if not isinstance(update, dict):
+            raise ValueError(f"更新必须是对象: {update!r}")
+        unknown = set(update) - {'project', 'fields', *PATCH_LIST_KEYS}
+        if unknown:
+            raise ValueError(f"未知的键: {sorted(unknown)}")
+        project = update.get('project')
+        if not isinstance(project, str) or not project.strip() or '\n' in project:
+            raise ValueError(f"项目名无效: {project!r}")
+        
+        fields = {}
+        for label, value in (update.get('fields') or {}).items():
+            field = match_field(label)
+            if field not in ('目标', '状态'):
+                raise ValueError(f"不支持的字段: {label}")
+            if not isinstance(value, str):
+                raise ValueError(f"字段 {label} 的值必须是字符串")
+            if value.strip():
+                fields[field] = value.strip()
+        
+        cleaned = {'project': project.strip(), 'fields': fields}
+        for key in PATCH_LIST_KEYS:
+            items = update.get(key) or []
+            if not isinstance(items, list) or not all(isinstance(item, str) for item in items):
+                raise ValueError(f"{key} 必须是字符串列表")
+            cleaned[key] = [item.strip() for item in items if item.strip()]
+        result.append(cleaned)
+    return result
+
+class ContextFileWatcher:
+    """
+    监听上下文文件，被修改后标记缓存失效。
+    优先使用watchdog（FSEvents/inotify），未安装或启动失败时每次读取前比较文件的修改时间和大小
+    """
+    
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._dirty = threading.Event()
+        self._dirty.set()
+        self._stamp = None
+        self._observer = None
+    
+    def start(self):
+        try:
+            from watchdog.events import FileSystemEventHandler
+            from watchdog.observers import Observer
+        except ImportError:
+            return
+        
+        path = str(self.path.resolve())
+        dirty = self._dirty
+        
+        class Handler(FileSystemEventHandler):
+            def on_any_event(self, event):
+                # 编辑器和我们自己的原子写入都是rename到目标文件，需要同时检查dest_path
+                if path in (event.src_path, getattr(event, 'dest_path', None)):
+                    dirty.set()
+        
+        try:
+            observer = Observer()
+            observer.schedule(Handler(), str(self.path.parent), recursive=False)
+            observer.daemon = True
+            observer.start()
+            self._observer = observer
+        except Exception as e:
+            print(f"启动文件监听失败，改为检查修改时间: {e}")
+    
+    def stop(self):
+        if self._observer:
+            self._observer.stop()
+            self._observer = None
+    
+    def is_stale(self) -> bool:
+        """缓存是否需要重新读取"""
+        if self._dirty.is_set():
+            return True
+        if self._observer:
+            return False
+        return self._current_stamp() != self._stamp
+    
+    def mark_fresh(self):
+        """重新读取或写入文件后调用"""
+        self._dirty.clear()
+        self._stamp = self._current_stamp()
+    
+    def _current_stamp(self):
+        try:
+            stat = self.path.stat()
+            return stat.st_mtime_ns, stat.st_size, stat.st_ino
+        except FileNotFoundError:
+            return None
+
+def main():
+    from context_manager import ContextManager
+    
+    command = sys.argv[1] if len(sys.argv) > 1 else 'projects'
+    document = ContextManager().document()
+    
+    if command == 'projects':
+        for project in document.entries:
+            updated = project.fields.get('更新时间', '-')
+            status = project.fields.get('状态', '-').replace('\n', ' ')
+            print(f"{project.name}  [{updated}]  {status[:60]}")
+    elif command == 'todo':
+        for name, todos in document.open_todos().items():
+            print(f"## {name}")
+            for todo in todos:
+                print(f"- [ ] {todo}")
+    elif command == 'block':
+        for name, blocks in document.blocks().items():
+            print(f"## {name}")
+            for block in blocks:
+                print(f"- {block}")
+    else:
+        print(f"未知命令: {command}（可用: projects, todo, block）")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,29 @@
+import asyncio
+import threading
+from typing import Awaitable, Callable, List, Tuple
+from aiohttp import web
+
+Route = Tuple[str, str, Callable[[web.Request], Awaitable[web.StreamResponse]]]  # (方法, 路径, 处理函数)
+
+def start_fake_server(routes: List[Route], timeout: float = 5) -> int:
+    """测试和基准脚本使用：在后台线程中启动本地的假服务，绑定系统分配的空闲端口，返回端口号"""
+    ready = threading.Event()
+    result = {}
+    
+    def run():
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        app = web.Application()
+        for method, path, handler in routes:
+            app.router.add_route(method, path, handler)
+        runner = web.AppRunner(app)
+        loop.run_until_complete(runner.setup())
+        loop.run_until_complete(web.TCPSite(runner, '127.0.0.1', 0).start())
+        result['port'] = runner.addresses[0][1]
+        ready.set()
+        loop.run_forever()
+    
+    threading.Thread(target=run, daemon=True).start()
+    if not ready.wait(timeout):
+        raise RuntimeError("假服务启动失败")
+    return result['port']
@@ -0,0 +1,141 @@
+import os
+import subprocess
+import tempfile
+import threading
+from typing import Iterator, Optional
+import config
+
+SYSTEM_PROMPT = "你是一个专业的上下文管理助手，擅长整理和合并项目信息。"
+
+class GeminiError(Exception):
+    """Gemini调用失败"""
+
+class GeminiClient:
+    """
+    常驻的Gemini合并后端。
+    api: 进程内的google-genai客户端，创建一次后复用认证和HTTP连接，支持流式输出；
+    cli: 没有API凭据时调用gemini命令行，提示词从stdin传入（不受命令行参数长度限制），按行流式读取输出；
+    auto: 安装了google-genai且配置了GEMINI_API_KEY或GOOGLE_CLOUD_PROJECT时用api，否则用cli
+    """
+    
+    def __init__(self, model: str = None, backend: str = None, command: str = None, timeout: float = None,
+                 client=None):
+        self.model = model or config.GEMINI_MODEL
+        self.command = command or config.GEMINI_COMMAND
+        self.timeout = timeout or config.MERGE_TIMEOUT
+        self._client = client
+        self._lock = threading.Lock()
+        backend = (backend or config.GEMINI_BACKEND).lower()
+        if backend == "auto":
+            backend = "api" if client is not None or self._api_available() else "cli"
+        self.backend = backend
+    
+    @staticmethod
+    def _api_available() -> bool:
+        if not (config.GEMINI_API_KEY or config.GOOGLE_CLOUD_PROJECT):
+            return False
+        try:
+            from google import genai  # noqa: F401
+            return True
+        except ImportError:
+            return False
+    
+    def client(self):
+        """创建（只创建一次）进程内客户端"""
+        with self._lock:
+            if self._client is None:
+                from google import genai
+                if config.GEMINI_API_KEY:
+                    self._client = genai.Client(api_key=config.GEMINI_API_KEY)
+                elif config.GOOGLE_CLOUD_PROJECT:
+                    self._client = genai.Client(vertexai=True, project=config.GOOGLE_CLOUD_PROJECT,
+                                                location=config.GOOGLE_CLOUD_LOCATION)
+                else:
+                    raise GeminiError("未设置 GEMINI_API_KEY 或 GOOGLE_CLOUD_PROJECT 环境变量")
+            return self._client
+    
+    def warm_up(self):
+        """在后台完成认证并建立连接，第一次合并不用等待"""
+        if self.backend != "api":
+            return
+        
+        def run():
+            try:
+                self.client().models.get(model=self.model)
+                print(f"Gemini客户端已就绪: {self.model}")
+            except Exception as e:
+                print(f"Gemini客户端预热失败: {e}")
+        
+        threading.Thread(target=run, daemon=True).start()
+    
+    def generate(self, prompt: str, usage: dict = None) -> str:
+        """返回完整输出"""
+        return "".join(self.stream(prompt, usage)).strip()
+    
+    def stream(self, prompt: str, usage: dict = None) -> Iterator[str]:
+        """逐段返回输出，关闭生成器时中止请求。api模式下把token用量写入usage"""
+        if self.backend == "api":
+            return self._stream_api(prompt, usage)
+        return self._stream_cli(prompt)
+    
+    def _stream_api(self, prompt: str, usage: dict = None) -> Iterator[str]:
+        responses = self.client().models.generate_content_stream(
+            model=self.model,
+            contents=prompt,
+            config={'system_instruction': SYSTEM_PROMPT, 'temperature': 0.3}
+        )
+        try:
+            for response in responses:
+                metadata = getattr(response, 'usage_metadata', None)
+                if metadata and usage is not None:
+                    usage['prompt_tokens'] = metadata.prompt_token_count
+                    usage['cached_tokens'] = metadata.cached_content_token_count or 0
+                if response.text:
+                    yield response.text
+        finally:
+            close = getattr(responses, 'close', None)
+            if close:
+                close()
+    
+    def _stream_cli(self, prompt: str) -> Iterator[str]:
+        env = os.environ.copy()
+        if config.GOOGLE_CLOUD_PROJECT:
+            env['GOOGLE_CLOUD_PROJECT'] = config.GOOGLE_CLOUD_PROJECT
+        cmd = [self.command, '-m', self.model]
+        
+        # stderr写入临时文件，避免管道写满后子进程阻塞
+        stderr = tempfile.TemporaryFile()
+        try:
+            process = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=stderr,
+                                       env=env, text=True, encoding='utf-8')
+        except FileNotFoundError:
+            stderr.close()
+            raise GeminiError(f"未找到{self.command}命令，请安装Gemini CLI或google-genai")
+        
+        def feed():
+            try:
+                process.stdin.write(prompt)
+                process.stdin.close()
+            except (BrokenPipeError, OSError):
+                pass
+        
+        threading.Thread(target=feed, daemon=True).start()
+        killer = threading.Timer(self.timeout, process.kill)
+        killer.start()
+        try:
+            for line in process.stdout:
+                yield line
+            process.wait()
+            if not killer.is_alive():
+                raise GeminiError(f"Gemini命令超过 {self.timeout:g}s 未返回")
+            if process.returncode != 0:
+                stderr.seek(0)
+                message = stderr.read().decode('utf-8', 'replace').strip()
+                raise GeminiError(f"Gemini命令执行失败: {message}")
+        finally:
+            killer.cancel()
+            if process.poll() is None:
+                process.kill()
+                process.wait()
+            process.stdout.close()
+            stderr.close()
@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+"""
+历史记录搜索
+对每个版本的识别文本和更新涉及的项目段落建立倒排索引（中文按相邻两字切分，英文和数字按单词切分），
+每次写入历史记录时增量更新，按BM25排序。配置了HISTORY_EMBEDDING_MODEL时还会建立本地向量索引，支持语义搜索。
+
+    python history_search.py "OSS 阻塞"
+    python history_search.py "上传失败" --project 项目名 --limit 5
+    python history_search.py "上次卡在哪里" --semantic
+    python history_search.py --rebuild
+"""
+
+import argparse
+import math
+import re
+import sqlite3
+import sys
+import threading
+from collections import Counter
+from typing import List, Optional
+import numpy as np
+import config
+from context_manager import split_sections
+from history_store import HistoryStore, changed_projects
+
+# 英文/数字单词，或连续的中日韩文字
+TOKEN_PATTERN = re.compile(r'[a-z0-9_]+|[㐀-鿿豈-﫿]+')
+
+# BM25参数
+K1 = 1.2
+B = 0.75
+
+def tokenize(text: str) -> List[str]:
+    """英文按单词切分，中文按相邻两字切分（单字保留为一个词）"""
+    tokens = []
+    for run in TOKEN_PATTERN.findall(text.lower()):
+        if run[0].isascii():
+            tokens.append(run)
+        elif len(run) == 1:
+            tokens.append(run)
+        else:
+            tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+    return tokens
+
+class HistorySearch:
+    def __init__(self, store: HistoryStore, embedding_model: str = ""):
+        self.store = store
+        self.embedding_model = embedding_model
+        self._encoder = None
+        self._encoder_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(store.db_file), check_same_thread=False, timeout=10)
+        self._create_tables()
+        # 向量索引第一次语义搜索时载入内存，之后随写入追加
+        self._vectors: Optional[np.ndarray] = None
+        self._vector_docs: List[int] = []
+    
+    def _create_tables(self):
+        with self._conn:
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS search_docs (
+                    id INTEGER PRIMARY KEY,
+                    revision_id INTEGER NOT NULL,
+                    project TEXT NOT NULL,
+                    length INTEGER NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_search_docs_revision ON search_docs(revision_id);
+                CREATE TABLE IF NOT EXISTS search_postings (
+                    token TEXT NOT NULL,
+                    doc_id INTEGER NOT NULL,
+                    tf INTEGER NOT NULL,
+                    PRIMARY KEY (token, doc_id)
+                ) WITHOUT ROWID;
+                CREATE TABLE IF NOT EXISTS search_vectors (
+                    doc_id INTEGER PRIMARY KEY,
+                    vector BLOB NOT NULL
+                );
+            """)
+    
+    def index_revision(self, revision_id: int, transcript: str, original: str, merged: str):
+        """为一个版本建立索引：识别文本一条，每个发生变化的项目段落一条"""
+        with self._lock:
+            if self._indexed(revision_id):
+                return
+        sections = dict(split_sections(merged)[1])
+        documents = [('', transcript)]
+        documents += [(name, sections[name]) for name in changed_projects(original, merged)]
+        
+        # 向量编码较慢，在锁外完成，不阻塞同时进行的搜索
+        prepared = []
+        for project, text in documents:
+            tokens = tokenize(text)
+            if tokens:
+                prepared.append((project, tokens, self._embed(text) if self.embedding_model else None))
+        
+        with self._lock, self._conn:
+            if self._indexed(revision_id):
+                return
+            for project, tokens, vector in prepared:
+                doc_id = self._conn.execute(
+                    "INSERT INTO search_docs (revision_id, project, length) VALUES (?, ?, ?)",
+                    (revision_id, project, len(tokens))
+                ).lastrowid
+                self._conn.executemany(
+                    "INSERT INTO search_postings (token, doc_id, tf) VALUES (?, ?, ?)",
+                    [(token, doc_id, tf) for token, tf in Counter(tokens).items()]
+                )
+                if vector is not None:
+                    self._add_vector(doc_id, vector)
+    
+    def _indexed(self, revision_id: int) -> bool:
+        """在self._lock内调用"""
+        return self._conn.execute("SELECT 1 FROM search_docs WHERE revision_id = ?", (revision_id,)).fetchone() is not None
+    
+    def sync(self) -> int:
+        """
+        为尚未建立索引的版本补建索引（例如切换存储后第一次搜索），返回补建数量。
+        按版本逐个检查而不是从已索引的最大版本号往后，写入时索引失败的版本也会被补上
+        """
+        with self._lock:
+            missing = [row[0] for row in self._conn.execute(
+                "SELECT r.id FROM revisions r WHERE NOT EXISTS "
+                "(SELECT 1 FROM search_docs d WHERE d.revision_id = r.id) ORDER BY r.id"
+            ).fetchall()]
+        for revision_id in missing:
+            revision = self.store.get_revision(revision_id)
+            self.index_revision(revision_id, revision['transcript'], revision['original'], revision['merged'])
+        return len(missing)
+    
+    def rebuild(self) -> int:
+        """清空索引后重新建立"""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM search_postings")
+            self._conn.execute("DELETE FROM search_docs")
+            self._conn.execute("DELETE FROM search_vectors")
+            self._vectors, self._vector_docs = None, []
+        return self.sync()
+    
+    def search(self, query: str, project: str = None, limit: int = 10, semantic: bool = False) -> List[dict]:
+        """搜索历史记录，返回按相关度排序的结果"""
+        ranked = self._keyword_search(query, project)
+        if semantic and self.embedding_model:
+            # 关键词和语义两路结果按排名融合（RRF）
+            fused = Counter()
+            for ranking in (ranked, self._semantic_search(query, project)):
+                for rank, doc_id in enumerate(ranking):
+                    fused[doc_id] += 1 / (60 + rank)
+            ranked = [doc_id for doc_id, _ in fused.most_common()]
+        return [self._result(doc_id, query) for doc_id in ranked[:limit]]
+    
+    def _keyword_search(self, query: str, project: str = None) -> List[int]:
+        """BM25排序的文档id"""
+        tokens = set(tokenize(query))
+        if not tokens:
+            return []
+        
+        with self._lock:
+            total, average_length = self._conn.execute("SELECT COUNT(*), AVG(length) FROM search_docs").fetchone()
+            scores = Counter()
+            for token in tokens:
+                query_sql = ("SELECT p.doc_id, p.tf, d.length FROM search_postings p "
+                             "JOIN search_docs d ON d.id = p.doc_id WHERE p.token = ?")
+                params = [token]
+                if project:
+                    query_sql += " AND d.project = ?"
+                    params.append(project)
+                postings = self._conn.execute(query_sql, params).fetchall()
+                if not postings:
+                    continue
+                # 按项目过滤时postings不完整，单独统计包含该词的文档数
+                document_frequency = self._document_frequency(token) if project else len(postings)
+                idf = math.log(1 + (total - document_frequency + 0.5) / (document_frequency + 0.5))
+                for doc_id, tf, length in postings:
+                    scores[doc_id] += idf * tf * (K1 + 1) / (tf + K1 * (1 - B + B * length / average_length))
+        return [doc_id for doc_id, _ in scores.most_common()]
+    
+    def _document_frequency(self, token: str) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM search_postings WHERE token = ?", (token,)).fetchone()[0]
+    
+    def _semantic_search(self, query: str, project: str = None) -> List[int]:
+        """按向量余弦相似度排序的文档id"""
+        with self._lock:
+            if self._vectors is None:
+                self._load_vectors()
+            if not self._vector_docs:
+                return []
+            vectors, doc_ids = self._vectors, list(self._vector_docs)
+            allowed = None
+            if project:
+                allowed = {row[0] for row in self._conn.execute(
+                    "SELECT id FROM search_docs WHERE project = ?", (project,)
+                ).fetchall()}
+        
+        similarities = vectors @ self._encode(query)
+        order = np.argsort(-similarities)
+        return [doc_ids[i] for i in order if allowed is None or doc_ids[i] in allowed]
+    
+    def _encode(self, text: str) -> np.ndarray:
+        """用本地模型把文本编码为单位向量"""
+        with self._encoder_lock:
+            if self._encoder is None:
+                from sentence_transformers import SentenceTransformer
+                self._encoder = SentenceTransformer(self.embedding_model)
+        return self._encoder.encode(text, normalize_embeddings=True).astype(np.float32)
+    
+    def _embed(self, text: str) -> Optional[np.ndarray]:
+        """写入索引时使用：编码失败只打印错误，该文档没有向量"""
+        try:
+            return self._encode(text)
+        except Exception as e:
+            print(f"生成历史记录向量失败: {e}")
+            return None
+    
+    def _add_vector(self, doc_id: int, vector: np.ndarray):
+        """在self._lock内调用"""
+        self._conn.execute("INSERT OR REPLACE INTO search_vectors (doc_id, vector) VALUES (?, ?)", (doc_id, vector.tobytes()))
+        if self._vectors is not None:
+            self._vectors = np.vstack([self._vectors, vector]) if len(self._vector_docs) else vector[np.newaxis]
+            self._vector_docs.append(doc_id)
+    
+    def _load_vectors(self):
+        rows = self._conn.execute("SELECT doc_id, vector FROM search_vectors ORDER BY doc_id").fetchall()
+        self._vector_docs = [row[0] for row in rows]
+        self._vectors = (np.vstack([np.frombuffer(row[1], dtype=np.float32) for row in rows])
+                         if rows else np.zeros((0, 0), dtype=np.float32))
+    
+    def _result(self, doc_id: int, query: str) -> dict:
+        """还原命中的文档内容并截取片段"""
+        with self._lock:
+            revision_id, project = self._conn.execute(
+                "SELECT revision_id, project FROM search_docs WHERE id = ?", (doc_id,)
+            ).fetchone()
+        revision = self.store.get_revision(revision_id)
+        if project:
+            text = dict(split_sections(revision['merged'])[1]).get(project, '')
+        else:
+            text = revision['transcript']
+        return {
+            'revision_id': revision_id,
+            'created': revision['created'],
+            'project': project,
+            'snippet': snippet(text, query),
+        }
+
+def snippet(text: str, query: str, width: int = 40) -> str:
+    """截取第一个命中词附近的文本"""
+    flat = ' '.join(text.split())
+    lower = flat.lower()
+    positions = [lower.find(token) for token in tokenize(query)]
+    positions = [position for position in positions if position >= 0]
+    start = max(0, min(positions) - width // 2) if positions else 0
+    prefix = '…' if start else ''
+    suffix = '…' if start + width * 2 < len(flat) else ''
+    return prefix + flat[start:start + width * 2] + suffix
+
+def main():
+    parser = argparse.ArgumentParser(description="搜索历史记录")
+    parser.add_argument('query', nargs='?', help="搜索内容")
+    parser.add_argument('--project', help="只搜索该项目")
+    parser.add_argument('--limit', type=int, default=10)
+    parser.add_argument('--semantic', action='store_true', help="同时使用向量索引（需要配置HISTORY_EMBEDDING_MODEL）")
+    parser.add_argument('--rebuild', action='store_true', help="重建索引")
+    args = parser.parse_args()
+    
+    store = HistoryStore(config.HISTORY_DB_FILE, config.HISTORY_KEYFRAME_INTERVAL)
+    search = HistorySearch(store, config.HISTORY_EMBEDDING_MODEL)
+    
+    if args.rebuild:
+        print(f"已重建索引: {search.rebuild()} 个版本")
+    else:
+        indexed = search.sync()
+        if indexed:
+            print(f"已为 {indexed} 个版本补建索引")
+    if not args.query:
+        return 0
+    
+    if args.semantic and not config.HISTORY_EMBEDDING_MODEL:
+        print("未配置HISTORY_EMBEDDING_MODEL，只使用关键词搜索")
+    results = search.search(args.query, args.project, args.limit, args.semantic)
+    if not results:
+        print("没有找到相关记录")
+        return 1
+    for result in results:
+        source = result['project'] or '识别文本'
+        print(f"#{result['revision_id']:<6}{result['created']}  [{source}]  {result['snippet']}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
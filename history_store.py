@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""
+历史记录存储
+每次更新只保存相对上一版本的行级差异，定期保存完整快照，按时间和项目建立索引，
+任意版本最多回放 HISTORY_KEYFRAME_INTERVAL 个差异即可还原。
+
+    python history_store.py list [--project 项目名] [--since 2024-01-01] [--limit 20]
+    python history_store.py show 42
+    python history_store.py export [--output history.md] [--project 项目名] [--limit 200]
+"""
+
+import argparse
+import difflib
+import json
+import sqlite3
+import sys
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional
+import config
+from context_manager import split_sections
+
+def make_delta(old: str, new: str) -> str:
+    """计算行级差异: [["=", 保留行数], ["-", 删除行数], ["+", [新行...]]]"""
+    old_lines = old.splitlines(keepends=True)
+    new_lines = new.splitlines(keepends=True)
+    ops = []
+    matcher = difflib.SequenceMatcher(None, old_lines, new_lines, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == 'equal':
+            ops.append(['=', i2 - i1])
+            continue
+        if i2 > i1:
+            ops.append(['-', i2 - i1])
+        if j2 > j1:
+            ops.append(['+', new_lines[j1:j2]])
+    return json.dumps(ops, ensure_ascii=False, separators=(',', ':'))
+
+def apply_delta(old: str, delta: str) -> str:
+    """把make_delta生成的差异应用到旧内容上"""
+    old_lines = old.splitlines(keepends=True)
+    result = []
+    position = 0
+    for op, value in json.loads(delta):
+        if op == '=':
+            result.extend(old_lines[position:position + value])
+            position += value
+        elif op == '-':
+            position += value
+        else:
+            result.extend(value)
+    return ''.join(result)
+
+def changed_projects(original: str, merged: str) -> List[str]:
+    """合并前后内容发生变化的项目"""
+    _, before = split_sections(original)
+    _, after = split_sections(merged)
+    before = {name: body.strip() for name, body in before}
+    return [name for name, body in after if before.get(name) != body.strip()]
+
+class HistoryStore:
+    def __init__(self, db_file: Path, keyframe_interval: int = 20):
+        self.db_file = Path(db_file)
+        self.keyframe_interval = keyframe_interval
+        self._lock = threading.Lock()
+        self.db_file.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.db_file), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._create_tables()
+        # 最新版本的合并后内容，用来计算下一个版本的差异
+        self._last_id: Optional[int] = None
+        self._last_merged: Optional[str] = None
+    
+    def _create_tables(self):
+        with self._conn:
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS revisions (
+                    id INTEGER PRIMARY KEY,
+                    created TEXT NOT NULL,
+                    transcript TEXT NOT NULL,
+                    original_snapshot TEXT,
+                    original_delta TEXT,
+                    merged_delta TEXT NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_revisions_created ON revisions(created);
+                CREATE TABLE IF NOT EXISTS revision_projects (
+                    project TEXT NOT NULL,
+                    revision_id INTEGER NOT NULL,
+                    PRIMARY KEY (project, revision_id)
+                );
+            """)
+    
+    def add_revision(self, original: str, transcript: str, merged: str, created: datetime = None) -> int:
+        """保存一次更新，返回版本号"""
+        created = (created or datetime.now()).isoformat(timespec='seconds')
+        with self._lock:
+            last_id = self._latest_id()
+            if last_id is not None and self._last_id != last_id:
+                self._last_id, self._last_merged = last_id, self._reconstruct(last_id)[1]
+            
+            # 第一个版本和每隔keyframe_interval个版本保存一次完整快照
+            keyframe = last_id is None or last_id % self.keyframe_interval == 0
+            original_snapshot = original if keyframe else None
+            original_delta = None if keyframe else make_delta(self._last_merged, original)
+            
+            with self._conn:
+                cursor = self._conn.execute(
+                    "INSERT INTO revisions (created, transcript, original_snapshot, original_delta, merged_delta) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (created, transcript, original_snapshot, original_delta, make_delta(original, merged))
+                )
+                revision_id = cursor.lastrowid
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO revision_projects (project, revision_id) VALUES (?, ?)",
+                    [(project, revision_id) for project in changed_projects(original, merged)]
+                )
+            
+            self._last_id, self._last_merged = revision_id, merged
+            return revision_id
+    
+    def get_revision(self, revision_id: int) -> Optional[dict]:
+        """还原一个版本的完整内容"""
+        with self._lock:
+            row = self._conn.execute("SELECT created, transcript FROM revisions WHERE id = ?", (revision_id,)).fetchone()
+            if not row:
+                return None
+            original, merged = self._reconstruct(revision_id)
+            return {
+                'id': revision_id,
+                'created': row[0],
+                'transcript': row[1],
+                'original': original,
+                'merged': merged,
+                'projects': self._projects(revision_id),
+            }
+    
+    def list_revisions(self, project: str = None, since: str = None, until: str = None, limit: int = 50) -> List[dict]:
+        """按时间倒序列出版本（不还原内容），可按项目和时间范围过滤"""
+        query = "SELECT r.id, r.created, r.transcript FROM revisions r"
+        conditions, params = [], []
+        if project:
+            query += " JOIN revision_projects p ON p.revision_id = r.id"
+            conditions.append("p.project = ?")
+            params.append(project)
+        if since:
+            conditions.append("r.created >= ?")
+            params.append(since)
+        if until:
+            conditions.append("r.created < ?")
+            params.append(until)
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY r.id DESC LIMIT ?"
+        params.append(limit)
+        
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+            return [
+                {'id': row[0], 'created': row[1], 'transcript': row[2], 'projects': self._projects(row[0])}
+                for row in rows
+            ]
+    
+    def export_markdown(self, output: Path, project: str = None, limit: int = 200) -> Path:
+        """导出为旧版历史记录的markdown格式，按时间正序"""
+        output = Path(output)
+        output.parent.mkdir(parents=True, exist_ok=True)
+        parts = ["# 上下文切换器 - 历史记录\n\n"]
+        for item in reversed(self.list_revisions(project=project, limit=limit)):
+            revision = self.get_revision(item['id'])
+            timestamp = revision['created'].replace('T', ' ')
+            parts.append(f"""
+## {timestamp}
+
+### 原始内容
+{revision['original']}
+
+### 新内容
+{revision['transcript']}
+
+### 合并后内容
+{revision['merged']}
+
+---
+""")
+        output.write_text(''.join(parts), encoding='utf-8')
+        return output
+    
+    def _latest_id(self) -> Optional[int]:
+        return self._conn.execute("SELECT MAX(id) FROM revisions").fetchone()[0]
+    
+    def _projects(self, revision_id: int) -> List[str]:
+        rows = self._conn.execute(
+            "SELECT project FROM revision_projects WHERE revision_id = ? ORDER BY project", (revision_id,)
+        ).fetchall()
+        return [row[0] for row in rows]
+    
+    def _reconstruct(self, revision_id: int):
+        """从最近的快照开始回放差异，返回(原始内容, 合并后内容)"""
+        keyframe_id = self._conn.execute(
+            "SELECT MAX(id) FROM revisions WHERE id <= ? AND original_snapshot IS NOT NULL", (revision_id,)
+        ).fetchone()[0]
+        rows = self._conn.execute(
+            "SELECT original_snapshot, original_delta, merged_delta FROM revisions WHERE id >= ? AND id <= ? ORDER BY id",
+            (keyframe_id, revision_id)
+        ).fetchall()
+        
+        merged = ""
+        for original_snapshot, original_delta, merged_delta in rows:
+            original = original_snapshot if original_snapshot is not None else apply_delta(merged, original_delta)
+            merged = apply_delta(original, merged_delta)
+        return original, merged
+
+def main():
+    parser = argparse.ArgumentParser(description="历史记录")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    list_parser = subparsers.add_parser('list', help="列出历史版本")
+    list_parser.add_argument('--project', help="只列出涉及该项目的版本")
+    list_parser.add_argument('--since', help="起始时间，如 2024-01-01")
+    list_parser.add_argument('--until', help="结束时间（不含）")
+    list_parser.add_argument('--limit', type=int, default=20)
+    show_parser = subparsers.add_parser('show', help="查看一个版本的完整内容")
+    show_parser.add_argument('id', type=int)
+    export_parser = subparsers.add_parser('export', help="导出为markdown")
+    export_parser.add_argument('--output', default=str(config.HISTORY_EXPORT_FILE))
+    export_parser.add_argument('--project', help="只导出涉及该项目的版本")
+    export_parser.add_argument('--limit', type=int, default=config.HISTORY_EXPORT_LIMIT)
+    args = parser.parse_args()
+    
+    store = HistoryStore(config.HISTORY_DB_FILE, config.HISTORY_KEYFRAME_INTERVAL)
+    
+    if args.command == 'list':
+        for item in store.list_revisions(args.project, args.since, args.until, args.limit):
+            projects = ', '.join(item['projects']) or '-'
+            print(f"#{item['id']:<6}{item['created']}  [{projects}]  {item['transcript'][:40]}")
+    elif args.command == 'show':
+        revision = store.get_revision(args.id)
+        if not revision:
+            print(f"未找到版本: {args.id}")
+            return 1
+        print(f"# 版本 {revision['id']}  {revision['created']}  涉及项目: {', '.join(revision['projects']) or '-'}\n")
+        print(f"## 新内容\n{revision['transcript']}\n")
+        print(f"## 合并后内容\n{revision['merged']}")
+    elif args.command == 'export':
+        output = store.export_markdown(Path(args.output), args.project, args.limit)
+        print(f"已导出到: {output}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,70 +1,157 @@
-from pynput import keyboard
-from typing import Callable
-import config
+import queue
+import sys
+import threading
+import time
+from typing import Callable, Dict, FrozenSet, List, Optional, Tuple
+
+# 快捷键写法中的别名
+KEY_ALIASES = {
+    'command': 'cmd', 'super': 'cmd', 'control': 'ctrl', 'option': 'alt', 'opt': 'alt',
+    'escape': 'esc', 'return': 'enter', 'spacebar': 'space',
+}
+
+# macOS字符键的虚拟键码（按美式键盘的键位）→ 不按修饰键时的字符。
+# 按住shift或alt时系统报告的是变化后的字符（shift+1为'!'，alt+e为'´'），按键码还原才能与快捷键写法匹配
+MAC_VK_CHARS = {
+    0: 'a', 1: 's', 2: 'd', 3: 'f', 4: 'h', 5: 'g', 6: 'z', 7: 'x', 8: 'c', 9: 'v', 11: 'b', 12: 'q',
+    13: 'w', 14: 'e', 15: 'r', 16: 'y', 17: 't', 18: '1', 19: '2', 20: '3', 21: '4', 22: '6', 23: '5', 24: '=',
+    25: '9', 26: '7', 27: '-', 28: '8', 29: '0', 30: ']', 31: 'o', 32: 'u', 33: '[', 34: 'i', 35: 'p', 37: 'l',
+    38: 'j', 39: "'", 40: 'k', 41: ';', 42: '\\', 43: ',', 44: '/', 45: 'n', 46: 'm', 47: '.', 50: '`',
+}
+# 其他系统的键码含义不同，不使用
+VK_CHARS = MAC_VK_CHARS if sys.platform == 'darwin' else {}
+
+def parse_hotkey(spec) -> FrozenSet[str]:
+    """'cmd+shift+e' 或 {'cmd', 'shift', 'e'} -> frozenset({'cmd', 'shift', 'e'})"""
+    names = spec.split('+') if isinstance(spec, str) else spec
+    keys = frozenset(KEY_ALIASES.get(name.strip().lower(), name.strip().lower()) for name in names if name.strip())
+    if not keys:
+        raise ValueError(f"无效的快捷键: {spec!r}")
+    return keys
+
+def key_name(key, vk_chars: Dict[int, str] = None) -> Optional[str]:
+    """
+    pynput按键 -> 快捷键写法中的名称：功能键取枚举名并合并左右键（cmd_r -> cmd），
+    字符键按虚拟键码取不按修饰键时的字符（shift+1 -> '1'），没有键码时取小写字符（按住ctrl时的控制字符还原为字母），
+    都没有时为vk编号（如vk105）
+    """
+    name = getattr(key, 'name', None)
+    if name:
+        return name[:-2] if name.endswith(('_l', '_r')) else name
+    vk = getattr(key, 'vk', None)
+    vk_chars = VK_CHARS if vk_chars is None else vk_chars
+    if vk in vk_chars:
+        return vk_chars[vk]
+    char = getattr(key, 'char', None)
+    if char:
+        if len(char) == 1 and ord(char) < 32:
+            char = chr(ord(char) + 96)
+        return char.lower()
+    return f"vk{vk}" if vk is not None else None
+
+class HotkeyBinding:
+    """
+    一个快捷键：组合键全部按下时调用on_press(按下时刻)，之后其中任一键松开时调用on_release(松开时刻)。
+    时刻为time.monotonic()，在监听线程收到按键事件时记录
+    """
+
+    def __init__(self, name: str, keys, on_press: Callable[[float], None] = None,
+                 on_release: Callable[[float], None] = None):
+        self.name = name
+        self.keys = parse_hotkey(keys)
+        self.on_press = on_press
+        self.on_release = on_release
+        self.mask = 0
 
 class HotkeyManager:
-    def __init__(self, on_start_recording: Callable, on_stop_recording: Callable):
-        self.on_start_recording = on_start_recording
-        self.on_stop_recording = on_stop_recording
-        self.pressed_keys = set()
-        self.recording = False
+    """
+    全局快捷键监听。启动时把所有快捷键编译为位掩码：每个按键对应一位，按键对象到位的映射首次出现时计算并缓存，
+    之后每次按键只有一次字典查找，与快捷键无关的按键（打字）直接返回。
+    回调不在pynput监听线程中执行，而是放入队列由分发线程依次调用，较慢的回调不会阻塞系统按键事件
+    """
+
+    def __init__(self, bindings: List[HotkeyBinding], vk_chars: Dict[int, str] = None):
+        self.bindings = bindings
+        self.vk_chars = VK_CHARS if vk_chars is None else vk_chars
+        self._bits: Dict[str, int] = {}
+        self._candidates: Dict[int, List[HotkeyBinding]] = {}
+        self._cache: Dict[object, int] = {}
+        self._state = 0
+        self._latched: List[HotkeyBinding] = []
+        self._events: "queue.SimpleQueue[Tuple[Callable, float]]" = queue.SimpleQueue()
+        self._dispatcher = None
         self.listener = None
-    
+        self._compile()
+
+    def _compile(self):
+        """为快捷键中出现的每个按键分配一位，并为每一位列出包含它的快捷键（按键数多的优先）"""
+        for binding in self.bindings:
+            for name in sorted(binding.keys):
+                self._bits.setdefault(name, 1 << len(self._bits))
+            binding.mask = sum(self._bits[name] for name in binding.keys)
+        for name, bit in self._bits.items():
+            matches = [binding for binding in self.bindings if binding.mask & bit]
+            self._candidates[bit] = sorted(matches, key=lambda binding: -len(binding.keys))
+
     def start_listening(self):
         """开始监听快捷键"""
+        from pynput import keyboard
+
+        if self._dispatcher is None:
+            self._dispatcher = threading.Thread(target=self._dispatch, name="hotkey-dispatch", daemon=True)
+            self._dispatcher.start()
         self.listener = keyboard.Listener(
             on_press=self._on_press,
             on_release=self._on_release
         )
         self.listener.start()
-    
+
     def stop_listening(self):
         """停止监听快捷键"""
         if self.listener:
             self.listener.stop()
-    
-    def _on_press(self, key):
-        """按键按下事件"""
+
+    def _bit(self, key) -> int:
+        """按键对应的位，不属于任何快捷键时为0"""
         try:
-            # 获取按键名称
-            if hasattr(key, 'char'):
-                key_name = key.char.lower()
-            else:
-                key_name = str(key).replace('Key.', '').lower()
-            
-            self.pressed_keys.add(key_name)
-            
-            # 检查是否按下目标组合键
-            if self._is_target_hotkey_pressed() and not self.recording:
-                self.recording = True
-                if self.on_start_recording:
-                    self.on_start_recording()
-                    
-        except Exception as e:
-            print(f"按键处理错误: {e}")
-    
+            return self._cache[key]
+        except KeyError:
+            bit = self._cache[key] = self._bits.get(key_name(key, self.vk_chars), 0)
+            return bit
+        except TypeError:
+            return self._bits.get(key_name(key, self.vk_chars), 0)
+
+    def _on_press(self, key):
+        """按键按下事件（监听线程）"""
+        bit = self._bit(key)
+        if not bit:
+            return
+        self._state |= bit
+        for binding in self._candidates[bit]:
+            if self._state & binding.mask == binding.mask:
+                # 按住不放时系统会重复发送按下事件，已触发的快捷键不再触发
+                if binding not in self._latched:
+                    self._latched.append(binding)
+                    if binding.on_press:
+                        self._events.put((binding.on_press, time.monotonic()))
+                break
+
     def _on_release(self, key):
-        """按键释放事件"""
-        try:
-            # 获取按键名称
-            if hasattr(key, 'char'):
-                key_name = key.char.lower()
-            else:
-                key_name = str(key).replace('Key.', '').lower()
-            
-            # 从已按下的键集合中移除
-            self.pressed_keys.discard(key_name)
-            
-            # 检查是否释放了目标组合键
-            if not self._is_target_hotkey_pressed() and self.recording:
-                self.recording = False
-                if self.on_stop_recording:
-                    self.on_stop_recording()
-                    
-        except Exception as e:
-            print(f"按键释放处理错误: {e}")
-    
-    def _is_target_hotkey_pressed(self) -> bool:
-        """检查目标快捷键是否被按下"""
-        target_keys = config.RECORD_HOTKEY
-        return all(key in self.pressed_keys for key in target_keys) 
\ No newline at end of file
+        """按键释放事件（监听线程）"""
+        bit = self._bit(key)
+        if not bit:
+            return
+        self._state &= ~bit
+        for binding in [binding for binding in self._latched if binding.mask & bit]:
+            self._latched.remove(binding)
+            if binding.on_release:
+                self._events.put((binding.on_release, time.monotonic()))
+
+    def _dispatch(self):
+        """分发线程：按事件顺序调用快捷键回调"""
+        while True:
+            callback, timestamp = self._events.get()
+            try:
+                callback(timestamp)
+            except Exception as e:
+                print(f"快捷键处理错误: {e}")
@@ -0,0 +1,100 @@
+import socket
+import threading
+import time
+from typing import Optional
+from urllib.parse import urlsplit
+import oss2
+import config
+
+class ConnectionPool:
+    """共享的HTTP keep-alive连接池，OSS上传/删除和识别结果下载复用同一组连接"""
+    
+    def __init__(self, pool_size: int = 10, idle_seconds: float = 30):
+        self.idle_seconds = idle_seconds
+        # oss2.Session内部就是requests.Session，直接共用它的连接池
+        self.oss_session = oss2.Session(pool_size=pool_size)
+        self.session = self.oss_session.session
+        self._warm_origins = set()
+        self._last_used = 0.0
+        self._network_id = None
+        self._warming = threading.Lock()
+        self._monitor = None
+    
+    def register(self, url: str):
+        """登记需要预热的地址（只保留协议和主机）"""
+        parts = urlsplit(url if '://' in url else f"https://{url}")
+        if parts.netloc:
+            self._warm_origins.add(f"{parts.scheme}://{parts.netloc}/")
+    
+    def get(self, url: str, timeout: float = 30) -> bytes:
+        """通过连接池下载内容，并记住该主机以便后续预热"""
+        self.register(url)
+        response = self.session.get(url, timeout=timeout)
+        response.raise_for_status()
+        self.touch()
+        return response.content
+    
+    def touch(self):
+        """记录连接最近一次被使用的时间"""
+        self._last_used = time.monotonic()
+    
+    def prewarm(self, background: bool = True):
+        """提前完成DNS解析和TLS握手，让连接留在池中"""
+        if background:
+            threading.Thread(target=self.prewarm, args=(False,), daemon=True).start()
+            return
+        
+        # 同一时间只做一次预热
+        if not self._warming.acquire(blocking=False):
+            return
+        try:
+            started = time.perf_counter()
+            for origin in list(self._warm_origins):
+                try:
+                    # 返回403/404也没关系，目的只是建立连接
+                    self.session.head(origin, timeout=5).close()
+                except Exception as e:
+                    print(f"连接预热失败 {origin}: {e}")
+            self._network_id = self._current_network_id()
+            self.touch()
+            if self._warm_origins:
+                print(f"连接预热完成: {len(self._warm_origins)} 个主机，耗时 {time.perf_counter() - started:.2f}s")
+        finally:
+            self._warming.release()
+    
+    def ensure_warm(self):
+        """按下快捷键时调用：连接空闲太久或网络发生变化时在后台重新预热"""
+        idle = time.monotonic() - self._last_used > self.idle_seconds
+        if idle or self._current_network_id() != self._network_id:
+            self.prewarm()
+    
+    def start_monitor(self, interval: float = 10):
+        """后台检测网络变化（切换Wi-Fi、热点等），变化后立即重新预热"""
+        if self._monitor:
+            return
+        
+        def run():
+            while True:
+                time.sleep(interval)
+                if self._current_network_id() != self._network_id:
+                    print("检测到网络变化，重新预热连接")
+                    self.prewarm(background=False)
+        
+        self._monitor = threading.Thread(target=run, name="network-monitor", daemon=True)
+        self._monitor.start()
+    
+    @staticmethod
+    def _current_network_id() -> Optional[str]:
+        """用本机出口IP标识当前网络（UDP connect不会真正发包）"""
+        try:
+            with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+                sock.connect(("223.5.5.5", 53))
+                return sock.getsockname()[0]
+        except OSError:
+            return None
+
+# 全局实例，各模块直接使用
+connection_pool = ConnectionPool(
+    pool_size=config.HTTP_POOL_SIZE,
+    idle_seconds=config.HTTP_KEEPALIVE_IDLE_SECONDS
+)
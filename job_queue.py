@@ -0,0 +1,118 @@
+import itertools
+import queue
+import threading
+import time
+from typing import Callable, Dict, Optional
+from metrics import metrics
+
+class RecordingJob:
+    """一次录音的处理任务"""
+    
+    def __init__(self, seq: int, audio_data: bytes, streaming_session=None, trace_id: str = None,
+                 project: str = None):
+        self.seq = seq
+        self.audio_data = audio_data
+        self.streaming_session = streaming_session
+        self.trace_id = trace_id
+        self.project = project  # 用项目快捷键录音时指定的项目
+        self.created = time.perf_counter()
+        self.transcript: Optional[str] = None
+        self.error: Optional[str] = None
+
+class ProcessingPipeline:
+    """录音处理流水线：多个任务的语音识别并发执行，上下文合并按录音顺序串行执行"""
+    
+    def __init__(self, transcribe: Callable[[RecordingJob], Optional[str]], merge: Callable[[RecordingJob], None],
+                 on_depth_change: Callable[[int], None] = None, max_pending: int = 5, asr_workers: int = 2):
+        self.transcribe = transcribe
+        self.merge = merge
+        self.on_depth_change = on_depth_change
+        self.max_pending = max_pending
+        self.asr_workers = asr_workers
+        
+        self._asr_queue: "queue.Queue[RecordingJob]" = queue.Queue()
+        self._transcribed: Dict[int, RecordingJob] = {}
+        self._condition = threading.Condition()
+        self._sequence = itertools.count()
+        self._next_merge = 0
+        self._pending = 0
+        self._threads = []
+    
+    def start(self):
+        """启动识别线程池和合并线程"""
+        for i in range(self.asr_workers):
+            thread = threading.Thread(target=self._asr_worker, name=f"asr-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        
+        thread = threading.Thread(target=self._merge_worker, name="merge-worker", daemon=True)
+        thread.start()
+        self._threads.append(thread)
+    
+    def submit(self, audio_data: bytes, streaming_session=None, trace_id: str = None,
+               project: str = None) -> Optional[RecordingJob]:
+        """提交一段录音，队列已满时返回None"""
+        with self._condition:
+            if self._pending >= self.max_pending:
+                return None
+            job = RecordingJob(next(self._sequence), audio_data, streaming_session, trace_id, project)
+            self._pending += 1
+            depth = self._pending
+        
+        self._asr_queue.put(job)
+        self._notify_depth(depth)
+        return job
+    
+    def is_full(self) -> bool:
+        """队列是否已满"""
+        with self._condition:
+            return self._pending >= self.max_pending
+    
+    def depth(self) -> int:
+        """已提交但还未合并完成的任务数"""
+        with self._condition:
+            return self._pending
+    
+    def _asr_worker(self):
+        """识别线程：并发处理多个任务的语音识别"""
+        while True:
+            job = self._asr_queue.get()
+            metrics.set_trace(job.trace_id)
+            metrics.record('queue_wait_asr', (time.perf_counter() - job.created) * 1000, seq=job.seq)
+            try:
+                job.transcript = self.transcribe(job)
+            except Exception as e:
+                print(f"任务 {job.seq} 语音识别出错: {e}")
+                job.error = str(e)
+            
+            with self._condition:
+                self._transcribed[job.seq] = job
+                self._condition.notify_all()
+    
+    def _merge_worker(self):
+        """合并线程：严格按录音顺序合并，避免并发写上下文文件"""
+        while True:
+            with self._condition:
+                while self._next_merge not in self._transcribed:
+                    self._condition.wait()
+                job = self._transcribed.pop(self._next_merge)
+                self._next_merge += 1
+            
+            metrics.set_trace(job.trace_id)
+            try:
+                self.merge(job)
+            except Exception as e:
+                print(f"任务 {job.seq} 合并出错: {e}")
+            finally:
+                job.audio_data = None
+                with self._condition:
+                    self._pending -= 1
+                    depth = self._pending
+                self._notify_depth(depth)
+    
+    def _notify_depth(self, depth: int):
+        if self.on_depth_change:
+            try:
+                self.on_depth_change(depth)
+            except Exception as e:
+                print(f"更新队列状态失败: {e}")
@@ -0,0 +1,90 @@
+import threading
+import time
+from math import gcd
+from typing import Optional
+import numpy as np
+import config
+from audio_encoder import wav_to_pcm
+from metrics import metrics
+
+WHISPER_SAMPLE_RATE = 16000
+
+def wav_to_float(wav_data: bytes) -> np.ndarray:
+    """WAV字节数据转为Whisper需要的16kHz单声道float32数组"""
+    samples, sample_rate, channels = wav_to_pcm(wav_data)
+    audio = samples.astype(np.float32).mean(axis=1) / 32768.0
+    if sample_rate != WHISPER_SAMPLE_RATE:
+        from scipy.signal import resample_poly
+        
+        factor = gcd(sample_rate, WHISPER_SAMPLE_RATE)
+        audio = resample_poly(audio, WHISPER_SAMPLE_RATE // factor, sample_rate // factor).astype(np.float32)
+    return audio
+
+class LocalWhisper:
+    """
+    本地离线识别：faster-whisper（CTranslate2）在CPU上运行量化模型，不需要网络。
+    模型只加载一次并常驻内存，多个识别线程共用
+    """
+    
+    def __init__(self, model: str = None, compute_type: str = None, threads: int = None, workers: int = None):
+        self.model_name = model or config.LOCAL_ASR_MODEL
+        self.compute_type = compute_type or config.LOCAL_ASR_COMPUTE_TYPE
+        self.threads = config.LOCAL_ASR_THREADS if threads is None else threads
+        self.workers = workers or config.ASR_WORKERS
+        self._model = None
+        self._lock = threading.Lock()
+    
+    @property
+    def loaded(self) -> bool:
+        return self._model is not None
+    
+    def load(self):
+        """加载模型（只加载一次），首次使用时会下载到LOCAL_ASR_MODEL_DIR"""
+        with self._lock:
+            if self._model is None:
+                try:
+                    from faster_whisper import WhisperModel
+                except ImportError:
+                    raise RuntimeError("未安装faster-whisper，请运行 pip install faster-whisper")
+                
+                with metrics.span('local_asr_load', model=self.model_name, compute_type=self.compute_type,
+                                  threads=self.threads):
+                    self._model = WhisperModel(
+                        self.model_name,
+                        device="cpu",
+                        compute_type=self.compute_type,
+                        cpu_threads=self.threads,
+                        num_workers=self.workers,
+                        download_root=str(config.LOCAL_ASR_MODEL_DIR)
+                    )
+                print(f"本地识别模型已加载: {self.model_name} ({self.compute_type})")
+            return self._model
+    
+    def warm_up(self):
+        """在后台加载模型，第一次识别不用等待"""
+        def run():
+            try:
+                self.load()
+            except Exception as e:
+                print(f"本地识别模型加载失败: {e}")
+        
+        threading.Thread(target=run, daemon=True).start()
+    
+    def transcribe(self, wav_data: bytes) -> Optional[str]:
+        """识别一段WAV音频"""
+        model = self.load()
+        audio = wav_to_float(wav_data)
+        started = time.perf_counter()
+        with metrics.span('asr_local', model=self.model_name, audio_seconds=round(len(audio) / WHISPER_SAMPLE_RATE, 2)) as span:
+            segments, _ = model.transcribe(
+                audio,
+                language=config.LOCAL_ASR_LANGUAGE or None,
+                beam_size=config.LOCAL_ASR_BEAM_SIZE,
+                initial_prompt=config.LOCAL_ASR_PROMPT or None,
+                condition_on_previous_text=False
+            )
+            # segments是生成器，遍历时才真正解码
+            text = "".join(segment.text for segment in segments).strip()
+            if len(audio):
+                span['rtf'] = round((time.perf_counter() - started) / (len(audio) / WHISPER_SAMPLE_RATE), 3)
+        return text or None
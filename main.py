@@ -4,13 +4,16 @@
 通过语音记录和AI合并来管理项目上下文
 """
 
-import threading
+import functools
 import time
 from audio_recorder import AudioRecorder
 from speech_recognition import SpeechRecognizer
-from context_manager import ContextManager
+from context_manager import ContextManager, ContextConflictError, rebase_sections
 from status_bar import StatusBarApp
-from hotkey_manager import HotkeyManager
+from hotkey_manager import HotkeyBinding, HotkeyManager
+from metrics import metrics
+from job_queue import ProcessingPipeline, RecordingJob
+from http_pool import connection_pool
 import config
 
 class ContextSwitcher:
@@ -18,29 +21,57 @@ class ContextSwitcher:
         # 初始化各个模块
         self.audio_recorder = AudioRecorder(
             sample_rate=config.SAMPLE_RATE,
-            channels=config.CHANNELS
+            channels=config.CHANNELS,
+            buffer_seconds=config.RECORDING_BUFFER_SECONDS,
+            spill_seconds=config.RECORDING_SPILL_SECONDS,
+            max_seconds=config.MAX_RECORDING_SECONDS,
+            vad_enabled=config.VAD_ENABLED,
+            vad_max_pause_ms=config.VAD_MAX_PAUSE_MS,
+            preroll_ms=config.RECORDING_PREROLL_MS
         )
         self.speech_recognizer = SpeechRecognizer()
         self.context_manager = ContextManager()
-        self.status_bar = StatusBarApp(on_backup=self.context_manager.backup_context)
+        self.status_bar = StatusBarApp(
+            on_backup=self.context_manager.backup_context,
+            on_export_history=self.context_manager.export_history
+        )
         
         # 设置录音回调
         self.audio_recorder.on_recording_start = self._on_recording_start
         self.audio_recorder.on_recording_stop = self._on_recording_stop
         
-        # 初始化快捷键管理器
-        self.hotkey_manager = HotkeyManager(
-            on_start_recording=self._start_recording,
-            on_stop_recording=self._stop_recording
-        )
+        # 初始化快捷键管理器：按住录音（可指定项目）、取消录音、重新处理上一段录音
+        bindings = []
+        if config.RECORD_HOTKEY:
+            bindings.append(HotkeyBinding('record', config.RECORD_HOTKEY, self._start_recording, self._stop_recording))
+        for keys, project in config.PROJECT_HOTKEYS.items():
+            bindings.append(HotkeyBinding(f'record:{project}', keys,
+                                          functools.partial(self._start_recording, project=project),
+                                          self._stop_recording))
+        if config.CANCEL_HOTKEY:
+            bindings.append(HotkeyBinding('cancel', config.CANCEL_HOTKEY, self._cancel_recording))
+        if config.REPLAY_HOTKEY:
+            bindings.append(HotkeyBinding('replay', config.REPLAY_HOTKEY, self._replay_last))
+        self.hotkey_manager = HotkeyManager(bindings)
         
-        # 处理状态
-        self.processing = False
+        # 处理流水线：识别并发执行，合并按录音顺序串行执行
+        self.pipeline = ProcessingPipeline(
+            transcribe=self._transcribe_job,
+            merge=self._merge_job,
+            on_depth_change=self.status_bar.set_queue_depth,
+            max_pending=config.JOB_QUEUE_SIZE,
+            asr_workers=config.ASR_WORKERS
+        )
+        self.streaming_session = None
+        self.recording_project = None
+        # 最近一段录音(音频, 项目)，用于重新处理
+        self.last_recording = None
     
     def start(self):
         """启动应用"""
         print("启动上下文切换器...")
-        print(f"快捷键: {' + '.join(config.RECORD_HOTKEY)}")
+        for binding in self.hotkey_manager.bindings:
+            print(f"快捷键 {binding.name}: {' + '.join(sorted(binding.keys))}")
         print(f"上下文文件: {config.CONTEXT_FILE}")
         print(f"历史记录文件: {config.HISTORY_FILE}")
         print(f"上下文合并: {config.CONTEXT_MERGE_PROVIDER} ({config.CONTEXT_MERGE_MODEL})")
@@ -57,98 +88,203 @@ class ContextSwitcher:
             )
         elif config.DASHSCOPE_API_KEY:
             print(f"使用DashScope API进行语音识别，模型: {config.DASHSCOPE_ASR_MODEL}")
+            if config.ASR_STREAMING:
+                print(f"已启用实时识别，模型: {config.DASHSCOPE_REALTIME_ASR_MODEL}")
         else:
             print("使用OpenAI API进行语音识别")
         
-        # 启动快捷键监听
+        # 预热网络连接，并在网络变化后自动重新预热
+        connection_pool.prewarm()
+        connection_pool.start_monitor(config.NETWORK_CHECK_INTERVAL)
+        
+        # 后台删除OSS临时音频，并清理上次遗留的文件
+        self.speech_recognizer.oss_cleanup.start()
+        
+        # 预先打开麦克风，按下快捷键时从按键时刻开始录音
+        if config.AUDIO_PREARM:
+            self.audio_recorder.arm()
+        
+        # 启动处理流水线和快捷键监听
+        self.pipeline.start()
         self.hotkey_manager.start_listening()
         
         # 启动状态栏
         self.status_bar.run()
     
-    def _start_recording(self):
-        """开始录音"""
-        if self.processing:
+    def _start_recording(self, pressed_at: float = None, project: str = None):
+        """开始录音，指定project时识别结果合并到该项目"""
+        pressed_at = pressed_at or time.monotonic()
+        if self.audio_recorder.is_recording():
+            return
+        if self.pipeline.is_full():
+            self.status_bar.show_notification(
+                "处理队列已满", 
+                f"还有 {self.pipeline.depth()} 条录音在处理中", 
+                "请稍后再录音"
+            )
             return
             
-        self.audio_recorder.start_recording()
+        # 录音期间在后台恢复空闲断开的连接，不占用松开按键后的处理时间
+        connection_pool.ensure_warm()
+        
+        # 实时识别：录音期间持续发送音频帧
+        self.streaming_session = self.speech_recognizer.start_streaming(config.SAMPLE_RATE)
+        self.audio_recorder.on_audio_frame = self.streaming_session.feed if self.streaming_session else None
+        
+        self.recording_project = project
+        self.audio_recorder.start_recording(pressed_at)
         self.status_bar.set_recording_state(True)
+        self.status_bar.set_stage('recording', f"录音（{project}）" if project else "录音")
+    
+    def _cancel_recording(self, pressed_at: float = None):
+        """放弃正在进行的录音"""
+        if not self.audio_recorder.is_recording():
+            return
+        
+        self.audio_recorder.stop_recording(pressed_at)
+        self.status_bar.set_recording_state(False)
+        self.status_bar.set_stage('recording', None)
+        streaming_session, self.streaming_session = self.streaming_session, None
+        if streaming_session:
+            streaming_session.finish(0)
+        metrics.record('total', 0, status='cancelled')
         self.status_bar.show_notification(
-            "录音开始", 
-            "正在录音...", 
-            "松开快捷键停止录音"
+            "录音已取消", 
+            "本次录音已丢弃", 
+            ""
         )
     
-    def _stop_recording(self):
+    def _replay_last(self, pressed_at: float = None):
+        """重新处理上一段录音（识别结果有缓存时不再请求识别）"""
+        if not self.last_recording:
+            self.status_bar.show_notification(
+                "没有可重新处理的录音", 
+                "请先录一段音", 
+                ""
+            )
+            return
+        
+        audio_data, project = self.last_recording
+        job = self.pipeline.submit(audio_data, None, metrics.start_trace(), project)
+        if not job:
+            self.status_bar.show_notification(
+                "处理队列已满", 
+                "上一段录音未能加入处理队列", 
+                "请稍后重试"
+            )
+    
+    def _stop_recording(self, released_at: float = None):
         """停止录音"""
+        released_at = released_at or time.monotonic()
         if not self.audio_recorder.is_recording():
             return
             
         self.status_bar.set_recording_state(False)
-        self.status_bar.show_notification(
-            "录音结束", 
-            "正在处理...", 
-            "请稍候"
-        )
+        self.status_bar.set_stage('recording', None)
         
-        # 在后台线程中处理录音
-        threading.Thread(target=self._process_recording).start()
-    
-    def _process_recording(self):
-        """处理录音"""
-        self.processing = True
+        # 先同步停止录音，这样可以马上开始下一段录音
+        trace_id = metrics.start_trace()
+        with metrics.span('capture_stop'):
+            audio_data = self.audio_recorder.stop_recording(released_at)
+        streaming_session, self.streaming_session = self.streaming_session, None
         
-        try:
-            # 停止录音并获取音频数据
-            audio_data = self.audio_recorder.stop_recording()
-            if not audio_data:
+        if not audio_data:
+            if streaming_session:
+                streaming_session.finish(0)
+            if self.audio_recorder.silence_rejected:
+                metrics.record('total', 0, status='silence')
                 self.status_bar.show_notification(
-                    "处理失败", 
-                    "未获取到音频数据", 
-                    "请重试"
+                    "未检测到语音", 
+                    "本次录音已丢弃", 
+                    "请靠近麦克风重试"
                 )
                 return
-            
-            # 语音识别
+            metrics.record('total', 0, status='no_audio')
             self.status_bar.show_notification(
-                "正在识别", 
-                "语音转文字中...", 
-                "请稍候"
+                "处理失败", 
+                "未获取到音频数据", 
+                "请重试"
             )
-            
-            transcribed_text = self.speech_recognizer.transcribe_audio(audio_data)
+            return
+        
+        # 交给后台流水线处理
+        self.last_recording = (audio_data, self.recording_project)
+        job = self.pipeline.submit(audio_data, streaming_session, trace_id, self.recording_project)
+        if not job:
+            if streaming_session:
+                streaming_session.finish(0)
+            metrics.record('total', 0, status='queue_full')
+            self.status_bar.show_notification(
+                "处理队列已满", 
+                "本次录音未能加入处理队列", 
+                "请稍后重试"
+            )
+    
+    def _transcribe_job(self, job: RecordingJob):
+        """识别线程：语音识别"""
+        audio_seconds = round(max(len(job.audio_data) - 44, 0) / (config.SAMPLE_RATE * config.CHANNELS * 2), 2)
+        
+        self.status_bar.set_stage(job.seq, f"#{job.seq} 识别")
+        
+        with metrics.span('transcribe', audio_seconds=audio_seconds, streaming=bool(job.streaming_session)):
+            transcribed_text = self.speech_recognizer.transcribe_audio(
+                job.audio_data, job.streaming_session,
+                on_warning=lambda message: self.status_bar.show_notification("识别不完整", "部分录音识别失败", message)
+            )
+        # 合并按录音顺序进行，前面的录音未合并完时在此等待
+        self.status_bar.set_stage(job.seq, f"#{job.seq} 等待合并")
+        if not transcribed_text:
+            self.status_bar.show_notification(
+                "识别失败", 
+                "语音识别失败", 
+                "请检查网络和API配置"
+            )
+        return transcribed_text
+    
+    def _merge_job(self, job: RecordingJob):
+        """合并线程：按录音顺序合并上下文"""
+        summary = {'status': 'error', 'seq': job.seq}
+        
+        try:
+            transcribed_text = job.transcript
             if not transcribed_text:
-                self.status_bar.show_notification(
-                    "识别失败", 
-                    "语音识别失败", 
-                    "请检查网络和API配置"
-                )
+                summary['status'] = 'asr_failed'
                 return
             
-            # 读取现有上下文
-            existing_context = self.context_manager.read_context()
+            # 用项目快捷键录音时，告诉模型这段内容属于哪个项目
+            if job.project:
+                transcribed_text = f"关于项目「{job.project}」：{transcribed_text}"
+            
+            # 读取现有上下文（文件未被修改时直接使用内存中解析好的结果）
+            with metrics.span('read_context'):
+                document = self.context_manager.document()
+                existing_context, version = document.content, document.version
             
             # 合并上下文
-            self.status_bar.show_notification(
-                "正在合并", 
-                "合并上下文中...", 
-                "请稍候"
-            )
+            self.status_bar.set_stage(job.seq, f"#{job.seq} 合并")
             
-            merged_context = self.speech_recognizer.merge_context(
-                existing_context, 
-                transcribed_text
-            )
+            with metrics.span('merge', context_chars=len(existing_context), transcript_chars=len(transcribed_text)):
+                merged_context = self.speech_recognizer.merge_context(
+                    existing_context, 
+                    transcribed_text,
+                    document,
+                    on_progress=self._merge_progress()
+                )
+                self.status_bar.set_progress(None)
             
             # 保存新上下文
-            self.context_manager.write_context(merged_context)
+            existing_context, merged_context = self._write_merged_context(
+                existing_context, version, transcribed_text, merged_context
+            )
             
             # 添加历史记录
-            self.context_manager.add_history(
-                existing_context,
-                transcribed_text,
-                merged_context
-            )
+            with metrics.span('history_append'):
+                self.context_manager.add_history(
+                    existing_context,
+                    transcribed_text,
+                    merged_context
+                )
+            summary['status'] = 'ok'
             
             # 显示成功通知
             self.status_bar.show_notification(
@@ -165,7 +301,43 @@ class ContextSwitcher:
                 str(e)
             )
         finally:
-            self.processing = False
+            self.status_bar.set_progress(None)
+            self.status_bar.set_stage(job.seq, None)
+            metrics.record('total', (time.perf_counter() - job.created) * 1000, **summary)
+    
+    def _merge_progress(self):
+        """
+        返回在状态栏显示合并输出进度的回调（只更新状态，由状态栏定时刷新，不需要限制频率）。
+        上下文文件仍在完整输出校验通过后一次写入，原因见SpeechRecognizer._stream_merge
+        """
+        def on_progress(chars: int):
+            self.status_bar.set_progress(f"✍️{chars}字")
+        return on_progress
+    
+    def _write_merged_context(self, existing_context: str, version: str, transcribed_text: str, merged_context: str):
+        """
+        带版本检查地写入合并结果。合并期间文件被修改（例如在编辑器中手动编辑）时，
+        改动的项目段落互不重叠就直接套用到最新内容上，否则基于最新内容重新合并。
+        返回实际写入时的(原始内容, 合并后内容)
+        """
+        for attempt in range(config.CONTEXT_WRITE_RETRIES + 1):
+            try:
+                with metrics.span('write_context', chars=len(merged_context), attempt=attempt):
+                    self.context_manager.write_context(merged_context, expected_version=version)
+                return existing_context, merged_context
+            except ContextConflictError as conflict:
+                if attempt == config.CONTEXT_WRITE_RETRIES:
+                    raise
+                rebased = rebase_sections(existing_context, merged_context, conflict.current_content)
+                existing_context, version = conflict.current_content, conflict.current_version
+                if rebased is not None:
+                    print("上下文文件在合并期间被修改，已将本次改动套用到最新内容上")
+                    merged_context = rebased
+                    continue
+                
+                print("上下文文件在合并期间被修改，基于最新内容重新合并")
+                with metrics.span('merge', context_chars=len(existing_context), transcript_chars=len(transcribed_text), rebase=True):
+                    merged_context = self.speech_recognizer.merge_context(existing_context, transcribed_text)
     
     def _on_recording_start(self):
         """录音开始回调"""
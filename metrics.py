@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+处理耗时统计
+记录每次录音处理各阶段的耗时，写入滚动的JSONL文件，并提供按阶段统计p50/p95的命令:
+
+    python metrics.py summary
+"""
+
+import argparse
+import json
+import logging
+import math
+import os
+import sys
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from logging.handlers import RotatingFileHandler
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+import config
+
+class Metrics:
+    def __init__(self, path: Path = None, max_bytes: int = None, backup_count: int = None):
+        self.path = Path(path or config.METRICS_FILE)
+        self.max_bytes = max_bytes or config.METRICS_MAX_BYTES
+        self.backup_count = backup_count or config.METRICS_BACKUP_COUNT
+        self.enabled = config.METRICS_ENABLED
+        self._local = threading.local()
+        self._logger = None
+        self._lock = threading.Lock()
+    
+    def start_trace(self) -> str:
+        """为当前线程开始一次新的处理记录，返回trace_id"""
+        trace_id = uuid.uuid4().hex[:12]
+        self._local.trace_id = trace_id
+        return trace_id
+    
+    def set_trace(self, trace_id: Optional[str]):
+        """在其他线程中继续记录同一次处理"""
+        self._local.trace_id = trace_id
+    
+    def current_trace(self) -> Optional[str]:
+        """当前线程的trace_id，传给其他线程的set_trace"""
+        return getattr(self._local, 'trace_id', None)
+    
+    @contextmanager
+    def span(self, stage: str, **attrs) -> Iterator[dict]:
+        """记录一个阶段的耗时，可以在with块内向返回的字典中补充属性"""
+        started = time.perf_counter()
+        try:
+            yield attrs
+        except Exception as e:
+            attrs['error'] = str(e)[:200]
+            raise
+        finally:
+            self.record(stage, (time.perf_counter() - started) * 1000, **attrs)
+    
+    def record(self, stage: str, duration_ms: float, **attrs):
+        """直接写入一条阶段耗时记录"""
+        if not self.enabled:
+            return
+        
+        entry = {
+            'ts': datetime.now().isoformat(timespec='milliseconds'),
+            'trace': getattr(self._local, 'trace_id', None),
+            'stage': stage,
+            'ms': round(duration_ms, 2),
+        }
+        entry.update(attrs)
+        
+        try:
+            self._get_logger().info(json.dumps(entry, ensure_ascii=False, default=str))
+        except Exception as e:
+            print(f"写入耗时记录失败: {e}")
+    
+    def _get_logger(self) -> logging.Logger:
+        """首次写入时才创建日志文件"""
+        if self._logger is None:
+            with self._lock:
+                if self._logger is None:
+                    self.path.parent.mkdir(parents=True, exist_ok=True)
+                    handler = RotatingFileHandler(
+                        self.path,
+                        maxBytes=self.max_bytes,
+                        backupCount=self.backup_count,
+                        encoding='utf-8'
+                    )
+                    handler.setFormatter(logging.Formatter('%(message)s'))
+                    logger = logging.getLogger(f'context_switcher.metrics.{self.path}')
+                    logger.setLevel(logging.INFO)
+                    logger.propagate = False
+                    logger.addHandler(handler)
+                    self._logger = logger
+        return self._logger
+
+# 全局实例，各模块直接使用
+metrics = Metrics()
+
+def isolate_metrics():
+    """
+    测试和基准脚本使用：不写入也不读取 ~/.context_switcher/metrics.jsonl，
+    其中的耗时用于计算对冲延迟和查询节奏，不能混入模拟数据
+    """
+    metrics.enabled = False
+    config.METRICS_FILE = Path(os.devnull)
+
+def load_records(path: Path, backup_count: int = None) -> List[dict]:
+    """读取耗时记录，包括已滚动的旧文件"""
+    path = Path(path)
+    backup_count = config.METRICS_BACKUP_COUNT if backup_count is None else backup_count
+    files = [path.with_name(f"{path.name}.{i}") for i in range(backup_count, 0, -1)] + [path]
+    
+    records = []
+    for file in files:
+        if not file.exists():
+            continue
+        with open(file, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError:
+                    continue
+    return records
+
+def percentile(values: List[float], p: float) -> float:
+    """最近秩法计算百分位数"""
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, math.ceil(p / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+def summarize(records: List[dict]) -> Dict[str, dict]:
+    """按阶段统计次数、p50、p95和最大耗时，阶段按首次出现的顺序排列"""
+    durations: Dict[str, List[float]] = {}
+    for record in records:
+        durations.setdefault(record['stage'], []).append(record['ms'])
+    
+    return {
+        stage: {
+            'count': len(values),
+            'p50': percentile(values, 50),
+            'p95': percentile(values, 95),
+            'max': max(values),
+        }
+        for stage, values in durations.items()
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="处理耗时统计")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    summary_parser = subparsers.add_parser('summary', help="按阶段统计p50/p95耗时")
+    summary_parser.add_argument('--file', default=str(config.METRICS_FILE), help="耗时记录文件")
+    summary_parser.add_argument('--last', type=int, default=0, help="只统计最近N次处理")
+    args = parser.parse_args()
+    
+    records = load_records(Path(args.file))
+    if args.last:
+        traces = []
+        for record in records:
+            if record.get('trace') and record['trace'] not in traces:
+                traces.append(record['trace'])
+        recent = set(traces[-args.last:])
+        records = [record for record in records if record.get('trace') in recent]
+    
+    if not records:
+        print(f"没有耗时记录: {args.file}")
+        return 1
+    
+    print(f"{'阶段':<20}{'次数':>8}{'p50(ms)':>12}{'p95(ms)':>12}{'max(ms)':>12}")
+    for stage, stats in summarize(records).items():
+        print(f"{stage:<20}{stats['count']:>8}{stats['p50']:>12.1f}{stats['p95']:>12.1f}{stats['max']:>12.1f}")
+    
+    # 合并请求的提示词缓存命中情况
+    calls = [record for record in records if record['stage'] == 'llm_call' and record.get('prompt_tokens')]
+    if calls:
+        prompt_tokens = sum(record['prompt_tokens'] for record in calls)
+        cached_tokens = sum(record.get('cached_tokens') or 0 for record in calls)
+        print(f"\n提示词缓存: {len(calls)}次合并共 {prompt_tokens} tokens，命中缓存 {cached_tokens} ({cached_tokens / prompt_tokens:.0%})")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
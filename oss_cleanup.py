@@ -0,0 +1,117 @@
+import json
+import threading
+import time
+from pathlib import Path
+from typing import List
+from metrics import metrics
+
+class OSSCleanupQueue:
+    """在后台批量删除OSS上的临时音频，待删除的key持久化到磁盘，程序崩溃后重启仍会继续删除"""
+    
+    MAX_BATCH = 1000  # OSS批量删除接口单次最多1000个key
+    
+    def __init__(self, uploader, pending_file: Path, batch_delay: float = 2.0, orphan_ttl_hours: float = 24):
+        self.uploader = uploader
+        self.pending_file = Path(pending_file)
+        self.batch_delay = batch_delay
+        self.orphan_ttl_hours = orphan_ttl_hours
+        self._pending = self._load()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+    
+    def start(self, sweep: bool = True):
+        """启动后台删除线程，可选地先清理遗留的过期音频"""
+        if not self.uploader.is_configured():
+            return
+        with self._lock:
+            if self._thread:
+                return
+            self._thread = threading.Thread(target=self._run, args=(sweep,), name="oss-cleanup", daemon=True)
+            self._thread.start()
+    
+    def enqueue(self, object_key: str):
+        """登记待删除的key，立即返回"""
+        with self._lock:
+            if object_key not in self._pending:
+                self._pending.append(object_key)
+                self._save()
+        self._wakeup.set()
+        self.start(sweep=False)
+    
+    def pending(self) -> List[str]:
+        """尚未删除的key"""
+        with self._lock:
+            return list(self._pending)
+    
+    def flush(self) -> int:
+        """立即删除一批待删除的key，返回成功删除的数量"""
+        with self._lock:
+            batch = self._pending[:self.MAX_BATCH]
+        if not batch:
+            return 0
+        
+        with metrics.span('oss_delete', keys=len(batch)) as span:
+            deleted = self.uploader.delete_audio_batch(batch)
+            span['deleted'] = len(deleted)
+        
+        deleted = set(deleted)
+        with self._lock:
+            self._pending = [key for key in self._pending if key not in deleted]
+            self._save()
+        return len(deleted)
+    
+    def sweep(self) -> int:
+        """把audio/前缀下超过TTL的遗留音频加入删除队列，返回数量"""
+        cutoff = time.time() - self.orphan_ttl_hours * 3600
+        orphans = self.uploader.list_audio(older_than=cutoff)
+        if orphans:
+            print(f"发现 {len(orphans)} 个遗留的OSS音频，加入删除队列")
+            with self._lock:
+                self._pending.extend(key for key in orphans if key not in self._pending)
+                self._save()
+        return len(orphans)
+    
+    def _run(self, sweep: bool):
+        if sweep:
+            try:
+                self.sweep()
+            except Exception as e:
+                print(f"清理遗留OSS音频失败: {e}")
+        
+        retry_delay = self.batch_delay
+        while True:
+            if not self.pending():
+                self._wakeup.wait()
+            self._wakeup.clear()
+            # 稍等片刻，把短时间内的多个删除合并为一次请求
+            time.sleep(self.batch_delay)
+            
+            try:
+                while self.pending():
+                    if not self.flush():
+                        raise Exception("没有key被成功删除")
+                retry_delay = self.batch_delay
+            except Exception as e:
+                print(f"批量删除OSS文件失败，{retry_delay:.0f}秒后重试: {e}")
+                time.sleep(retry_delay)
+                retry_delay = min(retry_delay * 2, 300)
+    
+    def _load(self) -> List[str]:
+        try:
+            return json.loads(self.pending_file.read_text(encoding='utf-8'))
+        except FileNotFoundError:
+            return []
+        except Exception as e:
+            print(f"读取待删除OSS文件列表失败: {e}")
+            return []
+    
+    def _save(self):
+        """先写临时文件再替换，避免写到一半崩溃导致列表损坏"""
+        try:
+            self.pending_file.parent.mkdir(parents=True, exist_ok=True)
+            temp_file = self.pending_file.with_suffix('.tmp')
+            temp_file.write_text(json.dumps(self._pending), encoding='utf-8')
+            temp_file.replace(self.pending_file)
+        except Exception as e:
+            print(f"保存待删除OSS文件列表失败: {e}")
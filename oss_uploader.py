@@ -2,8 +2,9 @@ import oss2
 import uuid
 import time
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import List, Optional
 import config
+from http_pool import connection_pool
 
 class OSSUploader:
     def __init__(self):
@@ -16,12 +17,14 @@ class OSSUploader:
         # 初始化OSS客户端
         if all([self.access_key_id, self.access_key_secret, self.endpoint, self.bucket_name]):
             self.auth = oss2.Auth(self.access_key_id, self.access_key_secret)
-            self.bucket = oss2.Bucket(self.auth, self.endpoint, self.bucket_name)
+            # 使用共享的keep-alive连接池，避免每次上传都重新握手
+            self.bucket = oss2.Bucket(self.auth, self.endpoint, self.bucket_name, session=connection_pool.oss_session)
+            connection_pool.register(self._bucket_origin())
         else:
             self.bucket = None
             print("警告: OSS配置不完整，将使用本地文件路径")
     
-    def upload_audio(self, audio_data: bytes, file_extension: str = "wav") -> tuple[Optional[str], Optional[str]]:
+    def upload_audio(self, audio_data: bytes, file_extension: str = "wav", content_type: str = "audio/wav") -> tuple[Optional[str], Optional[str]]:
         """上传音频文件到OSS并返回(签名URL, object_key)"""
         if not self.bucket:
             print("OSS未配置，无法上传文件")
@@ -35,7 +38,8 @@ class OSSUploader:
             
             # 上传文件到OSS
             print(f"上传音频文件到OSS: {object_key}")
-            result = self.bucket.put_object(object_key, audio_data)
+            result = self.bucket.put_object(object_key, audio_data, headers={'Content-Type': content_type})
+            connection_pool.touch()
             
             if result.status == 200:
                 # 生成带签名的URL，有效期1小时
@@ -59,12 +63,38 @@ class OSSUploader:
         
         try:
             self.bucket.delete_object(object_key)
+            connection_pool.touch()
             print(f"删除OSS文件: {object_key}")
             return True
         except Exception as e:
             print(f"删除OSS文件失败: {e}")
             return False
     
+    def delete_audio_batch(self, object_keys: List[str]) -> List[str]:
+        """批量删除OSS上的音频文件，返回成功删除的key"""
+        if not self.bucket or not object_keys:
+            return []
+        
+        result = self.bucket.batch_delete_objects(object_keys)
+        connection_pool.touch()
+        print(f"批量删除OSS文件: {len(result.deleted_keys)} 个")
+        return result.deleted_keys
+    
+    def list_audio(self, older_than: float, prefix: str = "audio/") -> List[str]:
+        """列出最后修改时间早于older_than（时间戳）的音频文件"""
+        if not self.bucket:
+            return []
+        
+        return [
+            obj.key for obj in oss2.ObjectIterator(self.bucket, prefix=prefix)
+            if obj.last_modified < older_than
+        ]
+    
+    def _bucket_origin(self) -> str:
+        """存储桶的访问地址，用于连接预热"""
+        scheme, _, host = self.endpoint.rpartition('://')
+        return f"{scheme or 'https'}://{self.bucket_name}.{host}/"
+    
     def is_configured(self) -> bool:
         """检查OSS是否已配置"""
         return self.bucket is not None 
\ No newline at end of file
@@ -0,0 +1,181 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional, Tuple
+import config
+from metrics import metrics, load_records, percentile
+
+class CircuitBreaker:
+    """连续失败达到阈值后熔断一段时间，到期后放行一次试探请求"""
+    
+    def __init__(self, failure_threshold: int = 3, reset_seconds: float = 60):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._failures = 0
+        self._opened_at = None
+        self._lock = threading.Lock()
+    
+    def allow(self) -> bool:
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if time.monotonic() - self._opened_at >= self.reset_seconds:
+                # 半开：放行一次，失败会重新计时
+                self._opened_at = time.monotonic()
+                return True
+            return False
+    
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+    
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+    
+    @property
+    def is_open(self) -> bool:
+        return self._opened_at is not None
+
+class Provider:
+    """一个后端（如openai、dashscope），call是阻塞函数，在线程池中执行"""
+    
+    def __init__(self, name: str, call: Callable, timeout: float, breaker: CircuitBreaker = None):
+        self.name = name
+        self.call = call
+        self.timeout = timeout
+        self.breaker = breaker or CircuitBreaker(config.PROVIDER_FAILURE_THRESHOLD, config.PROVIDER_RESET_SECONDS)
+        self.latencies = deque(maxlen=100)  # 最近成功请求的耗时(ms)
+    
+    def p90(self) -> Optional[float]:
+        """最近成功请求耗时的p90（秒），样本太少时返回None"""
+        if len(self.latencies) < 5:
+            return None
+        return percentile(list(self.latencies), 90) / 1000
+
+class ProviderError(Exception):
+    """所有后端都失败了，errors是各后端抛出的异常"""
+    
+    def __init__(self, message: str, errors: List[Exception] = None):
+        super().__init__(message)
+        self.errors = errors or []
+
+class ProviderGroup:
+    """
+    按顺序使用一组后端：每个后端有独立的超时和熔断器，失败时切换到下一个。
+    开启对冲(hedge)时，当前后端超过它自己观测到的p90还没返回，就同时请求下一个后端，采用先返回的有效结果
+    """
+    
+    def __init__(self, name: str, providers: List[Provider], hedge: bool = False, hedge_delay: float = 10,
+                 validate: Callable[[object], bool] = bool, breaker_ignores: tuple = ()):
+        self.name = name
+        self.providers = providers
+        self.hedge = hedge
+        self.hedge_delay = hedge_delay
+        self.validate = validate
+        self.breaker_ignores = breaker_ignores  # 这些异常说明后端可用只是结果不合适，切换后端但不计入熔断
+        # 慢的请求在对冲后仍会在后台跑完，用独立线程池避免占满默认线程池
+        self._executor = ThreadPoolExecutor(max_workers=max(4, 2 * len(providers)), thread_name_prefix=f"{name}-provider")
+        self._seed_latencies()
+    
+    def run(self, *args) -> Tuple[str, object]:
+        """同步调用，返回(后端名称, 结果)，全部失败时抛出ProviderError"""
+        return asyncio.run(self._run(args, metrics.current_trace()))
+    
+    async def _run(self, args: tuple, trace_id: Optional[str]):
+        candidates = [provider for provider in self.providers if provider.breaker.allow()]
+        if not candidates:
+            raise ProviderError(f"{self.name}: 所有后端都处于熔断状态")
+        
+        tasks = {}
+        errors = []
+        next_index = 0
+        
+        def launch():
+            nonlocal next_index
+            provider = candidates[next_index]
+            next_index += 1
+            task = asyncio.ensure_future(self._attempt(provider, args, trace_id))
+            tasks[task] = provider
+        
+        launch()
+        try:
+            while tasks:
+                # 还有备用后端时，最多等待当前后端的p90，然后对冲
+                current = candidates[next_index - 1]
+                wait = None
+                if self.hedge and next_index < len(candidates):
+                    wait = current.p90() or self.hedge_delay
+                done, _ = await asyncio.wait(tasks, timeout=wait, return_when=asyncio.FIRST_COMPLETED)
+                
+                if not done:
+                    print(f"{self.name}: {current.name} 超过 {wait:.1f}s 未返回，同时请求 {candidates[next_index].name}")
+                    metrics.record('provider_hedge', wait * 1000, group=self.name, slow=current.name,
+                                   backup=candidates[next_index].name)
+                    launch()
+                    continue
+                
+                for task in done:
+                    provider = tasks.pop(task)
+                    error = task.exception()
+                    if error is None:
+                        return provider.name, task.result()
+                    errors.append((provider.name, error))
+                
+                # 失败后立即切换到下一个后端
+                if not tasks and next_index < len(candidates):
+                    print(f"{self.name}: {errors[-1][0]} 失败（{errors[-1][1]}），切换到 {candidates[next_index].name}")
+                    launch()
+        finally:
+            for task in tasks:
+                task.cancel()
+        message = "; ".join(f"{name}: {error}" for name, error in errors)
+        raise ProviderError(f"{self.name}: {message}", [error for _, error in errors])
+    
+    async def _attempt(self, provider: Provider, args: tuple, trace_id: Optional[str]):
+        """在线程池中执行一次调用，带超时、结果校验和熔断统计"""
+        def call():
+            metrics.set_trace(trace_id)
+            return provider.call(*args)
+        
+        started = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        try:
+            result = await asyncio.wait_for(loop.run_in_executor(self._executor, call), provider.timeout)
+            if not self.validate(result):
+                raise ValueError("返回结果无效")
+        except Exception as e:
+            # 被对冲的另一个后端抢先返回时抛出的是CancelledError，不会走到这里，也不计为失败
+            if isinstance(e, asyncio.TimeoutError):
+                e = TimeoutError(f"超过 {provider.timeout:g}s 未返回")
+            if not isinstance(e, self.breaker_ignores):
+                provider.breaker.record_failure()
+            metrics.record('provider_call', (time.perf_counter() - started) * 1000, group=self.name,
+                           provider=provider.name, ok=False, error=str(e)[:200], breaker_open=provider.breaker.is_open)
+            raise e
+        
+        elapsed = (time.perf_counter() - started) * 1000
+        provider.breaker.record_success()
+        provider.latencies.append(elapsed)
+        metrics.record('provider_call', elapsed, group=self.name, provider=provider.name, ok=True)
+        return result
+    
+    def _seed_latencies(self):
+        """用历史耗时记录初始化各后端的p90，启动后第一次请求就能对冲"""
+        if not self.hedge:
+            return
+        try:
+            records = load_records(config.METRICS_FILE)
+        except Exception:
+            return
+        by_name = {provider.name: provider for provider in self.providers}
+        for record in records:
+            if record.get('stage') == 'provider_call' and record.get('group') == self.name and record.get('ok'):
+                provider = by_name.get(record.get('provider'))
+                if provider:
+                    provider.latencies.append(record['ms'])
@@ -2,11 +2,97 @@ import openai
 import dashscope
 import tempfile
 import os
-from typing import Optional
+import functools
+import time
+from typing import Callable, Iterator, List, Optional
 import config
 from oss_uploader import OSSUploader
+from oss_cleanup import OSSCleanupQueue
+from context_manager import join_sections, restore_order, split_sections, splice_sections
+from context_model import ContextDocument, parse_patch
+from streaming_asr import StreamingSession, start_streaming_session
+from metrics import metrics
+from providers import Provider, ProviderGroup, ProviderError
+from gemini_client import GeminiClient
+from local_asr import LocalWhisper
+from asr_tasks import TranscriptionTaskManager
+from chunked_asr import ChunkedTranscriber
+from audio_encoder import encode_audio
+from http_pool import connection_pool
+from transcription_cache import TranscriptionCache
 from datetime import datetime
 
+
+def _strip_code_fence(text: str) -> str:
+    """去掉模型返回内容外层的```代码块标记"""
+    text = text.strip()
+    if text.startswith("```"):
+        lines = text.splitlines()[1:]
+        if lines and lines[-1].strip().startswith("```"):
+            lines = lines[:-1]
+        text = "\n".join(lines)
+    return text
+
+def _markdown_check(max_chars: int) -> Callable[[str], Optional[str]]:
+    """流式输出的早期检查：应当很快出现项目标题，且长度不应失控"""
+    def check(partial: str) -> Optional[str]:
+        if len(partial) > max_chars:
+            return f"输出超过 {max_chars} 字符"
+        if len(partial) >= 300 and '## ' not in partial:
+            return "输出中没有项目标题"
+        return None
+    return check
+
+
+def _json_check(partial: str) -> Optional[str]:
+    """流式输出的早期检查：JSON补丁应当以{或[开头"""
+    text = partial.lstrip()
+    if text.startswith("```"):
+        if '\n' not in text:
+            return None
+        text = text.split('\n', 1)[1].lstrip()
+    if text and text[0] not in '{[':
+        return "输出不是JSON"
+    return None
+
+
+def _openai_usage(source, usage: dict):
+    """记录OpenAI返回的提示词token数和其中命中缓存的部分"""
+    usage['prompt_tokens'] = source.prompt_tokens
+    details = getattr(source, 'prompt_tokens_details', None)
+    usage['cached_tokens'] = (getattr(details, 'cached_tokens', None) or 0) if details else 0
+
+
+def _dashscope_usage(source, usage: dict):
+    """记录DashScope返回的提示词token数和其中命中缓存的部分"""
+    usage['prompt_tokens'] = source.get('input_tokens')
+    usage['cached_tokens'] = (source.get('prompt_tokens_details') or {}).get('cached_tokens', 0)
+
+
+def _stable_context(document: ContextDocument) -> str:
+    """
+    按更新时间从早到晚排列项目段落：很久没有变化的项目在前，刚更新过的在后，
+    连续几次合并的提示词就有尽量长的相同前缀，可以命中服务端的提示词缓存
+    """
+    return join_sections(document.header, document.by_staleness())
+
+
+def _known_providers(kind: str, names: List[str], known, default: str) -> List[str]:
+    """去掉配置中未知的后端名称并给出警告，一个都不剩时使用默认后端"""
+    unknown = [name for name in names if name not in known]
+    if unknown:
+        print(f"警告: 未知的{kind}后端 {', '.join(unknown)}，可选: {', '.join(known)}")
+    names = [name for name in names if name in known]
+    if not names:
+        print(f"警告: 没有可用的{kind}后端，使用 {default}")
+        names = [default]
+    return names
+
+
+class MergeAborted(Exception):
+    """流式输出过程中发现模型返回的内容不可用，提前中止"""
+
+
 class SpeechRecognizer:
     def __init__(self):
         # 初始化OpenAI客户端（用于上下文合并）
@@ -19,18 +105,98 @@ class SpeechRecognizer:
         if config.DASHSCOPE_API_KEY:
             dashscope.api_key = config.DASHSCOPE_API_KEY
         
+        # 识别结果缓存
+        self.transcription_cache = TranscriptionCache(
+            config.TRANSCRIPTION_CACHE_DIR,
+            config.TRANSCRIPTION_CACHE_MAX_BYTES,
+            enabled=config.TRANSCRIPTION_CACHE_ENABLED
+        )
+        
         # 初始化OSS上传器
         self.oss_uploader = OSSUploader()
+        self.oss_cleanup = OSSCleanupQueue(
+            self.oss_uploader,
+            config.OSS_PENDING_DELETES_FILE,
+            batch_delay=config.OSS_CLEANUP_BATCH_DELAY,
+            orphan_ttl_hours=config.OSS_ORPHAN_TTL_HOURS
+        )
+        
+        # 识别和合并后端：按顺序失败切换，可选对冲
+        asr_backends = {'dashscope': self._transcribe_with_dashscope, 'openai': self._transcribe_with_openai,
+                        'local': self._transcribe_with_local}
+        asr_default = "dashscope" if config.DASHSCOPE_API_KEY else "openai"
+        asr_names = _known_providers("识别", config.ASR_PROVIDERS or [asr_default], asr_backends, asr_default)
+        self.asr_group = ProviderGroup(
+            'asr',
+            [Provider(name, asr_backends[name], config.ASR_TIMEOUT) for name in asr_names],
+            hedge=config.ASR_HEDGE,
+            hedge_delay=config.ASR_HEDGE_DELAY
+        )
+        
+        # DashScope识别任务的提交与查询
+        self.asr_tasks = TranscriptionTaskManager()
+        
+        # 长录音在停顿处切分，各片段并发识别（各自失败切换和重试）后按顺序拼接
+        self.chunker = ChunkedTranscriber(self.asr_group.run)
+        
+        # 本地识别模型在后台加载，之后常驻内存
+        self.local_asr = LocalWhisper()
+        if 'local' in asr_names:
+            self.local_asr.warm_up()
+        merge_names = _known_providers("合并", config.MERGE_PROVIDERS or [config.CONTEXT_MERGE_PROVIDER.lower()],
+                                       ('openai', 'dashscope', 'gemini'), "openai")
+        self.merge_group = ProviderGroup(
+            'merge',
+            [Provider(name, functools.partial(self._call_single_provider, name), config.MERGE_TIMEOUT) for name in merge_names],
+            hedge=config.MERGE_HEDGE,
+            hedge_delay=config.MERGE_HEDGE_DELAY,
+            breaker_ignores=(MergeAborted,)
+        )
+        
+        # Gemini客户端常驻进程内，认证和连接只建立一次
+        self.gemini = GeminiClient()
+        if "gemini" in merge_names:
+            self.gemini.warm_up()
+    
+    def start_streaming(self, sample_rate: int) -> Optional[StreamingSession]:
+        """开始实时识别会话，未启用或不可用时返回None"""
+        return start_streaming_session(sample_rate)
     
-    def transcribe_audio(self, audio_data: bytes) -> Optional[str]:
-        """将音频数据转换为文字"""
+    def transcribe_audio(self, audio_data: bytes, streaming_session: Optional[StreamingSession] = None,
+                         on_warning: Callable[[str], None] = None) -> Optional[str]:
+        """将音频数据转换为文字，长录音有片段识别失败被跳过时调用on_warning(提示文字)"""
         try:
-            # 使用DashScope进行语音识别
-            if config.DASHSCOPE_API_KEY:
-                return self._transcribe_with_dashscope(audio_data)
-            else:
-                # 如果没有DashScope密钥，回退到OpenAI
-                return self._transcribe_with_openai(audio_data)
+            # 同一段音频识别过就直接返回缓存结果，不产生网络请求
+            engine = self.asr_group.providers[0].name
+            model = {'dashscope': config.DASHSCOPE_ASR_MODEL, 'local': config.LOCAL_ASR_MODEL}.get(engine, "whisper-1")
+            cache_key = self.transcription_cache.key(audio_data, engine, model, ['zh', 'en'])
+            with metrics.span('asr_cache_lookup') as span:
+                cached = self.transcription_cache.get(cache_key)
+                span['hit'] = cached is not None
+            if cached:
+                print(f"命中识别缓存: {cached}")
+                if streaming_session:
+                    streaming_session.finish(0)
+                return cached
+            
+            # 优先使用录音期间已经在进行的实时识别结果
+            if streaming_session:
+                with metrics.span('asr_stream_finish', frames=streaming_session.frames_sent):
+                    text = streaming_session.finish(config.STREAMING_ASR_TIMEOUT)
+                if text:
+                    return text
+                print("实时识别不可用，回退到批量识别")
+            
+            # 按配置顺序使用DashScope/OpenAI/本地模型识别，失败或超时切换到下一个；长录音分段并发识别
+            result = self.chunker.transcribe(audio_data)
+            
+            if result.warning and on_warning:
+                on_warning(result.warning)
+            # 有片段识别失败时不缓存，下次重新识别可以得到完整结果
+            if not result.failed:
+                self.transcription_cache.put(cache_key, result.text, engine=engine, model=model,
+                                             answered_by=",".join(result.providers), audio_bytes=len(audio_data))
+            return result.text
         except Exception as e:
             print(f"语音识别失败: {e}")
             return None
@@ -43,8 +209,13 @@ class SpeechRecognizer:
         try:
             # 上传音频到OSS
             if self.oss_uploader.is_configured():
-                print("上传音频到OSS...")
-                oss_url, object_key = self.oss_uploader.upload_audio(audio_data, "wav")
+                with metrics.span('compress', audio_format=config.AUDIO_UPLOAD_FORMAT, wav_bytes=len(audio_data)) as span:
+                    encoded = encode_audio(audio_data, config.AUDIO_UPLOAD_FORMAT)
+                    span['bytes'] = len(encoded.data)
+                
+                print(f"上传音频到OSS ({encoded.extension}, {len(encoded.data)} bytes)...")
+                with metrics.span('upload', bytes=len(encoded.data), extension=encoded.extension):
+                    oss_url, object_key = self.oss_uploader.upload_audio(encoded.data, encoded.extension, encoded.content_type)
                 if not oss_url:
                     print("OSS上传失败，尝试使用本地文件")
                     return self._transcribe_with_local_file(audio_data)
@@ -52,70 +223,20 @@ class SpeechRecognizer:
                 print("OSS未配置，使用本地文件")
                 return self._transcribe_with_local_file(audio_data)
             
-            # 使用异步语音识别API
+            # 由任务管理器提交异步识别任务并统一查询结果，积压的录音会合并为一个任务
             print("开始语音识别...")
-            task_response = dashscope.audio.asr.Transcription.async_call(
-                model=config.DASHSCOPE_ASR_MODEL,
-                file_urls=[oss_url],
-                language_hints=['zh', 'en']
-            )
-            
-            # 等待识别完成
-            transcription_response = dashscope.audio.asr.Transcription.wait(
-                task=task_response.output.task_id
-            )
-            
-            if transcription_response.status_code == 200:
-                # 提取识别的文本
-                print("识别结果:", transcription_response.output)
-                results = transcription_response.output.get('results', [])
-                if results:
-                    # 获取第一个结果的转录URL
-                    url = results[0].get('transcription_url')
-                    if url:
-                        # 读取转录结果
-                        print("转录URL:", url)
-                        import json
-                        from urllib import request
-                        result = json.loads(request.urlopen(url).read().decode('utf8'))
-                        print("转录结果:", result)
-                        
-                        # 根据新的结果格式提取文本
-                        if 'transcripts' in result and result['transcripts']:
-                            # 获取第一个transcript
-                            transcript = result['transcripts'][0]
-                            if 'text' in transcript:
-                                text = transcript['text']
-                                print("识别文本:", text)
-                                return text
-                            elif 'sentences' in transcript and transcript['sentences']:
-                                # 从sentences中提取文本
-                                sentences = transcript['sentences']
-                                text = ' '.join([s.get('text', '') for s in sentences])
-                                print("识别文本:", text)
-                                return text
-                        
-                        # 如果没有找到transcripts，尝试其他字段
-                        if 'text' in result:
-                            return result['text']
-                
-                print("未找到转录结果")
-                return None
-                
-                print("未找到转录结果")
-                return None
-            else:
-                print(f"DashScope API错误: {transcription_response.output.message}")
-                return None
+            text = self.asr_tasks.transcribe(oss_url)
+            print("识别文本:", text)
+            return text
                 
         except Exception as e:
             print(f"DashScope语音识别失败: {e}")
             return None
         finally:
-            # 删除OSS文件
+            # 删除OSS文件：交给后台批量删除，不占用合并前的时间
             if object_key:
                 print(f"清理OSS文件: {object_key}")
-                self.oss_uploader.delete_audio(object_key)
+                self.oss_cleanup.enqueue(object_key)
     
     def _transcribe_with_local_file(self, audio_data: bytes) -> Optional[str]:
         """使用本地文件进行语音识别（备用方案）"""
@@ -147,8 +268,7 @@ class SpeechRecognizer:
                     url = results[0].get('transcription_url')
                     if url:
                         import json
-                        from urllib import request
-                        result = json.loads(request.urlopen(url).read().decode('utf8'))
+                        result = json.loads(connection_pool.get(url).decode('utf8'))
                         
                         # 根据新的结果格式提取文本
                         if 'transcripts' in result and result['transcripts']:
@@ -178,29 +298,56 @@ class SpeechRecognizer:
     def _transcribe_with_openai(self, audio_data: bytes) -> Optional[str]:
         """使用OpenAI进行语音识别（备用方案）"""
         try:
-            response = self.openai_client.audio.transcriptions.create(
-                model="whisper-1",
-                file=("audio.wav", audio_data, "audio/wav"),
-                language="zh"  # 支持中文
-            )
+            encoded = encode_audio(audio_data, config.AUDIO_UPLOAD_FORMAT)
+            with metrics.span('asr_openai', bytes=len(encoded.data), extension=encoded.extension):
+                response = self.openai_client.audio.transcriptions.create(
+                    model="whisper-1",
+                    file=(f"audio.{encoded.extension}", encoded.data, encoded.content_type),
+                    language="zh"  # 支持中文
+                )
             return response.text
         except Exception as e:
             print(f"OpenAI语音识别失败: {e}")
             return None
     
-    def merge_context(self, existing_context: str, new_content: str) -> str:
-        """使用AI合并上下文"""
+    def _transcribe_with_local(self, audio_data: bytes) -> Optional[str]:
+        """使用本地faster-whisper模型识别，不需要网络"""
         try:
+            return self.local_asr.transcribe(audio_data)
+        except Exception as e:
+            print(f"本地语音识别失败: {e}")
+            return None
+    
+    def merge_context(self, existing_context: str, new_content: str, document: Optional[ContextDocument] = None,
+                      on_progress: Callable[[int], None] = None) -> str:
+        """
+        使用AI合并上下文，document是existing_context解析后的结果，不传时按需解析。
+        流式输出时每收到一段内容调用on_progress(已收到的字符数)
+        """
+        try:
+            mode = config.CONTEXT_MERGE_MODE.lower()
+            if document is None or document.content != existing_context:
+                document = ContextDocument(existing_context)
+            
+            # 段落级增量合并：只发送受影响的项目段落
+            if mode == "section":
+                merged = self._merge_sections(document, new_content, on_progress)
+                if merged is not None:
+                    return merged
+                print("段落级合并未返回有效结果，回退到全量合并")
+            
+            # JSON补丁合并：模型只返回改动，本地渲染markdown
+            if mode == "json":
+                merged = self._merge_json(document, new_content, on_progress)
+                if merged is not None:
+                    return merged
+                print("JSON补丁无效，回退到全量合并")
+            
+            # 固定的说明在前，上下文按更新时间排列，本次的新内容和当前时间放在最后
             prompt = f"""
 你会获得一个项目的新进展，请你根据新的描述信息，提取出所属项目，然后提取出其中提到的目标、当前状态、todo、block点等信息(如果没有，则无需合并）。
 然后将新的内容与现有的上下文进行智能合并。保持markdown格式，按项目分组。请注意你不能发明新的内容，只能按照原始的新旧内容合并在一起，如果新旧内容存在冲突条目，则用新内容覆盖旧内容。
 
-现有项目信息：
-{existing_context}
-
-更新项目信息：
-{new_content}
-
 请按照以下格式合并：
 - 每个项目使用二级标题（## 项目名）
 - 从新内容中整理出：更新时间、最终目标、当前状态、todo列表、block点
@@ -208,26 +355,237 @@ class SpeechRecognizer:
 - 如果是新项目，请创建新的项目段落
 - 保持时间顺序和逻辑性
 
+现有项目信息：
+{_stable_context(document)}
+
+更新项目信息：
+{new_content}
+
 当前时间:
 {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
 
 请返回合并后的完整markdown内容：
 """
             
-            # 根据配置选择提供商
-            if config.CONTEXT_MERGE_PROVIDER.lower() == "dashscope":
-                return self._merge_with_dashscope(prompt)
-            elif config.CONTEXT_MERGE_PROVIDER.lower() == "gemini":
-                return self._merge_with_gemini(prompt)
-            else:
-                return self._merge_with_openai(prompt)
+            max_chars = 2 * len(existing_context) + len(new_content) + 4000
+            merged = self._call_merge_provider(prompt, on_progress, _markdown_check(max_chars))
+            # 提示词中的项目顺序与文件不同，恢复文件原来的顺序
+            return restore_order(existing_context, merged)
                 
         except Exception as e:
             print(f"上下文合并失败: {e}")
             # 如果AI合并失败，简单拼接
             return f"{existing_context}\n\n## 新内容\n{new_content}"
     
-    def _merge_with_openai(self, prompt: str) -> str:
+    def _call_merge_provider(self, prompt: str, on_progress: Callable[[int], None] = None,
+                             check: Callable[[str], Optional[str]] = None) -> str:
+        """按配置的后端顺序调用，失败、超时或熔断时切换到下一个，全部失败时抛出ProviderError"""
+        _, response = self.merge_group.run(prompt, on_progress, check)
+        return response
+    
+    def _call_single_provider(self, provider: str, prompt: str, on_progress: Callable[[int], None] = None,
+                              check: Callable[[str], Optional[str]] = None) -> str:
+        """
+        调用一个合并后端。
+        开启MERGE_STREAMING时使用流式输出，check(已收到的内容)返回错误原因时立即中止并抛出MergeAborted。
+        后端返回的提示词token数和命中缓存的token数记录在llm_call中
+        """
+        streaming = config.MERGE_STREAMING and provider in ("openai", "dashscope", "gemini")
+        with metrics.span('llm_call', provider=provider, prompt_chars=len(prompt), streaming=streaming) as span:
+            if streaming:
+                response = self._stream_merge(provider, prompt, on_progress, check, span)
+            elif provider == "dashscope":
+                response = self._merge_with_dashscope(prompt, span)
+            elif provider == "gemini":
+                response = self._merge_with_gemini(prompt, span)
+            else:
+                response = self._merge_with_openai(prompt, span)
+            span['response_chars'] = len(response or '')
+        return response
+    
+    def _stream_merge(self, provider: str, prompt: str, on_progress: Callable[[int], None],
+                      check: Callable[[str], Optional[str]], span: dict) -> str:
+        """
+        逐段接收模型输出，记录首个token的耗时。
+        收到的内容只用于进度显示和提前检查，不会边收边写入上下文文件：合并结果要在完整返回后恢复项目顺序、
+        与期间被修改的文件做三方合并并记录一个历史版本，中途写入的半份内容在中止或切换后端时会丢掉没输出到的项目
+        """
+        started = time.perf_counter()
+        if provider == "dashscope":
+            stream = self._stream_with_dashscope(prompt, span)
+        elif provider == "gemini":
+            stream = self.gemini.stream(prompt, span)
+        else:
+            stream = self._stream_with_openai(prompt, span)
+        text = ""
+        try:
+            for delta in stream:
+                if not text:
+                    span['ttft_ms'] = round((time.perf_counter() - started) * 1000, 1)
+                text += delta
+                if on_progress:
+                    on_progress(len(text))
+                reason = check(text) if check else None
+                if reason:
+                    span['aborted'] = reason
+                    print(f"模型输出不可用，提前中止: {reason}")
+                    raise MergeAborted(reason)
+        finally:
+            # 提前中止时关闭连接，服务端随之停止生成
+            stream.close()
+        return text
+    
+    def _stream_with_openai(self, prompt: str, usage: dict = None) -> Iterator[str]:
+        """使用OpenAI流式合并上下文，最后一个数据块带有token用量"""
+        stream = self.openai_client.chat.completions.create(
+            model=config.CONTEXT_MERGE_MODEL,
+            messages=[
+                {"role": "system", "content": "你是一个专业的上下文管理助手，擅长整理和合并项目信息。"},
+                {"role": "user", "content": prompt}
+            ],
+            temperature=0.3,
+            stream=True,
+            stream_options={"include_usage": True}
+        )
+        try:
+            for chunk in stream:
+                if chunk.usage and usage is not None:
+                    _openai_usage(chunk.usage, usage)
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        finally:
+            stream.close()
+    
+    def _stream_with_dashscope(self, prompt: str, usage: dict = None) -> Iterator[str]:
+        """使用DashScope流式合并上下文"""
+        responses = dashscope.Generation.call(
+            model=config.CONTEXT_MERGE_MODEL,
+            messages=[
+                {"role": "system", "content": "你是一个专业的上下文管理助手，擅长整理和合并项目信息。"},
+                {"role": "user", "content": prompt}
+            ],
+            temperature=0.3,
+            stream=True,
+            incremental_output=True
+        )
+        for response in responses:
+            if response.status_code != 200:
+                raise Exception(f"DashScope API错误: {response.message}")
+            if response.usage and usage is not None:
+                _dashscope_usage(response.usage, usage)
+            if response.output and response.output.text:
+                yield response.output.text
+    
+    def _merge_sections(self, document: ContextDocument, new_content: str,
+                        on_progress: Callable[[int], None] = None) -> Optional[str]:
+        """段落级合并，返回None表示需要回退到全量合并"""
+        names = document.names()
+        if not names:
+            return None
+        
+        targets = self._select_sections(names, new_content)
+        print(f"段落级合并，涉及项目: {targets or '新项目'}")
+        
+        selected = "\n".join(body.strip() + "\n" for name, body in document.by_staleness()
+                             if name in targets) or "（无，请创建新的项目段落）"
+        
+        prompt = f"""
+你会获得一个项目的新进展，请你根据新的描述信息，提取出其中提到的目标、当前状态、todo、block点等信息(如果没有，则无需合并）。
+然后将新的内容与下面给出的相关项目段落进行智能合并。请注意你不能发明新的内容，只能按照原始的新旧内容合并在一起，如果新旧内容存在冲突条目，则用新内容覆盖旧内容。
+
+请按照以下格式合并：
+- 每个项目使用二级标题（## 项目名），已有项目必须保持标题不变
+- 从新内容中整理出：更新时间、最终目标、当前状态、todo列表、block点
+- 如果新内容涉及下面的项目，请更新该项目的信息
+- 如果是新项目，请创建新的项目段落
+- 只返回被更新或新建的项目段落，不要返回其他内容
+
+相关项目段落：
+{selected}
+
+更新项目信息：
+{new_content}
+
+当前时间:
+{datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
+
+请返回更新后的项目段落markdown内容：
+"""
+        
+        max_chars = 2 * len(selected) + len(new_content) + 4000
+        try:
+            response = _strip_code_fence(self._call_merge_provider(prompt, on_progress, _markdown_check(max_chars)))
+        except (MergeAborted, ProviderError):
+            return None
+        _, updates = split_sections(response)
+        if not updates:
+            return None
+        
+        return splice_sections(document.content, response)
+    
+    def _merge_json(self, document: ContextDocument, new_content: str,
+                    on_progress: Callable[[int], None] = None) -> Optional[str]:
+        """让模型只返回JSON补丁，由本地应用并渲染，返回None表示需要回退到全量合并"""
+        prompt = f"""
+你会获得一个项目的新进展，请你根据新的描述信息，提取出所属项目，以及其中提到的目标、当前状态、todo、block点的变化。
+请注意你不能发明新的内容，只能使用新内容中提到的信息。不要返回没有变化的内容。
+
+请只返回如下格式的JSON，不要返回其他内容：
+{{"updates": [{{"project": "项目名", "fields": {{"目标": "新的最终目标", "状态": "新的当前状态"}}, "todo_add": ["新增的todo"], "todo_done": ["已完成的todo"], "block_add": ["新增的block点"], "block_resolved": ["已解决的block点"]}}]}}
+
+- project必须与现有项目的二级标题完全一致；如果是新项目，使用新项目的名称
+- fields中只写有变化的字段，没有变化的键可以省略
+- todo_done和block_resolved使用现有条目的原文
+- 如果新内容中没有可合并的信息，返回 {{"updates": []}}
+
+现有项目信息：
+{_stable_context(document)}
+
+更新项目信息：
+{new_content}
+"""
+        
+        try:
+            response = _strip_code_fence(self._call_merge_provider(prompt, on_progress, _json_check))
+        except (MergeAborted, ProviderError):
+            return None
+        try:
+            updates = parse_patch(response)
+        except ValueError as e:
+            print(f"JSON补丁校验失败: {e}")
+            return None
+        
+        print(f"JSON补丁合并，涉及项目: {[update['project'] for update in updates] or '无'}")
+        return document.apply_patch(updates, datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+    
+    def _select_sections(self, names: List[str], new_content: str) -> List[str]:
+        """找出新内容涉及的项目段落"""
+        lowered = new_content.lower()
+        matched = [name for name in names if name.lower() in lowered]
+        if matched:
+            return matched
+        
+        # 新内容中没有直接出现项目名时，只发送项目名列表让模型判断
+        project_list = "\n".join(f"- {name}" for name in names)
+        prompt = f"""
+已有项目列表：
+{project_list}
+
+新的项目进展：
+{new_content}
+
+请判断新的项目进展属于上面哪些项目，每行返回一个项目名，必须与列表中的名称完全一致。
+如果都不属于，请只返回：无
+"""
+        response = self._call_merge_provider(prompt)
+        selected = []
+        for line in response.splitlines():
+            name = line.strip().lstrip('-*').strip()
+            if name in names and name not in selected:
+                selected.append(name)
+        return selected
+    
+    def _merge_with_openai(self, prompt: str, usage: dict = None) -> str:
         """使用OpenAI合并上下文"""
         try:
             response = self.openai_client.chat.completions.create(
@@ -239,12 +597,14 @@ class SpeechRecognizer:
                 temperature=0.3
             )
             
+            if response.usage and usage is not None:
+                _openai_usage(response.usage, usage)
             return response.choices[0].message.content
         except Exception as e:
             print(f"OpenAI上下文合并失败: {e}")
             raise e
     
-    def _merge_with_dashscope(self, prompt: str) -> str:
+    def _merge_with_dashscope(self, prompt: str, usage: dict = None) -> str:
         """使用DashScope合并上下文"""
         try:
             response = dashscope.Generation.call(
@@ -258,6 +618,8 @@ class SpeechRecognizer:
             
             if response.status_code == 200:
                 print(response.output)
+                if response.usage and usage is not None:
+                    _dashscope_usage(response.usage, usage)
                 return response.output.text
             else:
                 print(f"DashScope上下文合并失败: {response.message}")
@@ -267,51 +629,12 @@ class SpeechRecognizer:
             print(f"DashScope上下文合并失败: {e}")
             raise e
     
-    def _merge_with_gemini(self, prompt: str) -> str:
-        """使用Gemini命令行合并上下文"""
+    def _merge_with_gemini(self, prompt: str, usage: dict = None) -> str:
+        """使用常驻的Gemini客户端合并上下文"""
         try:
-            import subprocess
-            import json
-            
-            # 检查是否设置了Google Cloud项目
-            if not config.GOOGLE_CLOUD_PROJECT:
-                raise Exception("未设置 GOOGLE_CLOUD_PROJECT 环境变量")
-            
-            # 设置环境变量
-            env = os.environ.copy()
-            env['GOOGLE_CLOUD_PROJECT'] = config.GOOGLE_CLOUD_PROJECT
-            
-            # 构建gemini命令
-            cmd = ['gemini', '-p', prompt]
-            
-            print(f"调用Gemini命令: {' '.join(cmd)}")
-            
-            # 执行命令
-            result = subprocess.run(
-                cmd,
-                capture_output=True,
-                text=True,
-                env=env,
-                timeout=60  # 60秒超时
-            )
-            
-            if result.returncode == 0:
-                # 成功执行
-                response_text = result.stdout.strip()
-                print(f"Gemini响应: {response_text[:100]}...")
-                return response_text
-            else:
-                # 执行失败
-                error_msg = result.stderr.strip()
-                print(f"Gemini命令执行失败: {error_msg}")
-                raise Exception(f"Gemini命令执行失败: {error_msg}")
-                
-        except subprocess.TimeoutExpired:
-            print("Gemini命令执行超时")
-            raise Exception("Gemini命令执行超时")
-        except FileNotFoundError:
-            print("未找到gemini命令，请确保已安装Google Cloud CLI")
-            raise Exception("未找到gemini命令，请确保已安装Google Cloud CLI")
+            response_text = self.gemini.generate(prompt, usage)
+            print(f"Gemini响应: {response_text[:100]}...")
+            return response_text
         except Exception as e:
             print(f"Gemini上下文合并失败: {e}")
             raise e 
\ No newline at end of file
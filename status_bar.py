@@ -1,17 +1,31 @@
 import rumps
 import threading
 from typing import Callable
+import config
+from status_channel import StatusChannel
 
 class StatusBarApp(rumps.App):
-    def __init__(self, on_backup: Callable = None):
+    """
+    状态栏应用。set_*和show_notification可在任意线程调用，只修改StatusChannel中的状态，不调用UI接口；
+    主线程定时器每STATUS_REFRESH_INTERVAL秒把最新状态刷新到标题和状态项，并按频率限制弹出通知
+    """
+    
+    def __init__(self, on_backup: Callable = None, on_export_history: Callable = None):
         super().__init__("🎤", quit_button=None)
         self.on_backup = on_backup
-        self.is_recording = False
+        self.on_export_history = on_export_history
+        self.channel = StatusChannel(min_interval=config.NOTIFICATION_MIN_INTERVAL)
+        self._shown = (self.title, None)
         self._setup_menu()
+        self._timer = rumps.Timer(self._flush, config.STATUS_REFRESH_INTERVAL)
+        self._timer.start()
     
     def _setup_menu(self):
         """设置菜单"""
+        self.status_item = rumps.MenuItem("空闲")  # 当前各录音的处理阶段和已用时间
         self.menu = [
+            self.status_item,
+            None,  # 分隔线
             rumps.MenuItem("备份上下文", callback=self._backup_context),
             rumps.MenuItem("打开上下文文件", callback=self._open_context_file),
             rumps.MenuItem("打开历史记录", callback=self._open_history_file),
@@ -21,11 +35,30 @@ class StatusBarApp(rumps.App):
     
     def set_recording_state(self, recording: bool):
         """设置录音状态"""
-        self.is_recording = recording
-        if recording:
-            self.title = "🔴"  # 红色表示正在录音
-        else:
-            self.title = "🎤"  # 黑色表示未录音
+        self.channel.set_recording(recording)
+    
+    def set_queue_depth(self, depth: int):
+        """设置处理队列中的录音数量"""
+        self.channel.set_queue_depth(depth)
+    
+    def set_progress(self, progress: str = None):
+        """设置标题后显示的处理进度，None表示清除"""
+        self.channel.set_progress(progress)
+    
+    def set_stage(self, key, stage: str = None):
+        """设置某段录音当前的处理阶段（显示在状态项中，不弹通知），None表示处理结束"""
+        self.channel.set_stage(key, stage)
+    
+    def _flush(self, _):
+        """主线程定时器：刷新标题和状态项，弹出到期的通知"""
+        title, status = self.channel.render()
+        if (title, status) != self._shown:
+            self._shown = (title, status)
+            self.title = title
+            self.status_item.title = status or "空闲"
+        notification = self.channel.take_notification()
+        if notification:
+            rumps.notification(*notification)
     
     def _backup_context(self, _):
         """备份上下文"""
@@ -37,7 +70,6 @@ class StatusBarApp(rumps.App):
     def _open_context_file(self, _):
         """打开上下文文件"""
         import subprocess
-        import config
         try:
             subprocess.run(["open", str(config.CONTEXT_FILE)])
         except Exception as e:
@@ -46,9 +78,9 @@ class StatusBarApp(rumps.App):
     def _open_history_file(self, _):
         """打开历史记录文件"""
         import subprocess
-        import config
         try:
-            subprocess.run(["open", str(config.HISTORY_FILE)])
+            history_file = self.on_export_history() if self.on_export_history else config.HISTORY_FILE
+            subprocess.run(["open", str(history_file)])
         except Exception as e:
             rumps.notification("错误", "打开文件失败", str(e))
     
@@ -57,5 +89,5 @@ class StatusBarApp(rumps.App):
         rumps.quit_application()
     
     def show_notification(self, title: str, subtitle: str, message: str):
-        """显示通知"""
-        rumps.notification(title, subtitle, message) 
\ No newline at end of file
+        """显示通知（由主线程按频率限制弹出，短时间内同一标题的多条合并为最新的一条）"""
+        self.channel.notify(title, subtitle, message)
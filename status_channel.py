@@ -0,0 +1,82 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Tuple
+
+Notification = Tuple[str, str, str]  # (标题, 副标题, 内容)
+
+class StatusChannel:
+    """
+    工作线程与状态栏之间的通道：工作线程只在锁内修改状态、把通知放入队列，不调用任何UI接口，不会被UI阻塞；
+    UI线程定时调用render()和take_notification()，把这段时间内的多次更新合并成一次标题/状态项刷新，
+    系统通知每min_interval秒最多弹出一条，期间积累的同一标题的通知合并为最新的一条，
+    不同标题的通知按先后依次弹出（识别失败不会被之后的处理完成盖住）
+    """
+    
+    def __init__(self, min_interval: float = 3.0, clock: Callable[[], float] = time.monotonic):
+        self.min_interval = min_interval
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._recording = False
+        self._queue_depth = 0
+        self._progress: Optional[str] = None
+        self._stages: Dict[object, Tuple[str, float]] = {}  # 任务 -> (阶段, 开始时刻)
+        self._pending: "OrderedDict[str, list]" = OrderedDict()  # 标题 -> [副标题, 内容, 被合并掉的条数]
+        self._last_shown: Optional[float] = None
+        self.coalesced = 0  # 被合并掉的通知数
+    
+    def set_recording(self, recording: bool):
+        with self._lock:
+            self._recording = recording
+    
+    def set_queue_depth(self, depth: int):
+        with self._lock:
+            self._queue_depth = depth
+    
+    def set_progress(self, progress: Optional[str]):
+        """标题后显示的处理进度（例如合并时已收到的字数），None表示清除"""
+        with self._lock:
+            self._progress = progress
+    
+    def set_stage(self, key, stage: Optional[str]):
+        """设置某个任务当前所处的阶段，阶段改变时重新计时，None表示该任务已结束"""
+        with self._lock:
+            if stage is None:
+                self._stages.pop(key, None)
+            elif self._stages.get(key, (None,))[0] != stage:
+                self._stages[key] = (stage, self._clock())
+    
+    def notify(self, title: str, subtitle: str, message: str):
+        """加入一条系统通知，由UI线程按频率限制弹出"""
+        with self._lock:
+            pending = self._pending.get(title)
+            if pending is None:
+                self._pending[title] = [subtitle, message, 0]
+                return
+            self.coalesced += 1
+            if pending[:2] != [subtitle, message]:
+                pending[:] = [subtitle, message, pending[2] + 1]
+    
+    def render(self) -> Tuple[str, Optional[str]]:
+        """返回(状态栏标题, 状态项文字)，状态项列出各任务的阶段和已用时间，没有任务时为None"""
+        now = self._clock()
+        with self._lock:
+            title = "🔴" if self._recording else "🎤"  # 红色表示正在录音
+            if self._queue_depth:
+                title += f" {self._queue_depth}"  # 处理中的录音数量
+            if self._progress:
+                title += f" {self._progress}"
+            stages = [f"{stage} {now - started:.1f}s" for stage, started in self._stages.values()]
+        return title, " · ".join(stages) if stages else None
+    
+    def take_notification(self) -> Optional[Notification]:
+        """取出现在应当弹出的通知：距上一条不足min_interval秒时返回None，否则返回最早的标题下最新的一条"""
+        now = self._clock()
+        with self._lock:
+            if not self._pending or (self._last_shown is not None and now - self._last_shown < self.min_interval):
+                return None
+            title, (subtitle, message, skipped) = self._pending.popitem(last=False)
+            self._last_shown = now
+        if skipped:
+            subtitle = f"{subtitle}（另有 {skipped} 条通知）"
+        return title, subtitle, message
@@ -0,0 +1,91 @@
+import threading
+import time
+from typing import Optional
+from dashscope.audio.asr import Recognition, RecognitionCallback, RecognitionResult
+import config
+
+class StreamingSession(RecognitionCallback):
+    """一次实时识别会话：按住快捷键时持续发送音频帧，松开后只需等待最后一句结果"""
+
+    def __init__(self, model: str, sample_rate: int):
+        self.sentences = {}
+        self.error: Optional[str] = None
+        self.finished = threading.Event()
+        self.frames_sent = 0
+        self.recognition = Recognition(
+            model=model,
+            format='pcm',
+            sample_rate=sample_rate,
+            callback=self,
+            language_hints=['zh', 'en']
+        )
+
+    def start(self):
+        """建立连接，连接过程在SDK的后台线程中完成，不阻塞录音"""
+        self.recognition.start()
+
+    def feed(self, frame: bytes):
+        """发送一段PCM音频帧（在录音回调中调用，只做入队）"""
+        if self.error:
+            return
+        try:
+            self.recognition.send_audio_frame(frame)
+            self.frames_sent += 1
+        except Exception as e:
+            self.error = str(e)
+
+    def finish(self, timeout: float) -> Optional[str]:
+        """结束发送并等待最终结果，超时或出错时返回None"""
+        started = time.time()
+        stopper = threading.Thread(target=self._stop, daemon=True)
+        stopper.start()
+        stopper.join(timeout)
+
+        if stopper.is_alive():
+            print(f"实时识别在 {timeout} 秒内未返回最终结果")
+            return None
+        if self.error:
+            print(f"实时识别失败: {self.error}")
+            return None
+
+        text = self.text()
+        print(f"实时识别完成，收尾耗时 {time.time() - started:.2f}s，识别文本: {text}")
+        return text or None
+
+    def text(self) -> str:
+        """按句子开始时间拼接当前识别结果"""
+        return ''.join(text for _, text in sorted(self.sentences.items()))
+
+    def _stop(self):
+        try:
+            self.recognition.stop()
+        except Exception as e:
+            if not self.error:
+                self.error = str(e)
+        finally:
+            self.finished.set()
+
+    def on_event(self, result: RecognitionResult):
+        """收到中间或最终结果，同一句话的中间结果会被后续结果覆盖"""
+        sentence = result.get_sentence()
+        if isinstance(sentence, dict) and 'text' in sentence:
+            self.sentences[sentence.get('begin_time', 0)] = sentence['text']
+
+    def on_error(self, result: RecognitionResult):
+        self.error = result.message or "未知错误"
+
+    def on_complete(self):
+        self.finished.set()
+
+def start_streaming_session(sample_rate: int) -> Optional[StreamingSession]:
+    """开始实时识别，不可用时返回None并由调用方使用批量识别"""
+    if not config.ASR_STREAMING or not config.DASHSCOPE_API_KEY:
+        return None
+
+    try:
+        session = StreamingSession(config.DASHSCOPE_REALTIME_ASR_MODEL, sample_rate)
+        session.start()
+        return session
+    except Exception as e:
+        print(f"实时识别启动失败，将使用批量识别: {e}")
+        return None
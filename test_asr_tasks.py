@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+识别任务管理测试脚本
+启动一个本地的假DashScope任务接口（提交任务、查询任务、下载转录结果），
+测试多段录音合并为一个任务后的结果分发、单段失败的隔离和按实际耗时安排的查询（不需要API密钥）
+"""
+
+import random
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from aiohttp import web
+import dashscope
+from fake_server import start_fake_server
+
+class FakeDashScope:
+    """
+    假的录音文件识别接口：任务耗时为 base_seconds + 每段录音 file_seconds + 0~jitter秒的随机波动，
+    file_url中含有bad的录音识别失败，malformed为'submit'/'results'时返回缺少task_id的提交响应/格式错误的结果
+    """
+    
+    def __init__(self, base_seconds: float = 1.0, file_seconds: float = 0.05, jitter: float = 0, seed: int = 0):
+        self.base_seconds = base_seconds
+        self.file_seconds = file_seconds
+        self.jitter = jitter
+        self.rng = random.Random(seed)
+        self.port = None
+        self.malformed = None
+        self.reset()
+    
+    def reset(self):
+        self.tasks = {}
+        self.submits = 0
+        self.polls = 0
+        self.lags = []  # 任务完成到客户端查询到结果之间的延迟（秒）
+    
+    @staticmethod
+    def text_for(url: str) -> str:
+        return f"识别结果:{url}"
+    
+    async def submit(self, request):
+        body = await request.json()
+        self.submits += 1
+        urls = body['input']['file_urls']
+        task_id = f"task-{self.submits}"
+        if self.malformed == 'submit':
+            return web.json_response({"request_id": task_id, "output": {"task_status": "PENDING"}})
+        self.tasks[task_id] = {
+            'urls': urls,
+            'ready': time.monotonic() + self.base_seconds + self.file_seconds * len(urls) + self.rng.uniform(0, self.jitter),
+            'reported': False,
+        }
+        return web.json_response({"request_id": task_id, "output": {"task_id": task_id, "task_status": "PENDING"}})
+    
+    async def fetch(self, request):
+        self.polls += 1
+        task_id = request.match_info['task_id']
+        task = self.tasks[task_id]
+        now = time.monotonic()
+        if now < task['ready']:
+            return web.json_response({"request_id": "poll", "output": {"task_id": task_id, "task_status": "RUNNING"}})
+        
+        if not task['reported']:
+            task['reported'] = True
+            self.lags.append(now - task['ready'])
+        results = []
+        for index, url in enumerate(task['urls']):
+            if 'bad' in url:
+                results.append({"file_url": url, "subtask_status": "FAILED", "code": "InvalidFile",
+                                "message": "音频格式不正确"})
+            else:
+                results.append({"file_url": url, "subtask_status": "SUCCEEDED",
+                                "transcription_url": f"http://127.0.0.1:{self.port}/transcripts/{task_id}/{index}.json"})
+        if self.malformed == 'results':
+            results = "不是列表"
+        return web.json_response({"request_id": "poll", "output": {
+            "task_id": task_id, "task_status": "SUCCEEDED", "results": results
+        }})
+    
+    async def transcript(self, request):
+        task = self.tasks[request.match_info['task_id']]
+        url = task['urls'][int(request.match_info['index'])]
+        return web.json_response({"file_url": url, "transcripts": [{"channel_id": 0, "text": self.text_for(url)}]})
+
+def start_fake_dashscope(fake: FakeDashScope) -> int:
+    """在后台线程中启动假服务，并把DashScope SDK指向它，返回端口号"""
+    fake.port = start_fake_server([
+        ('POST', '/api/v1/services/audio/asr/transcription', fake.submit),
+        ('GET', '/api/v1/tasks/{task_id}', fake.fetch),
+        ('GET', '/transcripts/{task_id}/{index}.json', fake.transcript),
+    ])
+    dashscope.base_http_api_url = f"http://127.0.0.1:{fake.port}/api/v1"
+    dashscope.api_key = dashscope.api_key or "fake"
+    return fake.port
+
+def test_asr_tasks():
+    """测试任务提交、合并、分发与查询节奏"""
+    print("📮 识别任务管理测试")
+    print("=" * 50)
+    
+    from metrics import isolate_metrics
+    isolate_metrics()
+    from asr_tasks import TranscriptionTaskManager
+    
+    fake = FakeDashScope(base_seconds=1.0)
+    start_fake_dashscope(fake)
+    manager = TranscriptionTaskManager(batch_window=0.3, max_batch=10, min_interval=0.1, max_interval=2)
+    
+    url = "https://bucket/audio/single.wav"
+    started = time.perf_counter()
+    text = manager.transcribe(url)
+    if text != fake.text_for(url) or fake.submits != 1:
+        print(f"❌ 单段录音识别结果不正确: {text}")
+        return False
+    print(f"✅ 空闲时立即提交，单段录音 {time.perf_counter() - started:.2f}s 完成")
+    
+    # 第一段录音识别期间又来了6段（积压），应合并为一个任务
+    fake.reset()
+    urls = [f"https://bucket/audio/backlog-{i}.wav" for i in range(7)]
+    with ThreadPoolExecutor(max_workers=7) as pool:
+        first = pool.submit(manager.transcribe, urls[0])
+        time.sleep(0.1)
+        rest = [pool.submit(manager.transcribe, url) for url in urls[1:]]
+        texts = [first.result()] + [future.result() for future in rest]
+    if texts != [fake.text_for(url) for url in urls]:
+        print(f"❌ 合并任务的结果没有分发到对应的录音: {texts}")
+        return False
+    if fake.submits != 2:
+        print(f"❌ 积压的录音没有合并提交，共提交 {fake.submits} 个任务")
+        return False
+    print("✅ 积压的6段录音合并为一个任务，结果按file_url分发到各自的录音")
+    
+    fake.reset()
+    good = ["https://bucket/audio/ok-1.wav", "https://bucket/audio/ok-2.wav"]
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        blocker = pool.submit(manager.transcribe, "https://bucket/audio/blocker.wav")
+        time.sleep(0.1)
+        futures = [pool.submit(manager.transcribe, url) for url in good + ["https://bucket/audio/bad.wav"]]
+        blocker.result()
+        results = []
+        for future in futures:
+            try:
+                results.append(future.result())
+            except Exception as e:
+                results.append(e)
+    if results[:2] != [fake.text_for(url) for url in good] or not isinstance(results[2], Exception):
+        print(f"❌ 单段录音失败影响了同一任务中的其他录音: {results}")
+        return False
+    print(f"✅ 同一任务中单段录音失败不影响其他录音（{results[2]}）")
+    
+    # 格式错误的响应只让相关的录音失败，查询线程继续工作
+    for malformed in ('submit', 'results'):
+        fake.reset()
+        fake.malformed = malformed
+        try:
+            manager.transcribe(f"https://bucket/audio/malformed-{malformed}.wav", timeout=5)
+            print(f"❌ 格式错误的响应（{malformed}）没有让录音失败")
+            return False
+        except FutureTimeoutError:
+            print(f"❌ 格式错误的响应（{malformed}）导致录音一直没有结果")
+            return False
+        except Exception as e:
+            error = e
+        fake.malformed = None
+        url = f"https://bucket/audio/after-{malformed}.wav"
+        if manager.transcribe(url, timeout=5) != fake.text_for(url):
+            print(f"❌ 格式错误的响应（{malformed}）之后识别没有恢复")
+            return False
+        print(f"✅ 格式错误的响应（{malformed}）只让该录音失败，之后的识别正常（{error}）")
+    
+    # 已经观察到任务耗时约1秒，之后的任务在预计完成前不查询
+    fake.reset()
+    for i in range(3):
+        manager.transcribe(f"https://bucket/audio/paced-{i}.wav")
+    polls_per_task = fake.polls / fake.submits
+    max_lag = max(fake.lags)
+    print(f"预计耗时 {manager.expected_duration():.2f}s，每个任务平均查询 {polls_per_task:.1f} 次，"
+          f"完成后最多 {max_lag * 1000:.0f}ms 查询到结果")
+    if polls_per_task > 3 or max_lag > 0.5:
+        print("❌ 查询节奏没有按观察到的任务耗时调整")
+        return False
+    print("✅ 按观察到的任务耗时安排查询")
+    
+    # 等待方超时放弃后，任务不再被查询
+    fake.reset()
+    fake.base_seconds = 30
+    try:
+        manager.transcribe("https://bucket/audio/slow.wav", timeout=0.3)
+        print("❌ 识别任务没有超时")
+        return False
+    except FutureTimeoutError:
+        pass
+    deadline = time.monotonic() + 3
+    while manager._tasks and time.monotonic() < deadline:
+        time.sleep(0.05)
+    polls = fake.polls
+    time.sleep(1.0)
+    if manager._tasks or fake.polls != polls:
+        print(f"❌ 等待方超时后仍在查询任务: {list(manager._tasks)}")
+        return False
+    print(f"✅ 等待方超时（concurrent.futures.TimeoutError）后不再查询该任务（共查询 {polls} 次）")
+    
+    # 没有人等待结果时，任务超过task_timeout仍未完成就放弃，等待中的Future得到超时错误
+    fake.reset()
+    expiring = TranscriptionTaskManager(batch_window=0.3, max_batch=10, min_interval=0.1, max_interval=0.2,
+                                        task_timeout=0.5)
+    future = expiring.submit("https://bucket/audio/never.wav")
+    try:
+        future.result(3)
+        print("❌ 超时的任务返回了结果")
+        return False
+    except FutureTimeoutError as e:
+        error = e
+    if expiring._tasks:
+        print("❌ 超过task_timeout的任务没有被移除")
+        return False
+    print(f"✅ 超过task_timeout的任务不再查询（{error}）")
+    fake.base_seconds = 1.0
+    return True
+
+if __name__ == "__main__":
+    success = test_asr_tasks()
+    sys.exit(0 if success else 1)
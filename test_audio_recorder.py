@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+录音缓冲测试脚本
+用手动驱动的假输入流测试环形缓冲区回绕、按键时取出预录音频、松开时截断最后一段音频，
+以及转发给实时识别时不持有录音锁（不需要麦克风）
+"""
+
+import sys
+import threading
+import time
+import numpy as np
+import audio_recorder
+from audio_encoder import wav_to_pcm
+from audio_recorder import AudioRecorder, PreRollBuffer
+from metrics import isolate_metrics
+
+SAMPLE_RATE = 1000  # 每个采样1ms，便于计算
+BLOCK = 100
+
+class FakeClock:
+    """代替audio_recorder中的time模块，回调看到的时刻由测试指定"""
+    
+    def __init__(self):
+        self.now = 1000.0
+    
+    def monotonic(self) -> float:
+        return self.now
+
+class ManualStream:
+    """假的sounddevice.InputStream：不自己产生音频，由测试调用feed送出下一段"""
+    
+    def __init__(self, callback, clock: FakeClock, **kwargs):
+        self.callback = callback
+        self.clock = clock
+        self.position = 0  # 第i个采样的值为i
+    
+    def start(self):
+        pass
+    
+    def stop(self):
+        pass
+    
+    def close(self):
+        pass
+    
+    def feed(self, count: int = BLOCK):
+        """送出count个采样，回调时刻为这段音频结束的时刻"""
+        block = np.arange(self.position, self.position + count, dtype=np.int16).reshape(-1, 1)
+        self.position += count
+        self.clock.now += count / SAMPLE_RATE
+        self.callback(block, count, None, None)
+
+def test_audio_recorder():
+    """测试环形缓冲区与录音回调"""
+    print("🎙️ 录音缓冲测试")
+    print("=" * 50)
+    isolate_metrics()
+    
+    # 环形缓冲区写满后回绕，取出的音频保持时间顺序；一次写入超过容量时只保留最后的部分
+    ring = PreRollBuffer(SAMPLE_RATE, 1, seconds=1.0)
+    for start in range(0, 2500, 300):
+        ring.append(np.arange(start, start + 300, dtype=np.int16).reshape(-1, 1), end_time=(start + 300) / SAMPLE_RATE)
+    latest = ring.since(ring.end_time - 0.5)[:, 0]
+    whole = ring.since(0)[:, 0]
+    ring.append(np.arange(5000, 6500, dtype=np.int16).reshape(-1, 1), end_time=10.0)
+    oversized = ring.since(0)[:, 0]
+    checks = [
+        (list(latest) == list(range(2200, 2700)), f"回绕后取出最近0.5秒: {latest[0]}~{latest[-1]}"),
+        (list(whole) == list(range(1700, 2700)), f"最多取出整个缓冲区: {whole[0]}~{whole[-1]}"),
+        (list(oversized) == list(range(5500, 6500)), f"一次写入超过容量时保留最后的部分: {oversized[0]}~{oversized[-1]}"),
+    ]
+    for ok, message in checks:
+        print(f"{'✅' if ok else '❌'} {message}")
+        if not ok:
+            return False
+    
+    clock = FakeClock()
+    streams = []
+    
+    def stream_factory(callback, **kwargs):
+        streams.append(ManualStream(callback, clock, **kwargs))
+        return streams[-1]
+    
+    original_time = audio_recorder.time
+    audio_recorder.time = clock
+    try:
+        recorder = AudioRecorder(sample_rate=SAMPLE_RATE, preroll_ms=200, stream_factory=stream_factory)
+        forwarded, locked = [], []
+        
+        def on_audio_frame(frame: bytes):
+            locked.append(recorder._lock.locked())
+            forwarded.append(frame)
+        
+        recorder.on_audio_frame = on_audio_frame
+        recorder.arm()
+        stream = streams[0]
+        # 预录缓冲区为2.2秒，送出3秒后已经回绕
+        for _ in range(30):
+            stream.feed()
+        
+        # 按键时刻在最后一段音频结束前50ms，预录200ms：应从第2750个采样开始
+        recorder.start_recording(pressed_at=clock.now - 0.05)
+        preroll = recorder.audio_buffer.samples()[:, 0]
+        if list(preroll) != list(range(2750, 3000)):
+            print(f"❌ 按键时取出的预录音频不正确: {preroll[0]}~{preroll[-1]}，共 {len(preroll)} 个采样")
+            return False
+        print(f"✅ 从回绕后的环形缓冲区取出按键前200ms起的音频: {preroll[0]}~{preroll[-1]}")
+        for _ in range(3):
+            stream.feed()
+        
+        # 松开时刻在下一段音频开始后30ms：这一段只保留前30个采样
+        released_at = clock.now + 0.03
+        feeder = threading.Thread(target=lambda: (time.sleep(0.05), stream.feed()))
+        feeder.start()
+        wav_data = recorder.stop_recording(released_at)
+        feeder.join()
+        recorded = wav_to_pcm(wav_data)[0][:, 0]
+        if list(recorded) != list(range(2750, 3330)):
+            print(f"❌ 松开时最后一段音频没有按松开时刻截断: {recorded[0]}~{recorded[-1]}")
+            return False
+        print(f"✅ 录音截止到松开时刻，最后一段只保留前30ms: {recorded[0]}~{recorded[-1]}")
+        
+        frames = np.frombuffer(b"".join(forwarded), dtype=np.int16)
+        checks = [
+            (list(frames) == list(recorded), f"转发给实时识别的音频与录音一致（{len(forwarded)} 段）"),
+            (locked and not any(locked), "转发时没有持有录音锁"),
+        ]
+        for ok, message in checks:
+            print(f"{'✅' if ok else '❌'} {message}")
+            if not ok:
+                return False
+        
+        stream.feed()
+        if len(recorder.audio_buffer.samples()) != len(recorded) or len(forwarded) != 5:
+            print("❌ 停止录音后的音频仍被写入或转发")
+            return False
+        print("✅ 停止录音后的音频只进入环形缓冲区")
+        recorder.disarm()
+    finally:
+        audio_recorder.time = original_time
+    return True
+
+if __name__ == "__main__":
+    success = test_audio_recorder()
+    sys.exit(0 if success else 1)
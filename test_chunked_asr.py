@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+长录音分段识别测试脚本
+用合成的音频测试停顿处切分、无停顿时的重叠硬切、并发识别后的顺序拼接与去重、单个片段的重试（不需要API密钥）。
+合成音频中每个"词"是一段固定频率的音调，假的识别后端按频率还原出词，因此可以检查拼接结果是否完整有序
+"""
+
+import sys
+import threading
+import time
+import numpy as np
+from audio_encoder import pcm_to_wav, wav_to_pcm
+from vad import detect_speech, speech_segments, split_at_pauses
+
+SAMPLE_RATE = 16000
+WORD_SECONDS = 0.4
+WORD_GAP_SECONDS = 0.1
+rng = np.random.default_rng(0)
+
+def silence(seconds: float) -> np.ndarray:
+    """底噪"""
+    return rng.normal(0, 30, int(SAMPLE_RATE * seconds)).astype(np.int16)
+
+def word(word_id: int) -> np.ndarray:
+    """一个词：频率由词的编号决定的音调"""
+    t = np.arange(int(SAMPLE_RATE * WORD_SECONDS)) / SAMPLE_RATE
+    signal = 3000 * np.sin(2 * np.pi * (300 + 40 * word_id) * t)
+    return (signal + rng.normal(0, 100, len(t))).astype(np.int16)
+
+def sentence(word_ids) -> np.ndarray:
+    """词之间有很短的间隔，不算停顿"""
+    pieces = []
+    for word_id in word_ids:
+        pieces += [word(word_id), silence(WORD_GAP_SECONDS)]
+    return np.concatenate(pieces)
+
+def recording(sentences: int, words_per_sentence: int = 8, pause_seconds: float = 0.8, marked: int = None):
+    """返回(WAV字节数据, 按顺序的词列表)，第marked句的词全部换成w25"""
+    pieces, words = [], []
+    for i in range(sentences):
+        word_ids = [(i * words_per_sentence + j) % 20 for j in range(words_per_sentence)]
+        if i == marked:
+            word_ids = [25] * words_per_sentence
+        words += [f"w{word_id}" for word_id in word_ids]
+        pieces += [sentence(word_ids), silence(pause_seconds)]
+    samples = np.concatenate(pieces).reshape(-1, 1)
+    return pcm_to_wav(samples, SAMPLE_RATE, 1), words
+
+def decode(wav_data: bytes) -> str:
+    """假的识别：把每段音调按频率还原为词"""
+    samples, sample_rate, _ = wav_to_pcm(wav_data)
+    mono = samples[:, 0].astype(np.float32)
+    frame_len = int(sample_rate * 0.02)
+    words = []
+    for start, end in speech_segments(detect_speech(samples, sample_rate, hangover_ms=0)):
+        segment = mono[start * frame_len:end * frame_len]
+        if len(segment) < sample_rate * 0.1:
+            continue
+        frequency = np.argmax(np.abs(np.fft.rfft(segment))) * sample_rate / len(segment)
+        words.append(f"w{int(round((frequency - 300) / 40))}")
+    return " ".join(words)
+
+class FakeBackend:
+    """按音频时长模拟识别耗时，可以指定某些调用失败"""
+    
+    def __init__(self, seconds_per_audio_second: float = 0.0, fail_calls=(), fail_word: str = None):
+        self.seconds_per_audio_second = seconds_per_audio_second
+        self.fail_calls = set(fail_calls)
+        self.fail_word = fail_word
+        self.calls = 0
+        self.lock = threading.Lock()
+    
+    def __call__(self, wav_data: bytes):
+        with self.lock:
+            self.calls += 1
+            call = self.calls
+        samples, sample_rate, _ = wav_to_pcm(wav_data)
+        time.sleep(len(samples) / sample_rate * self.seconds_per_audio_second)
+        text = decode(wav_data)
+        if call in self.fail_calls or (self.fail_word and self.fail_word in text.split()):
+            raise Exception("模拟的识别失败")
+        return "fake", text
+
+def test_chunked_asr():
+    """测试长录音分段识别"""
+    print("✂️ 长录音分段识别测试")
+    print("=" * 50)
+    
+    from metrics import isolate_metrics
+    isolate_metrics()
+    from chunked_asr import ChunkedTranscriber, stitch_texts
+    
+    # 拼接去重
+    cases = [
+        (["今天讨论了发布计划", "发布计划，下周一上线"], "今天讨论了发布计划，下周一上线"),
+        (["we fixed the login bug", "the login bug and shipped"], "we fixed the login bug and shipped"),
+        (["第一段。", None, "第三段"], "第一段。第三段"),
+        (["好的", "好的我们开始"], "好的好的我们开始"),  # 少于3个字的重合不去重
+    ]
+    for texts, expected in cases:
+        stitched = stitch_texts(texts)
+        if stitched != expected:
+            print(f"❌ 拼接结果不正确: {texts} -> {stitched}")
+            return False
+    print("✅ 相邻片段重叠处重复识别的内容只保留一次")
+    
+    # 约4分钟的录音，在停顿处切分
+    wav_data, words = recording(sentences=52)
+    samples, _, _ = wav_to_pcm(wav_data)
+    total = len(samples) / SAMPLE_RATE
+    ranges = split_at_pauses(samples, SAMPLE_RATE, chunk_seconds=30, max_seconds=45, overlap_ms=1000)
+    lengths = [(end - start) / SAMPLE_RATE for start, end in ranges]
+    if len(ranges) < 5 or max(lengths) > 45:
+        print(f"❌ 切分结果不正确: {[f'{length:.1f}' for length in lengths]}")
+        return False
+    speech = detect_speech(samples, SAMPLE_RATE, hangover_ms=0)
+    cut_in_speech = [end for _, end in ranges[:-1] if speech[min(end // 320, len(speech) - 1)]]
+    if cut_in_speech:
+        print(f"❌ 有 {len(cut_in_speech)} 处切在了说话中间")
+        return False
+    print(f"✅ {total:.0f}s 的录音在停顿处切为 {len(ranges)} 段（{min(lengths):.1f}~{max(lengths):.1f}s）")
+    
+    # 没有停顿的录音在目标长度处硬切，前后重叠
+    continuous = sentence([i % 20 for i in range(200)]).reshape(-1, 1)
+    ranges = split_at_pauses(continuous, SAMPLE_RATE, chunk_seconds=30, max_seconds=45, overlap_ms=1000)
+    overlaps = [(ranges[i][1] - ranges[i + 1][0]) / SAMPLE_RATE for i in range(len(ranges) - 1)]
+    if len(ranges) < 2 or any(abs(overlap - 1.0) > 0.05 for overlap in overlaps):
+        print(f"❌ 硬切时的重叠不正确: {overlaps}")
+        return False
+    print(f"✅ 没有停顿时硬切为 {len(ranges)} 段，相邻片段重叠 {overlaps[0]:.1f}s")
+    
+    # 重叠设得比片段还长时限制为片段长度的一半，切分仍能结束
+    for samples_to_split in (samples, continuous):
+        ranges = split_at_pauses(samples_to_split, SAMPLE_RATE, chunk_seconds=2, max_seconds=3, overlap_ms=10000)
+        starts = [start for start, _ in ranges]
+        if starts != sorted(set(starts)) or ranges[-1][1] != len(samples_to_split) \
+                or max(end - start for start, end in ranges) > 3 * SAMPLE_RATE:
+            print(f"❌ 重叠过长时切分结果不正确: {len(ranges)} 段")
+            return False
+    print(f"✅ 重叠（10s）超过片段长度（2s）时自动缩小，切分正常结束（{len(ranges)} 段）")
+    continuous_words = [f"w{i % 20}" for i in range(200)]
+    result = ChunkedTranscriber(FakeBackend(), chunk_seconds=30, max_seconds=45, overlap_ms=1000) \
+        .transcribe(pcm_to_wav(continuous, SAMPLE_RATE, 1))
+    if result.text.split() != continuous_words:
+        print("❌ 硬切处重叠部分的重复内容没有去掉")
+        return False
+    print("✅ 硬切处重叠部分重复识别的词只保留一次")
+    
+    # 并发识别后按顺序拼接，耗时取决于片段长度而不是录音长度
+    backend = FakeBackend(seconds_per_audio_second=0.01)
+    started = time.perf_counter()
+    _, single = backend(wav_data)
+    single_seconds = time.perf_counter() - started
+    if single.split() != words:
+        print("❌ 假的识别后端不能还原合成音频")
+        return False
+    
+    chunker = ChunkedTranscriber(backend, chunk_seconds=30, max_seconds=45, overlap_ms=1000, workers=8, retries=1)
+    started = time.perf_counter()
+    result = chunker.transcribe(wav_data)
+    chunked_seconds = time.perf_counter() - started
+    if result.text.split() != words or result.failed or result.warning:
+        print("❌ 分段识别后的拼接结果不完整或顺序不对")
+        return False
+    print(f"✅ 分段识别结果与整段识别一致（{len(words)} 个词）")
+    if chunked_seconds > single_seconds * 0.6:
+        print(f"❌ 分段并发识别没有更快: 整段 {single_seconds:.2f}s，分段 {chunked_seconds:.2f}s")
+        return False
+    print(f"✅ 整段识别 {single_seconds:.2f}s，分段并发识别 {chunked_seconds:.2f}s")
+    
+    # 第2次调用失败：只重试该片段
+    backend = FakeBackend(fail_calls={2})
+    chunker = ChunkedTranscriber(backend, chunk_seconds=30, max_seconds=45, overlap_ms=1000, workers=1, retries=1)
+    result = chunker.transcribe(wav_data)
+    chunks = len(chunker.split(wav_data))
+    if result.text.split() != words or result.failed or backend.calls != chunks + 1:
+        print(f"❌ 片段失败后没有单独重试: {backend.calls} 次调用，{chunks} 个片段")
+        return False
+    print("✅ 失败的片段单独重试，其他片段不重复识别")
+    
+    # 含有w25的片段一直失败：跳过该片段，其余照常拼接
+    marked_wav, _ = recording(sentences=52, marked=20)
+    backend = FakeBackend(fail_word="w25")
+    result = ChunkedTranscriber(backend, chunk_seconds=30, max_seconds=45, overlap_ms=1000, workers=4, retries=1) \
+        .transcribe(marked_wav)
+    if len(result.failed) != 1 or not result.text or "w25" in result.text or len(result.text.split()) >= len(words):
+        print(f"❌ 一直失败的片段处理不正确: failed={result.failed}")
+        return False
+    print(f"✅ 一直失败的第 {result.failed[0] + 1} 段被跳过，保留其余 {len(result.text.split())} 个词")
+    if not result.warning:
+        print("❌ 有片段被跳过时没有给用户的提示")
+        return False
+    print(f"✅ 有片段被跳过时返回提示: {result.warning}")
+    
+    short_wav, short_words = recording(sentences=3)
+    backend = FakeBackend()
+    result = ChunkedTranscriber(backend, chunk_seconds=30, max_seconds=45).transcribe(short_wav)
+    if result.text.split() != short_words or backend.calls != 1:
+        print("❌ 短录音不应切分")
+        return False
+    print("✅ 短录音不切分，直接识别")
+    return True
+
+if __name__ == "__main__":
+    success = test_chunked_asr()
+    sys.exit(0 if success else 1)
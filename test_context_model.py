@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+上下文文档模型测试脚本
+用于测试项目字段解析、同名段落的保留、内存缓存以及文件被外部修改后的失效（不需要API密钥）
+"""
+
+import sys
+import tempfile
+import time
+from pathlib import Path
+import config
+from context_model import ContextDocument
+
+CONTEXT = """# 上下文切换器
+
+## 项目A
+
+**更新时间**: 2024-01-03 09:00:00
+**最终目标**: 完成语音记录工具
+**当前状态**: 开发中，
+正在联调OSS上传
+
+**todo列表**:
+- [ ] 补充单元测试
+- [x] 接入DashScope
+- 整理README
+
+**block点**:
+- 等待运维开通OSS权限
+
+## 项目B
+
+### 目标
+上线新版本
+
+### 当前状态
+等待评审
+
+### 待办事项
+1. 修复评审意见
+2. 发布
+
+### 阻塞
+无
+"""
+
+# 合并失败两次后文件中会有两个同名的"新内容"段落
+DUPLICATE_CONTEXT = CONTEXT + """
+## 新内容
+第一段重要内容
+
+## 新内容
+第二段重要内容
+"""
+
+def test_context_model():
+    """测试解析与缓存"""
+    print("🧱 上下文文档模型测试")
+    print("=" * 50)
+    
+    document = ContextDocument(CONTEXT)
+    project_a = document.projects["项目A"]
+    project_b = document.projects["项目B"]
+    checks = [
+        (document.names() == ["项目A", "项目B"], f"项目列表: {document.names()}"),
+        (project_a.fields.get('更新时间') == "2024-01-03 09:00:00", f"更新时间: {project_a.fields.get('更新时间')}"),
+        (project_a.fields.get('目标') == "完成语音记录工具", f"目标: {project_a.fields.get('目标')}"),
+        (project_a.fields.get('状态') == "开发中，\n正在联调OSS上传", f"多行状态: {project_a.fields.get('状态')!r}"),
+        (project_a.open_todos == ["补充单元测试", "整理README"], f"未完成todo: {project_a.open_todos}"),
+        (project_a.blocks == ["等待运维开通OSS权限"], f"block点: {project_a.blocks}"),
+        (project_b.fields.get('状态') == "等待评审", f"标题形式的字段: {project_b.fields}"),
+        (project_b.open_todos == ["修复评审意见", "发布"], f"编号列表todo: {project_b.open_todos}"),
+        (document.render() == CONTEXT, "重新渲染与原文一致"),
+    ]
+    for ok, message in checks:
+        print(f"{'✅' if ok else '❌'} {message}")
+        if not ok:
+            return False
+    
+    from speech_recognition import _stable_context
+    duplicated = ContextDocument(DUPLICATE_CONTEXT)
+    prompt_context = _stable_context(duplicated)
+    stale = [name for name, _ in duplicated.by_staleness()]
+    checks = [
+        (stale == ["项目B", "新内容", "新内容", "项目A"], f"同名段落都参与排序: {stale}"),
+        ("第一段重要内容" in prompt_context and "第二段重要内容" in prompt_context, "同名段落都出现在提示词中"),
+        (duplicated.render() == DUPLICATE_CONTEXT, "同名段落重新渲染与原文一致"),
+    ]
+    for ok, message in checks:
+        print(f"{'✅' if ok else '❌'} {message}")
+        if not ok:
+            return False
+    
+    with tempfile.TemporaryDirectory() as temp_dir:
+        config.DESKTOP_PATH = Path(temp_dir)
+        config.CONTEXT_FILE = Path(temp_dir) / "context.md"
+        config.HISTORY_FILE = Path(temp_dir) / "history.md"
+        config.CONTEXT_LOCK_FILE = Path(temp_dir) / "context.lock"
+        config.HISTORY_BACKEND = "markdown"
+        from context_manager import ContextManager
+        
+        manager = ContextManager()
+        manager.write_context(CONTEXT)
+        first = manager.document()
+        started = time.perf_counter()
+        for _ in range(1000):
+            document = manager.document()
+        elapsed = (time.perf_counter() - started) * 1000
+        if document is not first:
+            print("❌ 文件未修改时没有使用缓存")
+            return False
+        print(f"✅ 文件未修改时从内存读取，1000次共 {elapsed:.1f}ms")
+        
+        # 模拟在编辑器中修改文件
+        config.CONTEXT_FILE.write_text(CONTEXT.replace("等待评审", "评审通过"), encoding='utf-8')
+        deadline = time.time() + 2
+        while manager.document().projects["项目B"].fields.get('状态') != "评审通过":
+            if time.time() > deadline:
+                print("❌ 文件被外部修改后缓存没有失效")
+                return False
+            time.sleep(0.01)
+        print("✅ 文件被外部修改后重新读取")
+        
+        manager.write_context(CONTEXT)
+        if manager.document().content != CONTEXT:
+            print("❌ 写入后缓存没有更新")
+            return False
+        print("✅ 写入后缓存直接更新")
+        manager.watcher.stop()
+    return True
+
+if __name__ == "__main__":
+    success = test_context_model()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+上下文写入测试脚本
+用于测试多进程并发写入时的文件锁、版本检查，以及合并期间文件被修改时的段落套用（不需要API密钥）
+"""
+
+import multiprocessing
+import sys
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+import config
+from context_manager import ContextManager, ContextConflictError, rebase_sections
+
+WORKERS = 4
+INCREMENTS = 50
+
+BASE = """# 上下文切换器
+
+## 项目A
+
+**当前状态**: 开发中
+
+## 项目B
+
+**当前状态**: 等待评审
+"""
+
+@contextmanager
+def use_temp_files(temp_dir: str):
+    """把上下文、历史记录和锁文件都放到临时目录，退出时恢复原来的配置"""
+    overrides = {
+        'DESKTOP_PATH': Path(temp_dir),
+        'CONTEXT_FILE': Path(temp_dir) / "context.md",
+        'HISTORY_FILE': Path(temp_dir) / "history.md",
+        'CONTEXT_LOCK_FILE': Path(temp_dir) / "context.lock",
+        'HISTORY_BACKEND': "markdown",
+    }
+    saved = {name: getattr(config, name) for name in overrides}
+    for name, value in overrides.items():
+        setattr(config, name, value)
+    try:
+        yield
+    finally:
+        for name, value in saved.items():
+            setattr(config, name, value)
+
+def increment_worker(temp_dir: str, worker: int):
+    """读取-修改-写入，冲突时基于最新内容重试"""
+    with use_temp_files(temp_dir):
+        manager = ContextManager()
+        conflicts = 0
+        for i in range(INCREMENTS):
+            while True:
+                content, version = manager.read_context_versioned()
+                try:
+                    manager.write_context(content + f"- {worker}-{i}\n", expected_version=version)
+                    break
+                except ContextConflictError:
+                    conflicts += 1
+    return conflicts
+
+def test_context_write():
+    """测试并发写入与冲突处理"""
+    print("🔒 上下文写入测试")
+    print("=" * 50)
+    
+    with tempfile.TemporaryDirectory() as temp_dir, use_temp_files(temp_dir):
+        manager = ContextManager()
+        manager.write_context("")
+        
+        with multiprocessing.Pool(WORKERS) as pool:
+            conflicts = pool.starmap(increment_worker, [(temp_dir, worker) for worker in range(WORKERS)])
+        lines = manager.read_context().splitlines()
+        expected = {f"- {worker}-{i}" for worker in range(WORKERS) for i in range(INCREMENTS)}
+        if len(lines) != len(expected) or set(lines) != expected:
+            print(f"❌ 并发写入丢失了内容: {len(lines)}/{len(expected)} 行")
+            return False
+        print(f"✅ {WORKERS} 个进程各写入 {INCREMENTS} 次，没有丢失（检测到并重试 {sum(conflicts)} 次冲突）")
+        
+        leftovers = [path.name for path in Path(temp_dir).glob("*.tmp")]
+        if leftovers:
+            print(f"❌ 留下了临时文件: {leftovers}")
+            return False
+        print("✅ 没有遗留临时文件")
+        
+        # 合并基于旧内容计算，期间用户在编辑器中修改了另一个项目
+        _, version = manager.read_context_versioned()
+        manager.write_context(BASE)
+        merged = BASE.replace("开发中", "已完成")
+        edited = BASE.replace("等待评审", "评审通过")
+        try:
+            manager.write_context(merged, expected_version=version)
+            print("❌ 基于旧版本的写入没有被拒绝")
+            return False
+        except ContextConflictError as conflict:
+            if conflict.current_content != BASE:
+                print("❌ 冲突中的最新内容不正确")
+                return False
+        print("✅ 基于旧版本的写入被拒绝，没有覆盖")
+        
+        rebased = rebase_sections(BASE, merged, edited)
+        if rebased is None or "已完成" not in rebased or "评审通过" not in rebased:
+            print(f"❌ 不同项目的修改没有被套用: {rebased!r}")
+            return False
+        print("✅ 修改不同项目时，合并结果直接套用到最新内容上")
+        
+        conflicting = BASE.replace("开发中", "暂停")
+        if rebase_sections(BASE, merged, conflicting) is not None:
+            print("❌ 修改同一项目时应该要求重新合并")
+            return False
+        print("✅ 修改同一项目时要求重新合并")
+    
+    if config.CONTEXT_FILE.parent == Path(temp_dir):
+        print("❌ 测试结束后配置没有恢复")
+        return False
+    print("✅ 测试结束后恢复原来的配置")
+    return True
+
+if __name__ == "__main__":
+    success = test_context_write()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+历史记录搜索测试脚本
+用于测试中英文分词、增量索引、补建索引和搜索耗时（不需要API密钥，向量索引使用假的编码模型）
+"""
+
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+import numpy as np
+from history_search import HistorySearch, tokenize
+from history_store import HistoryStore
+
+TOPICS = ["前端重构", "接口联调", "性能优化", "文档整理", "发布准备", "bug修复", "code review", "数据迁移"]
+
+class FakeEncoder:
+    """按字符计数的假编码模型，记录编码时是否持有索引的锁"""
+    
+    def __init__(self, search: HistorySearch):
+        self.search = search
+        self.locked_calls = 0
+    
+    def encode(self, text: str, normalize_embeddings: bool = True) -> np.ndarray:
+        if self.search._lock.locked():
+            self.locked_calls += 1
+        vector = np.zeros(64, dtype=np.float32)
+        for char in text:
+            vector[ord(char) % 64] += 1
+        return vector / (np.linalg.norm(vector) or 1)
+
+def build_context(states: dict) -> str:
+    parts = ["# 上下文切换器\n\n"]
+    for name, status in states.items():
+        parts.append(f"## {name}\n\n**当前状态**: {status}\n\n")
+    return ''.join(parts)
+
+def test_history_search():
+    """写入大量版本后搜索"""
+    print("🔎 历史记录搜索测试")
+    print("=" * 50)
+    
+    tokens = tokenize("OSS上传卡住了, retry 3次")
+    if tokens != ["oss", "上传", "传卡", "卡住", "住了", "retry", "3", "次"]:
+        print(f"❌ 分词结果不正确: {tokens}")
+        return False
+    print(f"✅ 分词: {tokens}")
+    
+    with tempfile.TemporaryDirectory() as temp_dir:
+        store = HistoryStore(Path(temp_dir) / "history.db")
+        search = HistorySearch(store)
+        rng = random.Random(0)
+        projects = [f"项目{i}" for i in range(10)]
+        states = {name: "开发中" for name in projects}
+        
+        count = 2000
+        started = time.perf_counter()
+        for i in range(count):
+            original = build_context(states)
+            name = rng.choice(projects)
+            topic = rng.choice(TOPICS)
+            transcript = f"{name}今天在做{topic}，进展顺利"
+            states[name] = f"{topic}（第{i}次更新）"
+            if i == 1234:
+                transcript = "项目3被OSS阻塞了，等运维开通权限"
+                states["项目3"] = "被OSS阻塞，等待运维开通权限"
+            merged = build_context(states)
+            revision_id = store.add_revision(original, transcript, merged)
+            search.index_revision(revision_id, transcript, original, merged)
+        elapsed = (time.perf_counter() - started) * 1000
+        print(f"✅ 写入并索引 {count} 个版本，平均每个 {elapsed / count:.2f}ms")
+        
+        started = time.perf_counter()
+        results = search.search("OSS 阻塞", limit=5)
+        elapsed = (time.perf_counter() - started) * 1000
+        if not results or results[0]['revision_id'] != 1235:
+            print(f"❌ 搜索结果不正确: {results}")
+            return False
+        print(f"✅ 搜索 \"OSS 阻塞\" 命中版本 #{results[0]['revision_id']}，耗时 {elapsed:.1f}ms")
+        for result in results:
+            print(f"   #{result['revision_id']} [{result['project'] or '识别文本'}] {result['snippet']}")
+        
+        results = search.search("阻塞", project="项目3")
+        if not results or any(result['project'] != "项目3" for result in results):
+            print(f"❌ 按项目过滤不正确: {results}")
+            return False
+        print("✅ 按项目过滤")
+        
+        # 清空索引后通过sync补建，结果应与增量索引一致
+        started = time.perf_counter()
+        rebuilt = search.rebuild()
+        elapsed = (time.perf_counter() - started) * 1000
+        if rebuilt != count or search.search("OSS 阻塞", limit=1)[0]['revision_id'] != 1235:
+            print("❌ 重建索引后结果不一致")
+            return False
+        print(f"✅ 重建 {rebuilt} 个版本的索引，耗时 {elapsed:.0f}ms")
+        
+        # 写入时索引失败的版本（比它新的版本已经索引过）也要被sync补上
+        with search._lock, search._conn:
+            search._conn.execute("DELETE FROM search_postings WHERE doc_id IN "
+                                 "(SELECT id FROM search_docs WHERE revision_id = 1235)")
+            search._conn.execute("DELETE FROM search_docs WHERE revision_id = 1235")
+        synced = search.sync()
+        results = search.search("OSS 阻塞", limit=1)
+        if synced != 1 or not results or results[0]['revision_id'] != 1235:
+            print(f"❌ 中间缺失的版本没有被补建索引（补建 {synced} 个）")
+            return False
+        print("✅ 中间缺失索引的版本由sync补建")
+        
+        # 向量编码在锁外进行，不阻塞同时进行的搜索
+        semantic = HistorySearch(store, "fake-model")
+        encoder = FakeEncoder(semantic)
+        semantic._encoder = encoder
+        semantic.rebuild()
+        results = semantic.search("OSS 阻塞", limit=3, semantic=True)
+        if encoder.locked_calls or not results:
+            print(f"❌ 向量编码时持有索引的锁（{encoder.locked_calls} 次）")
+            return False
+        print("✅ 写入索引时向量编码在锁外进行")
+    return True
+
+if __name__ == "__main__":
+    success = test_history_search()
+    sys.exit(0 if success else 1)
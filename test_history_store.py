@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+历史记录存储测试脚本
+用于测试差异存储能否还原每个版本、按项目查询以及相对markdown历史的体积（不需要API密钥）
+"""
+
+import sys
+import tempfile
+import time
+from pathlib import Path
+import config
+from history_store import HistoryStore
+
+PROJECTS = ["项目A", "项目B", "项目C", "项目D", "项目E"]
+OVERRIDDEN_CONFIG = ('DESKTOP_PATH', 'CONTEXT_FILE', 'HISTORY_FILE', 'CONTEXT_LOCK_FILE', 'HISTORY_BACKEND',
+                     'HISTORY_DB_FILE', 'HISTORY_EXPORT_FILE')
+
+def build_context(states: dict) -> str:
+    """根据各项目的状态生成上下文"""
+    parts = ["# 上下文切换器\n\n"]
+    for name, (updated, status, todos) in states.items():
+        parts.append(f"## {name}\n\n**更新时间**: {updated}\n**当前状态**: {status}\n\n**待办事项**:\n")
+        parts.extend(f"- {todo}\n" for todo in todos)
+        parts.append("\n")
+    return ''.join(parts)
+
+def test_history_store():
+    """写入一系列版本后逐个还原并比较"""
+    print("🗂️ 历史记录存储测试")
+    print("=" * 50)
+    
+    with tempfile.TemporaryDirectory() as temp_dir:
+        store = HistoryStore(Path(temp_dir) / "history.db", keyframe_interval=10)
+        states = {name: ("2024-01-01 09:00:00", "开发中", [f"{name}的第一项待办"]) for name in PROJECTS}
+        expected = []
+        markdown_bytes = 0
+        
+        for i in range(60):
+            original = build_context(states)
+            if i % 7 == 3:
+                # 模拟用户在两次录音之间手动编辑了文件
+                original += f"\n手动添加的备注 {i}\n"
+            name = PROJECTS[i % len(PROJECTS)]
+            updated, status, todos = states[name]
+            states[name] = (f"2024-01-{i // 5 + 2:02d} 10:00:00", f"第{i}次更新", todos + [f"第{i}次录音的待办"])
+            merged = build_context(states)
+            transcript = f"{name}完成了第{i}次更新"
+            
+            revision_id = store.add_revision(original, transcript, merged)
+            expected.append((revision_id, original, transcript, merged, name))
+            markdown_bytes += len(f"## 时间\n\n### 原始内容\n{original}\n\n### 新内容\n{transcript}\n\n### 合并后内容\n{merged}\n\n---\n".encode())
+        
+        started = time.perf_counter()
+        for revision_id, original, transcript, merged, name in expected:
+            revision = store.get_revision(revision_id)
+            if revision['original'] != original or revision['merged'] != merged or revision['transcript'] != transcript:
+                print(f"❌ 版本 {revision_id} 还原后与写入内容不一致")
+                return False
+            if name not in revision['projects']:
+                print(f"❌ 版本 {revision_id} 的项目索引缺少 {name}: {revision['projects']}")
+                return False
+        elapsed = (time.perf_counter() - started) * 1000
+        print(f"✅ {len(expected)} 个版本全部还原一致，平均每个 {elapsed / len(expected):.2f}ms")
+        
+        project_ids = [item['id'] for item in store.list_revisions(project="项目C", limit=100)]
+        expected_ids = [revision_id for revision_id, *_, name in reversed(expected) if name == "项目C"]
+        if project_ids != expected_ids:
+            print(f"❌ 按项目查询结果不正确: {project_ids}")
+            return False
+        print(f"✅ 按项目查询: 项目C 涉及 {len(project_ids)} 个版本")
+        
+        # 重新打开数据库后继续写入，需要从数据库还原最新内容来计算差异
+        store = HistoryStore(Path(temp_dir) / "history.db", keyframe_interval=10)
+        original = expected[-1][3]
+        revision_id = store.add_revision(original, "重新打开后写入", original + "\n## 项目F\n\n新项目\n")
+        revision = store.get_revision(revision_id)
+        if revision['original'] != original or revision['projects'] != ["项目F"]:
+            print("❌ 重新打开数据库后写入的版本不正确")
+            return False
+        print("✅ 重新打开数据库后继续写入正常")
+        
+        export_file = store.export_markdown(Path(temp_dir) / "history.md", limit=5)
+        exported = export_file.read_text(encoding='utf-8')
+        if exported.count("### 合并后内容") != 5 or "重新打开后写入" not in exported:
+            print("❌ 导出的markdown不正确")
+            return False
+        print("✅ 导出最近5个版本为markdown")
+        
+        # 打开历史记录时导出到单独的文件，桌面上改用sqlite之前的markdown记录保持不变
+        from context_manager import ContextManager
+        # 只在这一段临时改用临时目录，结束后恢复原来的配置
+        saved = {name: getattr(config, name) for name in OVERRIDDEN_CONFIG}
+        try:
+            config.DESKTOP_PATH = Path(temp_dir)
+            config.CONTEXT_FILE = Path(temp_dir) / "context.md"
+            config.HISTORY_FILE = Path(temp_dir) / "legacy_history.md"
+            config.CONTEXT_LOCK_FILE = Path(temp_dir) / "context.lock"
+            config.HISTORY_BACKEND = "sqlite"
+            config.HISTORY_DB_FILE = Path(temp_dir) / "manager.db"
+            config.HISTORY_EXPORT_FILE = Path(temp_dir) / "export" / "history_export.md"
+            legacy = "# 上下文切换器 - 历史记录\n\n## 2023-12-31 10:00:00\n\n### 新内容\n迁移前的记录\n"
+            config.HISTORY_FILE.write_text(legacy, encoding='utf-8')
+            manager = ContextManager()
+            manager.add_history("", "迁移后的记录", "## 项目A\n")
+            opened = manager.export_history()
+            manager.watcher.stop()
+            if config.HISTORY_FILE.read_text(encoding='utf-8') != legacy:
+                print("❌ 打开历史记录覆盖了迁移前的markdown记录")
+                return False
+            if opened != config.HISTORY_EXPORT_FILE or "迁移后的记录" not in opened.read_text(encoding='utf-8'):
+                print(f"❌ 打开历史记录没有导出到单独的文件: {opened}")
+                return False
+            print("✅ 打开历史记录时导出到单独的文件，迁移前的markdown记录保持不变")
+        finally:
+            for name, value in saved.items():
+                setattr(config, name, value)
+        
+        store._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        db_bytes = (Path(temp_dir) / "history.db").stat().st_size
+        print(f"\n📦 体积: markdown约 {markdown_bytes / 1024:.0f} KB，sqlite {db_bytes / 1024:.0f} KB")
+    return True
+
+if __name__ == "__main__":
+    success = test_history_store()
+    sys.exit(0 if success else 1)
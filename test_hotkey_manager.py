@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+快捷键匹配测试脚本
+用模拟的pynput按键对象测试组合键匹配、按住/松开回调、重复按下事件、多个快捷键的优先级和回调分发线程（不需要键盘监听权限）
+"""
+
+import sys
+import threading
+import time
+from enum import Enum
+from hotkey_manager import MAC_VK_CHARS, HotkeyBinding, HotkeyManager, key_name, parse_hotkey
+
+class Key(Enum):
+    """模拟pynput.keyboard.Key"""
+    cmd = 0x37
+    cmd_r = 0x36
+    shift = 0x38
+    shift_r = 0x3C
+    ctrl = 0x3B
+    alt = 0x3A
+    esc = 0x35
+    space = 0x31
+
+class KeyCode:
+    """模拟pynput.keyboard.KeyCode：相等与哈希按字符计算"""
+    
+    def __init__(self, char=None, vk=None):
+        self.char = char
+        self.vk = vk
+    
+    def __eq__(self, other):
+        return isinstance(other, KeyCode) and (self.char, self.vk) == (other.char, other.vk)
+    
+    def __hash__(self):
+        return hash(repr(self))
+    
+    def __repr__(self):
+        return repr(self.char) if self.char else f"<{self.vk}>"
+
+def char(c: str) -> KeyCode:
+    return KeyCode(char=c)
+
+def mac_key(c: str, vk: int) -> KeyCode:
+    """macOS按住shift/alt时的字符键：char是变化后的字符，vk是键位"""
+    return KeyCode(char=c, vk=vk)
+
+def test_hotkey_manager():
+    """测试快捷键匹配"""
+    print("⌨️ 快捷键匹配测试")
+    print("=" * 50)
+    
+    if parse_hotkey("Command+Shift+E") != {'cmd', 'shift', 'e'} or parse_hotkey({'cmd', 'e'}) != {'cmd', 'e'}:
+        print("❌ 快捷键写法解析不正确")
+        return False
+    names = [key_name(Key.cmd_r), key_name(Key.shift), key_name(char('E')), key_name(char('\x05')),
+             key_name(KeyCode(vk=14), {}), key_name(mac_key('!', 18), MAC_VK_CHARS),
+             key_name(mac_key('´', 14), MAC_VK_CHARS), key_name(mac_key('#', 20), MAC_VK_CHARS)]
+    if names != ['cmd', 'shift', 'e', 'e', 'vk14', '1', 'e', '3']:
+        print(f"❌ 按键名称不正确: {names}")
+        return False
+    print("✅ 快捷键写法和按键名称（左右键合并、大小写、ctrl控制字符、shift/alt改变的字符按键位还原）")
+    
+    events = []
+    done = threading.Event()
+    
+    def record(kind):
+        def callback(timestamp):
+            events.append((kind, timestamp))
+            if kind == 'stop':
+                done.set()
+        return callback
+    
+    def slow_start(timestamp):
+        time.sleep(0.3)
+        record('start')(timestamp)
+    
+    manager = HotkeyManager([
+        HotkeyBinding('record', "cmd+shift+e", slow_start, record('stop')),
+        HotkeyBinding('record:博客', "cmd+shift+alt+e", record('project'), record('stop')),
+        HotkeyBinding('record:文档', "cmd+shift+1", record('shifted'), record('stop')),
+        HotkeyBinding('cancel', "cmd+shift+esc", record('cancel')),
+        HotkeyBinding('replay', "ctrl+shift+r", record('replay')),
+    ], vk_chars=MAC_VK_CHARS)
+    manager._dispatcher = threading.Thread(target=manager._dispatch, daemon=True)
+    manager._dispatcher.start()
+    
+    # 按住cmd+shift+e（按键重复），中途按esc取消，再松开；回调很慢时监听线程也不能被阻塞
+    started = time.perf_counter()
+    for key in [Key.cmd, Key.shift_r, char('E'), char('E'), char('E'), Key.esc]:
+        manager._on_press(key)
+    manager._on_release(Key.esc)
+    manager._on_release(char('E'))
+    listener_ms = (time.perf_counter() - started) * 1000
+    done.wait(2)
+    kinds = [kind for kind, _ in events]
+    if kinds != ['start', 'cancel', 'stop']:
+        print(f"❌ 按住/取消/松开的回调不正确: {kinds}")
+        return False
+    print("✅ 按下开始录音，按键重复不再触发，esc取消，松开停止")
+    if listener_ms > 50:
+        print(f"❌ 监听线程被回调阻塞了 {listener_ms:.0f}ms")
+        return False
+    print(f"✅ 回调由分发线程执行，监听线程处理这些按键共 {listener_ms:.2f}ms")
+    if not events[0][1] <= events[1][1] <= events[2][1] or events[0][1] > time.monotonic() - 0.25:
+        print("❌ 回调参数不是收到按键时的时刻")
+        return False
+    print("✅ 回调参数是收到按键事件时的时刻")
+    
+    # cmd+shift仍按住，再按alt+e（macOS报告为'´'）：按键更多的快捷键（录音到指定项目）优先
+    events.clear()
+    done.clear()
+    manager._on_press(Key.alt)
+    manager._on_press(mac_key('´', 14))
+    manager._on_release(mac_key('´', 14))
+    done.wait(2)
+    for key in [Key.alt, Key.shift_r, Key.cmd]:
+        manager._on_release(key)
+    kinds = [kind for kind, _ in events]
+    if kinds != ['project', 'stop']:
+        print(f"❌ 多个快捷键重叠时没有选按键更多的: {kinds}")
+        return False
+    print("✅ 多个快捷键重叠时按键更多的优先（cmd+shift+alt+e 录音到指定项目）")
+    
+    # cmd+shift+1：按住shift时macOS报告的字符是'!'
+    events.clear()
+    done.clear()
+    for key in [Key.cmd, Key.shift, mac_key('!', 18)]:
+        manager._on_press(key)
+    manager._on_release(mac_key('!', 18))
+    done.wait(2)
+    for key in [Key.shift, Key.cmd]:
+        manager._on_release(key)
+    kinds = [kind for kind, _ in events]
+    if kinds != ['shifted', 'stop']:
+        print(f"❌ cmd+shift+1 没有触发（shift改变了字符）: {kinds}")
+        return False
+    print("✅ cmd+shift+1 按键位匹配，不受shift改变字符的影响")
+    
+    # 与快捷键无关的按键（打字）不触发、不影响状态
+    events.clear()
+    for c in "hello world":
+        manager._on_press(char(c))
+        manager._on_release(char(c))
+    for key in [Key.ctrl, Key.shift, char('\x12')]:
+        manager._on_press(key)
+    for key in [char('\x12'), Key.shift, Key.ctrl]:
+        manager._on_release(key)
+    time.sleep(0.1)
+    if [kind for kind, _ in events] != ['replay'] or manager._state:
+        print(f"❌ 普通按键影响了快捷键状态: {events}, state={manager._state}")
+        return False
+    print("✅ 普通打字不触发快捷键，ctrl+shift+r 触发重新处理")
+    return True
+
+if __name__ == "__main__":
+    success = test_hotkey_manager()
+    sys.exit(0 if success else 1)
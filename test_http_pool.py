@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+连接池测试脚本
+启动一个本地的假服务，按客户端端口统计连接数，测试下载复用keep-alive连接、预热建立的连接被后续请求复用，
+以及空闲过久时重新预热（不需要网络）
+"""
+
+import sys
+import time
+import requests
+from aiohttp import web
+from fake_server import start_fake_server
+from http_pool import ConnectionPool
+
+class FakeOrigin:
+    """记录每个请求来自哪个客户端端口（同一端口即同一条TCP连接）"""
+    
+    def __init__(self):
+        self.peers = []
+        self.heads = 0
+    
+    async def data(self, request):
+        self.peers.append(request.transport.get_extra_info('peername')[1])
+        return web.Response(body=b"transcript")
+    
+    async def head(self, request):
+        self.peers.append(request.transport.get_extra_info('peername')[1])
+        self.heads += 1
+        return web.Response()
+
+def test_http_pool():
+    """测试连接复用与预热"""
+    print("🔌 连接池测试")
+    print("=" * 50)
+    
+    origin = FakeOrigin()
+    port = start_fake_server([('GET', '/data', origin.data), ('HEAD', '/', origin.head)])
+    url = f"http://127.0.0.1:{port}/data"
+    
+    # 不使用连接池时每次请求都新建连接
+    for _ in range(5):
+        requests.get(url, timeout=5)
+    baseline = len(set(origin.peers))
+    
+    origin.peers.clear()
+    pool = ConnectionPool(pool_size=2, idle_seconds=0.2)
+    contents = [pool.get(url, timeout=5) for _ in range(5)]
+    checks = [
+        (contents == [b"transcript"] * 5, "通过连接池下载内容"),
+        (len(set(origin.peers)) == 1, f"连续5次下载使用 {len(set(origin.peers))} 条连接（不使用连接池时 {baseline} 条）"),
+        (f"http://127.0.0.1:{port}/" in pool._warm_origins, "下载过的主机被登记为预热地址"),
+    ]
+    for ok, message in checks:
+        print(f"{'✅' if ok else '❌'} {message}")
+        if not ok:
+            return False
+    
+    # 新的连接池先预热，之后的下载直接使用预热时建立的连接
+    origin.peers.clear()
+    warmed = ConnectionPool(pool_size=2, idle_seconds=0.2)
+    warmed.register(url)
+    warmed.prewarm(background=False)
+    warmed.get(url, timeout=5)
+    if origin.heads != 1 or len(origin.peers) != 2 or len(set(origin.peers)) != 1:
+        print(f"❌ 预热建立的连接没有被复用: {origin.peers}")
+        return False
+    print("✅ 预热建立的连接被之后的下载复用")
+    
+    # 刚用过时不重新预热，空闲超过idle_seconds后在后台重新预热
+    warmed.ensure_warm()
+    time.sleep(0.1)
+    if origin.heads != 1:
+        print("❌ 连接刚用过就重新预热")
+        return False
+    time.sleep(0.2)
+    warmed.ensure_warm()
+    deadline = time.time() + 2
+    while origin.heads < 2 and time.time() < deadline:
+        time.sleep(0.01)
+    if origin.heads != 2:
+        print("❌ 空闲过久后没有重新预热")
+        return False
+    print("✅ 刚用过时不预热，空闲过久后在后台重新预热")
+    
+    try:
+        pool.get(f"http://127.0.0.1:{port}/missing", timeout=5)
+        print("❌ 错误的状态码没有抛出异常")
+        return False
+    except requests.HTTPError as e:
+        print(f"✅ 错误的状态码抛出异常: {e.response.status_code}")
+    return True
+
+if __name__ == "__main__":
+    success = test_http_pool()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+录音处理流水线测试脚本
+用于测试识别乱序完成时仍按录音顺序合并、队列已满时拒绝新录音以及队列长度回调（不需要API密钥）
+"""
+
+import sys
+import threading
+import time
+from job_queue import ProcessingPipeline
+from metrics import isolate_metrics
+
+def test_job_queue():
+    """测试处理流水线"""
+    print("🧵 录音处理流水线测试")
+    print("=" * 50)
+    isolate_metrics()
+    
+    # 先提交的录音识别最慢，合并仍按提交顺序
+    delays = [0.3, 0.05, 0.2, 0.0, 0.1]
+    transcribed, merged, depths = [], [], []
+    done = threading.Event()
+    
+    def transcribe(job):
+        time.sleep(delays[job.seq])
+        transcribed.append(job.seq)
+        if job.seq == 3:
+            raise RuntimeError("识别失败")
+        return f"第{job.seq}段"
+    
+    def merge(job):
+        merged.append((job.seq, job.transcript, job.error))
+        if len(merged) == len(delays):
+            done.set()
+    
+    pipeline = ProcessingPipeline(transcribe, merge, on_depth_change=depths.append, max_pending=10, asr_workers=5)
+    pipeline.start()
+    jobs = [pipeline.submit(f"音频{i}".encode()) for i in range(len(delays))]
+    if not done.wait(3):
+        print(f"❌ 没有全部合并完成: {merged}")
+        return False
+    time.sleep(0.05)
+    
+    if transcribed == sorted(transcribed):
+        print(f"❌ 识别没有乱序完成，测试不成立: {transcribed}")
+        return False
+    if [seq for seq, _, _ in merged] != list(range(len(delays))):
+        print(f"❌ 合并顺序不对: {merged}")
+        return False
+    print(f"✅ 识别完成顺序 {transcribed}，合并顺序 {[seq for seq, _, _ in merged]}")
+    if merged[3][1] is not None or "识别失败" not in (merged[3][2] or '') or merged[4][1] != "第4段":
+        print(f"❌ 识别出错的任务没有带着错误继续合并: {merged[3]}")
+        return False
+    print("✅ 识别出错的任务带着错误信息按顺序交给合并，后面的任务不受影响")
+    if depths[:len(delays)] != [1, 2, 3, 4, 5] or depths[-1] != 0 or pipeline.depth() != 0:
+        print(f"❌ 队列长度回调不正确: {depths}")
+        return False
+    if any(job.audio_data is not None for job in jobs):
+        print("❌ 合并后没有释放音频数据")
+        return False
+    print(f"✅ 队列长度回调 {depths}，合并后释放音频数据")
+    
+    # 识别阻塞时，排队数达到上限后拒绝新录音，处理完后恢复
+    release = threading.Event()
+    finished = threading.Event()
+    
+    def blocked_transcribe(job):
+        release.wait(3)
+        return "内容"
+    
+    def count_merge(job):
+        if job.seq == 1:
+            finished.set()
+    
+    pipeline = ProcessingPipeline(blocked_transcribe, count_merge, max_pending=2, asr_workers=1)
+    pipeline.start()
+    accepted = [pipeline.submit(b"a"), pipeline.submit(b"b")]
+    rejected = pipeline.submit(b"c")
+    if None in accepted or rejected is not None or not pipeline.is_full():
+        print(f"❌ 队列已满时没有拒绝新录音: {accepted}, {rejected}")
+        return False
+    print(f"✅ 排队数达到上限 {pipeline.max_pending} 时 submit 返回None")
+    release.set()
+    finished.wait(3)
+    time.sleep(0.05)
+    again = pipeline.submit(b"d")
+    if pipeline.is_full() or again is None or again.seq != 2:
+        print("❌ 处理完成后没有恢复接收录音")
+        return False
+    print("✅ 处理完成后恢复接收，被拒绝的录音不占用序号")
+    return True
+
+if __name__ == "__main__":
+    success = test_job_queue()
+    sys.exit(0 if success else 1)
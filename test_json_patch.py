@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+JSON补丁合并测试脚本
+用于测试补丁校验、本地应用与渲染，并比较补丁与完整markdown的输出长度（不需要API密钥）
+"""
+
+import json
+import sys
+from context_model import ContextDocument, parse_patch
+
+CONTEXT = """# 上下文切换器
+
+## 项目A
+
+**更新时间**: 2024-01-03 09:00:00
+**最终目标**: 完成语音记录工具
+**当前状态**: 开发中
+
+**todo列表**:
+- [ ] 补充单元测试
+- [ ] 接入DashScope
+
+**block点**:
+- 等待运维开通OSS权限
+
+## 项目B
+
+### 目标
+上线新版本
+
+### 当前状态
+等待评审
+"""
+
+# README和test_merge.py中的写法，另加不属于任何字段的标签
+README_CONTEXT = """# 上下文切换器
+
+## 项目A
+
+**更新时间**: 2024-01-01 12:00:00
+**最终目标**: 完成语音识别功能
+**当前状态**: 开发中
+**Todo列表**:
+- [x] 基础录音功能
+- [ ] 语音识别集成
+- [ ] 上下文合并
+
+**当前Block点**: 等待API密钥配置
+**解决Block后**: 继续开发语音识别模块
+**负责人**: 小王
+**参考资料**:
+- 接口文档第3节
+"""
+
+# 同名段落，以及字段内容写成列表的项目
+DUPLICATE_CONTEXT = """# 上下文切换器
+
+## 项目D
+
+**当前状态**:
+- 子弹1: 细节
+- 子弹2
+
+**todo列表**:
+- [ ] 整理数据
+
+## 项目D
+第二个同名段落
+"""
+
+PATCH = {"updates": [
+    {"project": "项目A", "fields": {"当前状态": "联调中"}, "todo_add": ["发布测试版"],
+     "todo_done": ["接入DashScope"], "block_resolved": ["OSS权限"]},
+    {"project": "项目C", "fields": {"目标": "整理文档"}, "todo_add": ["写README"]},
+]}
+
+def build_context(count: int) -> str:
+    parts = ["# 上下文切换器\n\n"]
+    for i in range(count):
+        parts.append(f"## 项目{i}\n\n**更新时间**: 2024-01-01 09:00:00\n**最终目标**: 目标{i}\n**当前状态**: 开发中\n\n"
+                     f"**todo列表**:\n- [ ] 任务{i}-1\n- [ ] 任务{i}-2\n\n")
+    return ''.join(parts)
+
+def test_json_patch():
+    """测试JSON补丁"""
+    print("🩹 JSON补丁合并测试")
+    print("=" * 50)
+    
+    for bad in ['不是JSON', '{"updates": {}}', '{"updates": [{"project": ""}]}',
+                '{"updates": [{"project": "A", "fields": {"负责人": "我"}}]}',
+                '{"updates": [{"project": "A", "todo_add": "一项"}]}',
+                '{"updates": [{"project": "A", "extra": 1}]}']:
+        try:
+            parse_patch(bad)
+            print(f"❌ 无效补丁没有被拒绝: {bad}")
+            return False
+        except ValueError as e:
+            print(f"✅ 拒绝无效补丁: {e}")
+    
+    document = ContextDocument(CONTEXT)
+    merged = document.apply_patch(parse_patch(json.dumps(PATCH, ensure_ascii=False)), "2024-01-05 10:00:00")
+    result = ContextDocument(merged)
+    project_a = result.projects["项目A"]
+    checks = [
+        (result.names() == ["项目A", "项目B", "项目C"], f"项目顺序: {result.names()}"),
+        (project_a.fields == {'更新时间': "2024-01-05 10:00:00", '目标': "完成语音记录工具", '状态': "联调中"},
+         f"项目A字段: {project_a.fields}"),
+        (project_a.open_todos == ["补充单元测试", "发布测试版"], f"项目A未完成todo: {project_a.open_todos}"),
+        (project_a.blocks == [], f"项目A block点已解决: {project_a.blocks}"),
+        (result.section("项目B").strip() == document.section("项目B").strip(), "未涉及的项目B保持原文"),
+        (result.projects["项目C"].open_todos == ["写README"], "新项目C已创建"),
+        (document.content == CONTEXT and document.projects["项目A"].fields['状态'] == "开发中", "原文档没有被修改"),
+        (ContextDocument(merged).apply_patch([], "x") == merged, "空补丁不改变内容"),
+    ]
+    for ok, message in checks:
+        print(f"{'✅' if ok else '❌'} {message}")
+        if not ok:
+            print(merged)
+            return False
+    
+    # README格式的项目经过补丁重新渲染后，block点等标签不能变成todo，无法识别的标签原样保留
+    patch = [{"project": "项目A", "fields": {}, "todo_add": [], "todo_done": ["语音识别集成"],
+              "block_add": [], "block_resolved": []}]
+    merged = ContextDocument(README_CONTEXT).apply_patch(patch, "2024-01-05 10:00:00")
+    project_a = ContextDocument(merged).projects["项目A"]
+    twice = ContextDocument(merged).apply_patch(patch, "2024-01-05 10:00:00")
+    checks = [
+        (project_a.open_todos == ["上下文合并"], f"README格式的未完成todo: {project_a.open_todos}"),
+        (project_a.blocks == ["等待API密钥配置"], f"当前Block点: {project_a.blocks}"),
+        (project_a.fields.get('后续') == "继续开发语音识别模块", f"解决Block后: {project_a.fields.get('后续')!r}"),
+        ("**负责人**: 小王\n**参考资料**:\n- 接口文档第3节" in merged, "无法识别的标签及其内容原样保留"),
+        (twice == merged, "再次应用同一补丁内容不变"),
+    ]
+    for ok, message in checks:
+        print(f"{'✅' if ok else '❌'} {message}")
+        if not ok:
+            print(merged)
+            return False
+    
+    # 同名段落只更新第一个，没有变化的字段保持原来的写法
+    patch = [{"project": "项目D", "fields": {}, "todo_add": ["画图"], "todo_done": [],
+              "block_add": [], "block_resolved": []}]
+    merged = ContextDocument(DUPLICATE_CONTEXT).apply_patch(patch, "2024-01-05 10:00:00")
+    sections = ContextDocument(merged).sections()
+    checks = [
+        ([name for name, _ in sections] == ["项目D", "项目D"], f"同名段落都保留: {[name for name, _ in sections]}"),
+        ("- [ ] 画图" in sections[0][1] and sections[1][1] == "## 项目D\n第二个同名段落\n", "只更新第一个同名段落"),
+        ("**当前状态**:\n- 子弹1: 细节\n- 子弹2\n" in merged, "没有变化的字段保持列表写法"),
+    ]
+    for ok, message in checks:
+        print(f"{'✅' if ok else '❌'} {message}")
+        if not ok:
+            print(merged)
+            return False
+    
+    print("\n📏 模型输出长度（字符）")
+    print(f"{'项目数':>8}{'完整markdown':>16}{'JSON补丁':>12}")
+    patch = json.dumps({"updates": [{"project": "项目3", "fields": {"状态": "联调中"}, "todo_done": ["任务3-1"]}]},
+                       ensure_ascii=False)
+    for count in (5, 50, 200):
+        context = build_context(count)
+        merged = ContextDocument(context).apply_patch(parse_patch(patch), "2024-01-05 10:00:00")
+        print(f"{count:>8}{len(merged):>16}{len(patch):>12}")
+    return True
+
+if __name__ == "__main__":
+    success = test_json_patch()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+本地识别音频预处理测试脚本
+用合成的44.1kHz双声道WAV测试wav_to_float的重采样到16kHz和多声道混合为单声道，
+以及16kHz单声道音频原样转换（不需要faster-whisper）
+"""
+
+import sys
+import numpy as np
+from audio_encoder import pcm_to_wav
+from local_asr import WHISPER_SAMPLE_RATE, wav_to_float
+
+SOURCE_RATE = 44100
+TONE = 440.0
+AMPLITUDE = 0.5
+
+def stereo_wav(left: np.ndarray, right: np.ndarray) -> bytes:
+    """把两个[-1, 1]的浮点声道编码为44.1kHz双声道WAV"""
+    samples = np.stack([left, right], axis=1) * 32767
+    return pcm_to_wav(np.round(samples).astype(np.int16), SOURCE_RATE, 2)
+
+def rms(audio: np.ndarray) -> float:
+    """去掉首尾各0.1秒（滤波器边缘效应）后的均方根"""
+    edge = WHISPER_SAMPLE_RATE // 10
+    return float(np.sqrt(np.mean(audio[edge:-edge] ** 2)))
+
+def test_local_asr():
+    """测试重采样与声道混合"""
+    print("🎧 本地识别音频预处理测试")
+    print("=" * 50)
+    
+    t = np.arange(SOURCE_RATE) / SOURCE_RATE  # 1秒
+    tone = AMPLITUDE * np.sin(2 * np.pi * TONE * t)
+    silence = np.zeros_like(tone)
+    
+    same = wav_to_float(stereo_wav(tone, tone))
+    left_only = wav_to_float(stereo_wav(tone, silence))
+    opposite = wav_to_float(stereo_wav(tone, -tone))
+    peak = np.argmax(np.abs(np.fft.rfft(same))) * WHISPER_SAMPLE_RATE / len(same)
+    expected_rms = AMPLITUDE / np.sqrt(2)
+    checks = [
+        (same.dtype == np.float32 and same.ndim == 1, f"输出为一维float32数组: {same.dtype}, {same.ndim}维"),
+        (len(same) == WHISPER_SAMPLE_RATE, f"1秒44.1kHz音频重采样为 {len(same)} 个采样（应为 {WHISPER_SAMPLE_RATE}）"),
+        (abs(peak - TONE) <= 1, f"重采样后主频为 {peak:.0f}Hz（应为 {TONE:.0f}Hz）"),
+        (float(np.max(np.abs(same))) <= 1.0, f"采样值在[-1, 1]内: 最大 {np.max(np.abs(same)):.3f}"),
+        (abs(rms(same) - expected_rms) < 0.01, f"两声道相同时混合后幅度不变: RMS {rms(same):.3f}（应为 {expected_rms:.3f}）"),
+        (abs(rms(left_only) - expected_rms / 2) < 0.01, f"只有左声道时混合为两声道的平均: RMS {rms(left_only):.3f}（应为 {expected_rms / 2:.3f}）"),
+        (rms(opposite) < 0.001, f"两声道反相时混合后相互抵消: RMS {rms(opposite):.4f}"),
+    ]
+    for ok, message in checks:
+        print(f"{'✅' if ok else '❌'} {message}")
+        if not ok:
+            return False
+    
+    # 16kHz单声道不需要重采样，只换算到[-1, 1)
+    pcm = np.array([0, 16384, -16384, 32767, -32768], dtype=np.int16).reshape(-1, 1)
+    passthrough = wav_to_float(pcm_to_wav(pcm, WHISPER_SAMPLE_RATE, 1))
+    if list(passthrough) != [0.0, 0.5, -0.5, 32767 / 32768, -1.0]:
+        print(f"❌ 16kHz单声道音频转换不正确: {list(passthrough)}")
+        return False
+    print("✅ 16kHz单声道音频不重采样，只换算到[-1, 1)")
+    return True
+
+if __name__ == "__main__":
+    success = test_local_asr()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+流式合并测试脚本
+启动一个本地的假OpenAI兼容服务，测试流式合并的进度回调、不可用输出的提前中止以及中止后的回退（不需要API密钥）
+"""
+
+import sys
+import time
+import config
+from benchmark_merge_stream import BAD_RESPONSE, GOOD_RESPONSE, FakeOpenAI
+from fake_server import start_fake_server
+from metrics import isolate_metrics
+from providers import ProviderError
+
+EXISTING_CONTEXT = """# 上下文切换器
+
+## 项目A
+
+**更新时间**: 2024-01-03 09:00:00
+**当前状态**: 开发中
+"""
+
+def test_merge_stream():
+    """测试流式合并与提前中止"""
+    print("🌊 流式合并测试")
+    print("=" * 50)
+    isolate_metrics()
+    
+    fake = FakeOpenAI(first_token_ms=50, token_ms=10, tokens=200)
+    port = start_fake_server([('POST', '/v1/chat/completions', fake.completions)])
+    config.CONTEXT_MERGE_PROVIDER = "openai"
+    config.MERGE_PROVIDERS = []
+    config.CONTEXT_MERGE_MODE = "full"
+    config.MERGE_STREAMING = True
+    config.OPENAI_API_KEY = config.OPENAI_API_KEY or "fake"
+    config.OPENAI_BASE_URL = f"http://127.0.0.1:{port}/v1"
+    from speech_recognition import MergeAborted, SpeechRecognizer, _markdown_check
+    recognizer = SpeechRecognizer()
+    provider = recognizer.merge_group.providers[0]
+    
+    progress = []
+    result = recognizer._call_merge_provider("合并", progress.append, _markdown_check(len(GOOD_RESPONSE) * 2))
+    checks = [
+        (result == GOOD_RESPONSE, "流式输出拼接后与完整内容一致"),
+        (len(progress) > 10 and progress == sorted(progress) and progress[-1] == len(GOOD_RESPONSE),
+         f"进度回调 {len(progress)} 次，字数递增到 {progress[-1] if progress else 0}"),
+    ]
+    for ok, message in checks:
+        print(f"{'✅' if ok else '❌'} {message}")
+        if not ok:
+            return False
+    
+    # 不可用的输出：收到约300字还没有项目标题时中止，不等服务端输出完
+    fake.response = BAD_RESPONSE
+    progress = []
+    full_ms = fake.first_token_ms + fake.token_ms * len(fake.chunks())
+    started = time.perf_counter()
+    try:
+        recognizer._call_merge_provider("合并", progress.append, _markdown_check(len(GOOD_RESPONSE) * 2))
+        print("❌ 不可用的输出没有被提前中止")
+        return False
+    except ProviderError as e:
+        elapsed = (time.perf_counter() - started) * 1000
+        if not all(isinstance(error, MergeAborted) for error in e.errors):
+            print(f"❌ 失败原因不是提前中止: {e.errors}")
+            return False
+        print(f"✅ 提前中止: {e}，{elapsed:.0f}ms（完整输出约 {full_ms:.0f}ms）")
+    deadline = time.time() + 2
+    while not fake.aborted and time.time() < deadline:
+        time.sleep(0.01)
+    checks = [
+        (elapsed < full_ms / 2, f"中止时只收到 {progress[-1] if progress else 0}/{len(BAD_RESPONSE)} 字"),
+        (fake.aborted == 1, "中止后连接已关闭，服务端停止输出"),
+        (not provider.breaker.is_open, "提前中止不计入熔断"),
+    ]
+    for ok, message in checks:
+        print(f"{'✅' if ok else '❌'} {message}")
+        if not ok:
+            return False
+    
+    # 全量合并被中止时回退为简单拼接，原有上下文不丢失
+    merged = recognizer.merge_context(EXISTING_CONTEXT, "项目A联调完成", on_progress=lambda chars: None)
+    if not merged.startswith(EXISTING_CONTEXT) or not merged.endswith("## 新内容\n项目A联调完成"):
+        print(f"❌ 中止后没有回退为简单拼接: {merged[:100]!r}")
+        return False
+    print("✅ 中止后回退为简单拼接，原有上下文保留")
+    return True
+
+if __name__ == "__main__":
+    success = test_merge_stream()
+    sys.exit(0 if success else 1)
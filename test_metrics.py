@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+耗时统计测试脚本
+用于测试百分位数计算、按阶段汇总、耗时记录的写入与读取（包括已滚动的旧文件），不需要API密钥
+"""
+
+import sys
+import tempfile
+from pathlib import Path
+from metrics import Metrics, load_records, percentile, summarize
+
+def test_metrics():
+    """测试耗时统计"""
+    print("⏱️ 耗时统计测试")
+    print("=" * 50)
+    
+    # 最近秩法：不插值，结果总是样本中的某个值
+    values = [50, 10, 40, 20, 30]
+    cases = [
+        (percentile(values, 0), 10),
+        (percentile(values, 20), 10),
+        (percentile(values, 50), 30),
+        (percentile(values, 90), 50),
+        (percentile(values, 100), 50),
+        (percentile([7.5], 95), 7.5),
+        (percentile(list(range(1, 101)), 95), 95),
+    ]
+    for got, expected in cases:
+        if got != expected:
+            print(f"❌ 百分位数计算错误: 得到 {got}，应为 {expected}")
+            return False
+    if values != [50, 10, 40, 20, 30]:
+        print("❌ percentile修改了传入的列表")
+        return False
+    print("✅ 百分位数（最近秩法，单个样本、边界值）")
+    
+    records = [{'stage': 'upload', 'ms': ms} for ms in (100, 300, 200)]
+    records += [{'stage': 'asr', 'ms': ms} for ms in range(1, 21)]
+    records.insert(1, {'stage': 'encode', 'ms': 5})
+    summary = summarize(records)
+    expected = {
+        'upload': {'count': 3, 'p50': 200, 'p95': 300, 'max': 300},
+        'encode': {'count': 1, 'p50': 5, 'p95': 5, 'max': 5},
+        'asr': {'count': 20, 'p50': 10, 'p95': 19, 'max': 20},
+    }
+    if summary != expected or list(summary) != list(expected):
+        print(f"❌ 按阶段汇总错误: {summary}")
+        return False
+    print("✅ 按阶段汇总次数、p50、p95、最大值，阶段按首次出现的顺序排列")
+    
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = Path(temp_dir) / "metrics.jsonl"
+        recorder = Metrics(path, max_bytes=2000, backup_count=3)
+        recorder.enabled = True
+        trace_id = recorder.start_trace()
+        for i in range(60):
+            recorder.record('provider_call', i, group='asr', provider='dashscope')
+        with recorder.span('merge', chars=10) as span:
+            span['ok'] = True
+        try:
+            with recorder.span('write_context'):
+                raise ValueError("磁盘已满")
+        except ValueError:
+            pass
+        loaded = load_records(path, backup_count=3)
+        rotated = sorted(p.name for p in Path(temp_dir).glob("metrics.jsonl.*"))
+        if not rotated or [r['stage'] for r in loaded[-2:]] != ['merge', 'write_context']:
+            print(f"❌ 读取滚动后的耗时记录不正确: 旧文件 {rotated}")
+            return False
+        if loaded[-1].get('error') != "磁盘已满" or not loaded[-2].get('ok') or loaded[-1]['trace'] != trace_id:
+            print(f"❌ span没有记录属性或错误: {loaded[-2:]}")
+            return False
+        calls = [r['ms'] for r in loaded if r['stage'] == 'provider_call']
+        if calls != sorted(calls) or calls[-1] != 59:
+            print("❌ 读取旧文件的顺序不对")
+            return False
+        print(f"✅ 写入后可读回（含 {len(rotated)} 个已滚动的旧文件，按时间顺序），span记录属性、异常和trace")
+    return True
+
+if __name__ == "__main__":
+    success = test_metrics()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+OSS临时音频清理测试脚本
+用模拟的OSS上传器测试待删除列表的持久化、重启后继续删除、批量合并删除和启动时的遗留音频清理（不需要OSS配置）
+"""
+
+import json
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from metrics import isolate_metrics
+from oss_cleanup import OSSCleanupQueue
+
+class FakeUploader:
+    """模拟OSSUploader：objects为 {key: 上传时刻}，fail_keys中的key删除失败"""
+    
+    def __init__(self, objects: dict = None, configured: bool = True):
+        self.objects = dict(objects or {})
+        self.configured = configured
+        self.fail_keys = set()
+        self.batches = []
+        self.deleted = threading.Event()
+    
+    def is_configured(self) -> bool:
+        return self.configured
+    
+    def delete_audio_batch(self, object_keys):
+        self.batches.append(list(object_keys))
+        deleted = [key for key in object_keys if key not in self.fail_keys]
+        for key in deleted:
+            self.objects.pop(key, None)
+        self.deleted.set()
+        return deleted
+    
+    def list_audio(self, older_than: float, prefix: str = "audio/"):
+        return [key for key, uploaded in self.objects.items() if key.startswith(prefix) and uploaded < older_than]
+
+def test_oss_cleanup():
+    """测试OSS临时音频清理"""
+    print("🧹 OSS临时音频清理测试")
+    print("=" * 50)
+    isolate_metrics()
+    
+    with tempfile.TemporaryDirectory() as temp_dir:
+        state_file = Path(temp_dir) / "oss_pending_deletes.json"
+        
+        # OSS不可用时（例如断网）登记的key写入磁盘，不启动删除线程
+        offline = OSSCleanupQueue(FakeUploader(configured=False), state_file, batch_delay=0.1)
+        for i in range(3):
+            offline.enqueue(f"audio/crashed-{i}.wav")
+        saved = json.loads(state_file.read_text(encoding='utf-8'))
+        if saved != [f"audio/crashed-{i}.wav" for i in range(3)] or offline._thread:
+            print(f"❌ 待删除的key没有持久化: {saved}")
+            return False
+        print(f"✅ 待删除的key立即写入磁盘: {len(saved)} 个")
+        
+        # 重启：读取上次没删掉的key，并清理超过TTL的遗留音频，新上传的音频不动
+        now = time.time()
+        uploader = FakeUploader({
+            **{f"audio/crashed-{i}.wav": now - 60 for i in range(3)},
+            "audio/orphan-old.wav": now - 48 * 3600,
+            "audio/in-flight.wav": now - 60,
+            "other/keep.txt": now - 48 * 3600,
+        })
+        restarted = OSSCleanupQueue(uploader, state_file, batch_delay=0.1, orphan_ttl_hours=24)
+        if restarted.pending() != saved:
+            print(f"❌ 重启后没有读取到待删除的key: {restarted.pending()}")
+            return False
+        restarted.start(sweep=True)
+        deadline = time.time() + 3
+        while restarted.pending() and time.time() < deadline:
+            time.sleep(0.02)
+        if sorted(uploader.objects) != ["audio/in-flight.wav", "other/keep.txt"]:
+            print(f"❌ 重启后清理结果不正确，剩余: {sorted(uploader.objects)}")
+            return False
+        if len(uploader.batches) != 1 or json.loads(state_file.read_text(encoding='utf-8')) != []:
+            print(f"❌ 没有合并为一次批量删除或状态文件未清空: {uploader.batches}")
+            return False
+        print("✅ 重启后继续删除上次遗留的key，并清理超过TTL的音频（一次批量请求）")
+        
+        # 删除线程空闲时，短时间内的多次登记合并为一次删除请求
+        time.sleep(0.2)
+        uploader.batches.clear()
+        uploader.deleted.clear()
+        for i in range(5):
+            uploader.objects[f"audio/new-{i}.wav"] = time.time()
+            restarted.enqueue(f"audio/new-{i}.wav")
+        uploader.deleted.wait(3)
+        time.sleep(0.05)
+        if len(uploader.batches) != 1 or len(uploader.batches[0]) != 5 or restarted.pending():
+            print(f"❌ 多次登记没有合并删除: {uploader.batches}")
+            return False
+        print("✅ 短时间内登记的5个key合并为一次删除请求")
+        
+        # 单次请求的key数有上限；删除失败的key留在列表中等待重试
+        manual = OSSCleanupQueue(FakeUploader(configured=False), Path(temp_dir) / "manual.json")
+        manual.MAX_BATCH = 3
+        manual.uploader.fail_keys = {"audio/k-4.wav"}
+        for i in range(7):
+            manual.enqueue(f"audio/k-{i}.wav")
+        counts = [manual.flush(), manual.flush(), manual.flush()]
+        sizes = [len(batch) for batch in manual.uploader.batches]
+        remaining = json.loads((Path(temp_dir) / "manual.json").read_text(encoding='utf-8'))
+        if sizes[:2] != [3, 3] or manual.pending() != ["audio/k-4.wav"] or remaining != ["audio/k-4.wav"]:
+            print(f"❌ 分批或失败重试不正确: 批次 {sizes}, 删除 {counts}, 剩余 {manual.pending()}")
+            return False
+        print(f"✅ 每批最多 {manual.MAX_BATCH} 个key（批次 {sizes}），删除失败的key保留在磁盘上等待重试")
+    return True
+
+if __name__ == "__main__":
+    success = test_oss_cleanup()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+后端切换测试脚本
+用模拟的后端测试失败切换、超时、熔断和对冲请求，并比较对冲前后的尾延迟（不需要API密钥）
+"""
+
+import random
+import sys
+import time
+from metrics import isolate_metrics, percentile
+from providers import CircuitBreaker, Provider, ProviderError, ProviderGroup
+
+def fake_backend(latency, result="ok", error=None):
+    """按给定耗时（秒，或返回耗时的函数）返回结果或抛出异常的模拟后端"""
+    def call(*args):
+        time.sleep(latency() if callable(latency) else latency)
+        if error:
+            raise Exception(error)
+        return result
+    return call
+
+def test_providers():
+    """测试失败切换、超时、熔断与对冲"""
+    print("🔀 后端切换测试")
+    print("=" * 50)
+    isolate_metrics()
+    
+    group = ProviderGroup('test', [
+        Provider('a', fake_backend(0.01, error="连接失败"), timeout=1),
+        Provider('b', fake_backend(0.01, result="来自b"), timeout=1),
+    ])
+    if group.run() != ('b', "来自b"):
+        print("❌ 第一个后端失败时没有切换")
+        return False
+    print("✅ 第一个后端失败时切换到第二个")
+    
+    group = ProviderGroup('test', [
+        Provider('slow', fake_backend(1), timeout=0.1),
+        Provider('b', fake_backend(0.01, result="来自b"), timeout=1),
+    ])
+    started = time.perf_counter()
+    if group.run() != ('b', "来自b") or time.perf_counter() - started > 0.5:
+        print("❌ 超时后没有及时切换")
+        return False
+    print("✅ 超时后切换到第二个后端")
+    
+    group = ProviderGroup('test', [
+        Provider('empty', fake_backend(0.01, result=""), timeout=1),
+        Provider('b', fake_backend(0.01, result="来自b"), timeout=1),
+    ])
+    if group.run()[0] != 'b':
+        print("❌ 无效结果没有触发切换")
+        return False
+    print("✅ 返回空结果时切换到第二个后端")
+    
+    broken = Provider('broken', fake_backend(0, error="服务不可用"), timeout=1, breaker=CircuitBreaker(2, reset_seconds=0.2))
+    group = ProviderGroup('test', [broken])
+    for _ in range(2):
+        try:
+            group.run()
+        except ProviderError:
+            pass
+    try:
+        group.run()
+        print("❌ 连续失败后没有熔断")
+        return False
+    except ProviderError as e:
+        if "熔断" not in str(e):
+            print(f"❌ 连续失败后没有熔断: {e}")
+            return False
+    time.sleep(0.25)
+    broken.call = fake_backend(0, result="恢复")
+    if group.run() != ('broken', "恢复"):
+        print("❌ 熔断到期后没有放行试探请求")
+        return False
+    print("✅ 连续失败后熔断，到期后试探恢复")
+    
+    # 主后端通常50ms，10%的请求需要600ms；备用后端稳定在80ms
+    rng = random.Random(0)
+    primary = fake_backend(lambda: 0.6 if rng.random() < 0.1 else 0.05)
+    backup = fake_backend(0.08, result="备用")
+    print("\n⏱️ 尾延迟对比（主后端10%请求很慢）")
+    print(f"{'方式':<10}{'p50(ms)':>10}{'p90(ms)':>10}{'p99(ms)':>10}{'备用占比':>10}")
+    for name, hedge in (("不对冲", False), ("对冲", True)):
+        group = ProviderGroup('tail', [Provider('primary', primary, 5), Provider('backup', backup, 5)], hedge=hedge, hedge_delay=0.1)
+        timings, backup_count = [], 0
+        for _ in range(100):
+            started = time.perf_counter()
+            answered, _ = group.run()
+            timings.append((time.perf_counter() - started) * 1000)
+            backup_count += answered == 'backup'
+        print(f"{name:<10}{percentile(timings, 50):>10.0f}{percentile(timings, 90):>10.0f}"
+              f"{percentile(timings, 99):>10.0f}{backup_count:>9}%")
+        if hedge and percentile(timings, 99) > 400:
+            print("❌ 对冲后尾延迟没有下降")
+            return False
+    return True
+
+if __name__ == "__main__":
+    success = test_providers()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+段落拆分测试脚本
+用于测试段落级增量合并的拆分与拼接逻辑（不需要API密钥）
+"""
+
+import sys
+from context_manager import split_sections, join_sections, splice_sections, restore_order
+
+EXISTING_CONTEXT = """# 上下文切换器
+
+## 项目A
+
+**更新时间**: 2024-01-01 12:00:00
+**当前状态**: 开发中
+
+## 项目B
+
+**更新时间**: 2024-01-02 12:00:00
+**当前状态**: 等待评审
+"""
+
+def test_sections():
+    """测试段落拆分、拼接与替换"""
+    print("🧩 段落拆分测试")
+    print("=" * 50)
+    
+    header, sections = split_sections(EXISTING_CONTEXT)
+    names = [name for name, _ in sections]
+    if header != "# 上下文切换器\n\n" or names != ["项目A", "项目B"]:
+        print(f"❌ 拆分结果不正确: {header!r} {names}")
+        return False
+    print(f"✅ 拆分出项目: {names}")
+    
+    if join_sections(header, sections) != EXISTING_CONTEXT:
+        print("❌ 拆分后重新拼接与原文不一致")
+        return False
+    print("✅ 拆分后重新拼接与原文一致")
+    
+    updated = """## 项目A
+
+**更新时间**: 2024-01-03 09:00:00
+**当前状态**: 已完成
+
+## 项目C
+
+**更新时间**: 2024-01-03 09:00:00
+**当前状态**: 刚开始"""
+    merged = splice_sections(EXISTING_CONTEXT, updated)
+    _, merged_sections = split_sections(merged)
+    merged_names = [name for name, _ in merged_sections]
+    
+    if merged_names != ["项目A", "项目B", "项目C"]:
+        print(f"❌ 拼接后的项目顺序不正确: {merged_names}")
+        return False
+    if "已完成" not in merged_sections[0][1] or "开发中" in merged:
+        print("❌ 项目A未被替换")
+        return False
+    if merged_sections[1][1].strip() != sections[1][1].strip():
+        print("❌ 未涉及的项目B被修改")
+        return False
+    
+    print("✅ 受影响段落已替换，新项目已追加，其他段落保持不变")
+    
+    # 模型按更新时间顺序返回时恢复文件中原来的顺序
+    reordered = join_sections(header, [merged_sections[2], merged_sections[1], merged_sections[0]])
+    restored = [name for name, _ in split_sections(restore_order(EXISTING_CONTEXT, reordered))[1]]
+    if restored != ["项目A", "项目B", "项目C"]:
+        print(f"❌ 没有恢复原来的项目顺序: {restored}")
+        return False
+    print("✅ 恢复原来的项目顺序，新项目在末尾")
+    print("\n📝 拼接结果:")
+    print(merged)
+    return True
+
+if __name__ == "__main__":
+    success = test_sections()
+    sys.exit(0 if success else 1)
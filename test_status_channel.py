@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+状态栏通知通道测试脚本
+用可控的时钟测试进度更新合并、阶段计时、通知频率限制与合并，以及UI线程较慢时工作线程不被阻塞（不需要rumps）
+"""
+
+import sys
+import threading
+import time
+from status_channel import StatusChannel
+
+class FakeClock:
+    """可手动推进的时钟"""
+    
+    def __init__(self):
+        self.now = 100.0
+    
+    def __call__(self):
+        return self.now
+    
+    def advance(self, seconds: float):
+        self.now += seconds
+
+def test_notifier():
+    """测试状态栏通知通道"""
+    print("🔔 状态栏通知通道测试")
+    print("=" * 50)
+    
+    clock = FakeClock()
+    channel = StatusChannel(min_interval=3.0, clock=clock)
+    
+    # 一次刷新间隔内的多次进度更新只显示最新的
+    channel.set_recording(True)
+    channel.set_queue_depth(2)
+    for chars in range(0, 500, 7):
+        channel.set_progress(f"✍️{chars}字")
+    title, status = channel.render()
+    if title != "🔴 2 ✍️497字" or status is not None:
+        print(f"❌ 标题不正确: {title!r}, {status!r}")
+        return False
+    print(f"✅ 多次进度更新合并为一次标题刷新: {title}")
+    
+    # 各任务的阶段和已用时间显示在同一个状态项中，阶段改变时重新计时
+    channel.set_recording(False)
+    channel.set_stage(0, "#0 识别")
+    clock.advance(1.5)
+    channel.set_stage(1, "#1 识别")
+    channel.set_stage(0, "#0 识别")  # 阶段未变，不重新计时
+    clock.advance(0.5)
+    _, status = channel.render()
+    if status != "#0 识别 2.0s · #1 识别 0.5s":
+        print(f"❌ 状态项不正确: {status!r}")
+        return False
+    channel.set_stage(0, "#0 合并")
+    clock.advance(1.2)
+    channel.set_stage(1, None)
+    title, status = channel.render()
+    if status != "#0 合并 1.2s" or not title.startswith("🎤"):
+        print(f"❌ 阶段切换后状态项不正确: {title!r}, {status!r}")
+        return False
+    channel.set_stage(0, None)
+    if channel.render()[1] is not None:
+        print("❌ 任务结束后状态项未清除")
+        return False
+    print("✅ 状态项显示各录音的阶段和已用时间，阶段改变时重新计时，结束后清除")
+    
+    # 通知频率限制：间隔内的通知合并为最新的一条
+    channel.notify("处理完成", "上下文已更新", "第一条")
+    if channel.take_notification() != ("处理完成", "上下文已更新", "第一条"):
+        print("❌ 第一条通知没有立即弹出")
+        return False
+    for i in range(2, 6):
+        channel.notify("处理完成", "上下文已更新", f"第{i}条")
+        clock.advance(0.5)
+        if channel.take_notification() is not None:
+            print(f"❌ 间隔不足 {channel.min_interval}s 时弹出了通知")
+            return False
+    clock.advance(1.0)
+    notification = channel.take_notification()
+    if notification != ("处理完成", "上下文已更新（另有 3 条通知）", "第5条"):
+        print(f"❌ 积累的通知没有合并为最新的一条: {notification}")
+        return False
+    channel.notify("识别失败", "语音识别失败", "")
+    channel.notify("识别失败", "语音识别失败", "")
+    clock.advance(3.0)
+    if channel.take_notification() != ("识别失败", "语音识别失败", "") or channel.take_notification():
+        print("❌ 重复的通知没有合并")
+        return False
+    print(f"✅ 每 {channel.min_interval:g}s 最多一条通知，同一标题的通知合并为最新一条（共合并 {channel.coalesced} 条）")
+    
+    # 失败通知之后紧接着另一段录音处理完成：失败不能被合并到完成通知里
+    channel.notify("识别失败", "语音识别失败", "请检查网络和API配置")
+    channel.notify("处理完成", "上下文已更新", "第6条")
+    channel.notify("处理完成", "上下文已更新", "第7条")
+    clock.advance(3.0)
+    first = channel.take_notification()
+    clock.advance(1.0)
+    early = channel.take_notification()
+    clock.advance(2.0)
+    second = channel.take_notification()
+    if first != ("识别失败", "语音识别失败", "请检查网络和API配置") or early is not None \
+            or second != ("处理完成", "上下文已更新（另有 1 条通知）", "第7条"):
+        print(f"❌ 失败通知被之后的通知盖住: {first}, {early}, {second}")
+        return False
+    print("✅ 失败通知单独弹出，之后的完成通知按频率限制再弹出")
+    
+    # UI线程每次刷新都很慢（模拟系统通知调用）时，工作线程的更新不被阻塞
+    channel = StatusChannel(min_interval=0)
+    stop = threading.Event()
+    flushes = [0]
+    
+    def ui_loop():
+        while not stop.is_set():
+            channel.render()
+            if channel.take_notification():
+                time.sleep(0.05)  # 在锁外执行的较慢UI调用
+            flushes[0] += 1
+    
+    ui = threading.Thread(target=ui_loop, daemon=True)
+    ui.start()
+    slowest = 0.0
+    for i in range(2000):
+        started = time.perf_counter()
+        channel.set_progress(f"✍️{i}字")
+        channel.set_stage(i % 3, f"#{i % 3} 识别")
+        channel.notify("处理完成", "上下文已更新", str(i))
+        slowest = max(slowest, time.perf_counter() - started)
+    stop.set()
+    ui.join(1)
+    if slowest > 0.02:
+        print(f"❌ 工作线程被UI刷新阻塞了 {slowest * 1000:.1f}ms")
+        return False
+    print(f"✅ UI线程较慢时工作线程不被阻塞（最慢一次更新 {slowest * 1000:.3f}ms，UI刷新 {flushes[0]} 次）")
+    return True
+
+if __name__ == "__main__":
+    success = test_notifier()
+    sys.exit(0 if success else 1)
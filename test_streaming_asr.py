@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+实时识别测试脚本
+启动一个本地的假DashScope实时识别WebSocket服务，测试边录边识别以及松开按键后的收尾耗时（不需要API密钥）
+"""
+
+import json
+import sys
+import time
+import dashscope
+from aiohttp import web, WSMsgType
+import config
+from fake_server import start_fake_server
+from streaming_asr import StreamingSession
+
+SAMPLE_RATE = 16000
+FRAME_BYTES = 3200  # 100ms的16-bit单声道PCM
+SENTENCES = ["今天完成了录音模块。", "下一步是接入实时识别。"]
+
+async def fake_recognition(request):
+    """模拟DashScope实时识别协议：run-task → task-started → result-generated... → task-finished"""
+    ws = web.WebSocketResponse()
+    await ws.prepare(request)
+    task_id = None
+    received = 0
+
+    async def send_event(event, payload=None):
+        message = {"header": {"event": event, "task_id": task_id}}
+        if payload is not None:
+            message["payload"] = payload
+        await ws.send_str(json.dumps(message, ensure_ascii=False))
+
+    async def send_sentence(index, text, sentence_end):
+        await send_event("result-generated", {"output": {"sentence": {
+            "begin_time": index * 1000,
+            "end_time": (index + 1) * 1000 if sentence_end else None,
+            "text": text,
+            "sentence_end": sentence_end
+        }}})
+
+    async for msg in ws:
+        if msg.type == WSMsgType.TEXT:
+            data = json.loads(msg.data)
+            action = data["header"]["action"]
+            task_id = data["header"]["task_id"]
+            if action == "run-task":
+                await send_event("task-started")
+            elif action == "finish-task":
+                await send_sentence(len(SENTENCES) - 1, SENTENCES[-1], True)
+                await send_event("task-finished", {"output": {}})
+                break
+        elif msg.type == WSMsgType.BINARY:
+            received += len(msg.data)
+            # 每收到1秒音频推送一次结果：先中间结果，再确定上一句
+            seconds = received // (SAMPLE_RATE * 2)
+            if received % (SAMPLE_RATE * 2) < len(msg.data) and seconds <= len(SENTENCES):
+                index = seconds - 1
+                await send_sentence(index, SENTENCES[index][:2], False)
+                await send_sentence(index, SENTENCES[index], index < len(SENTENCES) - 1)
+
+    await ws.close()
+    return ws
+
+def test_streaming_asr():
+    """测试实时识别会话"""
+    print("⚡ 实时识别测试")
+    print("=" * 50)
+
+    port = start_fake_server([('GET', '/api-ws/v1/inference', fake_recognition)])
+    dashscope.api_key = "test-key"
+    dashscope.base_websocket_api_url = f"ws://127.0.0.1:{port}/api-ws/v1/inference"
+    print(f"✅ 假识别服务已启动: {dashscope.base_websocket_api_url}")
+
+    session = StreamingSession(config.DASHSCOPE_REALTIME_ASR_MODEL, SAMPLE_RATE)
+    session.start()
+
+    # 模拟按住快捷键2秒，按录音回调的节奏发送音频帧
+    silence = bytes(FRAME_BYTES)
+    for _ in range(20):
+        session.feed(silence)
+        time.sleep(0.01)
+
+    released = time.time()
+    text = session.finish(timeout=5)
+    latency = time.time() - released
+
+    expected = ''.join(SENTENCES)
+    if text != expected:
+        print(f"❌ 识别结果不正确: {text!r}，期望: {expected!r}")
+        return False
+
+    print(f"✅ 识别结果: {text}")
+    print(f"✅ 松开按键到拿到结果: {latency * 1000:.0f}ms")
+    return True
+
+if __name__ == "__main__":
+    success = test_streaming_asr()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+识别结果缓存测试脚本
+用于测试缓存key只取决于音频内容、命中与刷新最近使用时间、覆盖写入时的容量统计和按最近使用淘汰（不需要API密钥）
+"""
+
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+import numpy as np
+from audio_encoder import pcm_to_wav
+from transcription_cache import TranscriptionCache
+
+def test_transcription_cache():
+    """测试识别结果缓存"""
+    print("🗃️ 识别结果缓存测试")
+    print("=" * 50)
+    
+    samples = (np.sin(np.arange(16000) / 10) * 8000).astype(np.int16)
+    audio = pcm_to_wav(samples, 16000, 1)
+    key = TranscriptionCache.key(audio, 'dashscope', 'paraformer-v2', ['zh', 'en'])
+    if key != TranscriptionCache.key(bytes(audio), 'dashscope', 'paraformer-v2', ['zh', 'en']) \
+            or key == TranscriptionCache.key(audio, 'openai', 'whisper-1', ['zh', 'en']) \
+            or key == TranscriptionCache.key(pcm_to_wav(samples[::-1].copy(), 16000, 1), 'dashscope', 'paraformer-v2', ['zh', 'en']):
+        print("❌ 缓存key没有只取决于音频内容和识别参数")
+        return False
+    print("✅ 缓存key由PCM内容、识别引擎、模型和语言决定")
+    
+    with tempfile.TemporaryDirectory() as temp_dir:
+        cache = TranscriptionCache(Path(temp_dir), max_bytes=10 ** 6)
+        if cache.get(key) is not None:
+            print("❌ 空缓存命中了")
+            return False
+        cache.put(key, "第一次识别", engine='dashscope')
+        if cache.get(key) != "第一次识别":
+            print("❌ 写入后没有命中")
+            return False
+        print("✅ 写入后命中")
+        
+        # 反复覆盖同一条目，统计的总大小应等于实际占用
+        for i in range(50):
+            cache.put(key, f"第{i}次识别" + "文" * 100)
+        actual = sum(size for _, size, _ in cache._files())
+        if cache._total_bytes != actual:
+            print(f"❌ 覆盖写入后总大小统计错误: 统计 {cache._total_bytes}，实际 {actual}")
+            return False
+        print(f"✅ 覆盖写入50次后总大小统计与实际一致（{actual} 字节）")
+        
+        # 容量只够约3条时，淘汰最久未使用的条目；读取会刷新最近使用时间
+        cache = TranscriptionCache(Path(temp_dir) / "lru", max_bytes=10 ** 6)
+        cache.put("probe", "文" * 200)
+        entry_bytes = cache._total_bytes
+        cache.clear()
+        cache.max_bytes = entry_bytes * 3 + entry_bytes // 2
+        keys = [f"{i:02d}" + "0" * 62 for i in range(5)]
+        base = time.time() - 100
+        for i, item in enumerate(keys[:3]):
+            cache.put(item, "文" * 200)
+            os.utime(cache._path(item), (base + i, base + i))
+        cache.get(keys[0])  # keys[0]变为最近使用
+        cache.put(keys[3], "文" * 200)
+        cache.put(keys[4], "文" * 200)
+        kept = [item for item in keys if cache.get(item) is not None]
+        if kept != [keys[0], keys[3], keys[4]]:
+            print(f"❌ 淘汰的不是最久未使用的条目，保留: {[item[:2] for item in kept]}")
+            return False
+        if cache._total_bytes > cache.max_bytes:
+            print("❌ 淘汰后仍超过容量上限")
+            return False
+        print("✅ 超过容量时按最近使用时间淘汰，读取过的条目被保留")
+    return True
+
+if __name__ == "__main__":
+    success = test_transcription_cache()
+    sys.exit(0 if success else 1)
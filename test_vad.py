@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+静音检测测试脚本
+用合成的音频测试首尾静音裁剪、长停顿压缩和纯静音丢弃（不需要API密钥和麦克风）
+"""
+
+import sys
+import numpy as np
+from vad import trim_silence
+
+SAMPLE_RATE = 16000
+rng = np.random.default_rng(0)
+
+def silence(seconds: float) -> np.ndarray:
+    """底噪"""
+    return rng.normal(0, 30, int(SAMPLE_RATE * seconds)).astype(np.int16)
+
+def speech(seconds: float) -> np.ndarray:
+    """带包络起伏的有声信号，模拟说话"""
+    t = np.arange(int(SAMPLE_RATE * seconds)) / SAMPLE_RATE
+    signal = 3000 * np.sin(2 * np.pi * 220 * t) * (0.6 + 0.4 * np.sin(2 * np.pi * 3 * t))
+    return (signal + rng.normal(0, 300, len(t))).astype(np.int16)
+
+def test_vad():
+    """测试静音检测"""
+    print("🔇 静音检测测试")
+    print("=" * 50)
+    
+    recording = np.concatenate([silence(1), speech(1), silence(3), speech(1), silence(1)]).reshape(-1, 1)
+    total = len(recording) / SAMPLE_RATE
+    
+    trimmed = trim_silence(recording, SAMPLE_RATE)
+    trimmed_seconds = len(trimmed) / SAMPLE_RATE
+    if not 5.0 <= trimmed_seconds <= 5.6:
+        print(f"❌ 首尾静音裁剪结果不正确: {total:.1f}s -> {trimmed_seconds:.2f}s")
+        return False
+    print(f"✅ 裁剪首尾静音: {total:.1f}s -> {trimmed_seconds:.2f}s")
+    
+    compressed = trim_silence(recording, SAMPLE_RATE, max_pause_ms=600)
+    compressed_seconds = len(compressed) / SAMPLE_RATE
+    if not 2.5 <= compressed_seconds <= 3.5:
+        print(f"❌ 长停顿压缩结果不正确: {total:.1f}s -> {compressed_seconds:.2f}s")
+        return False
+    print(f"✅ 压缩长停顿: {total:.1f}s -> {compressed_seconds:.2f}s")
+    
+    continuous = speech(4).reshape(-1, 1)
+    kept = trim_silence(continuous, SAMPLE_RATE)
+    if kept is None or len(kept) < len(continuous) * 0.95:
+        print("❌ 连续说话的录音被错误裁剪")
+        return False
+    print("✅ 连续说话的录音保持完整")
+    
+    for name, audio in [("底噪", silence(5)), ("数字静音", np.zeros(SAMPLE_RATE * 3, dtype=np.int16))]:
+        if trim_silence(audio.reshape(-1, 1), SAMPLE_RATE) is not None:
+            print(f"❌ {name}录音未被丢弃")
+            return False
+    print("✅ 纯静音录音被丢弃")
+    return True
+
+if __name__ == "__main__":
+    success = test_vad()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+识别结果缓存
+按音频PCM内容的哈希（加上识别引擎、模型和语言）缓存识别结果，重复识别同一段音频时不再上传和调用API。
+
+    python transcription_cache.py list      # 按最近使用时间列出缓存
+    python transcription_cache.py stats     # 缓存数量和占用空间
+    python transcription_cache.py show KEY  # 查看一条缓存
+    python transcription_cache.py clear     # 清空缓存
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional
+import config
+from audio_encoder import wav_to_pcm
+
+class TranscriptionCache:
+    def __init__(self, directory: Path, max_bytes: int, enabled: bool = True):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        # 缓存总大小，第一次写入时扫描目录得到，之后增量累加，避免每次写入都扫描
+        self._total_bytes: Optional[int] = None
+    
+    @staticmethod
+    def key(audio_data: bytes, engine: str, model: str, language_hints: List[str]) -> str:
+        """根据PCM数据和识别参数计算缓存key，WAV头不同但音频相同时key相同"""
+        digest = hashlib.sha256()
+        try:
+            samples, sample_rate, channels = wav_to_pcm(audio_data)
+            digest.update(f"pcm|{sample_rate}|{channels}|".encode())
+            digest.update(memoryview(samples).cast('B'))
+        except Exception:
+            # 非WAV数据直接对原始字节求哈希
+            digest.update(b"raw|")
+            digest.update(audio_data)
+        digest.update(f"|{engine}|{model}|{','.join(language_hints)}".encode())
+        return digest.hexdigest()
+    
+    def get(self, key: str) -> Optional[str]:
+        """读取缓存的识别结果，命中时刷新最近使用时间"""
+        if not self.enabled:
+            return None
+        
+        path = self._path(key)
+        try:
+            entry = json.loads(path.read_text(encoding='utf-8'))
+            os.utime(path)
+            return entry['text']
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"读取识别缓存失败: {e}")
+            return None
+    
+    def put(self, key: str, text: str, **meta):
+        """写入识别结果，超过容量时淘汰最久未使用的条目"""
+        if not self.enabled or not text:
+            return
+        
+        entry = {'text': text, 'created': datetime.now().isoformat(timespec='seconds')}
+        entry.update(meta)
+        path = self._path(key)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            temp_file = path.with_suffix('.tmp')
+            temp_file.write_text(json.dumps(entry, ensure_ascii=False), encoding='utf-8')
+            size = temp_file.stat().st_size
+            
+            with self._lock:
+                # 覆盖已有条目时先减去旧条目的大小
+                try:
+                    old_size = path.stat().st_size
+                except FileNotFoundError:
+                    old_size = 0
+                temp_file.replace(path)
+                if self._total_bytes is None:
+                    self._total_bytes = sum(size for _, size, _ in self._files())
+                else:
+                    self._total_bytes += size - old_size
+                over_limit = self._total_bytes > self.max_bytes
+            if over_limit:
+                self.evict()
+        except Exception as e:
+            print(f"写入识别缓存失败: {e}")
+    
+    def evict(self) -> int:
+        """按最近使用时间淘汰条目，直到总大小不超过上限，返回淘汰数量"""
+        with self._lock:
+            files = self._files()
+            total = sum(size for _, size, _ in files)
+            removed = 0
+            for path, size, _ in sorted(files, key=lambda item: item[2]):
+                if total <= self.max_bytes:
+                    break
+                path.unlink(missing_ok=True)
+                total -= size
+                removed += 1
+            self._total_bytes = total
+            return removed
+    
+    def entries(self) -> List[dict]:
+        """所有缓存条目，最近使用的在前"""
+        result = []
+        for path, size, last_used in sorted(self._files(), key=lambda item: item[2], reverse=True):
+            try:
+                entry = json.loads(path.read_text(encoding='utf-8'))
+            except Exception:
+                continue
+            entry.update(key=path.stem, size=size, last_used=last_used)
+            result.append(entry)
+        return result
+    
+    def clear(self) -> int:
+        """清空缓存，返回删除的条目数"""
+        with self._lock:
+            files = self._files()
+            for path, _, _ in files:
+                path.unlink(missing_ok=True)
+            self._total_bytes = 0
+            return len(files)
+    
+    def _path(self, key: str) -> Path:
+        return self.directory / key[:2] / f"{key}.json"
+    
+    def _files(self):
+        """[(路径, 大小, 最近使用时间), ...]"""
+        files = []
+        for path in self.directory.glob('*/*.json'):
+            try:
+                stat = path.stat()
+                files.append((path, stat.st_size, stat.st_mtime))
+            except FileNotFoundError:
+                continue
+        return files
+
+def main():
+    parser = argparse.ArgumentParser(description="识别结果缓存")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    subparsers.add_parser('list', help="按最近使用时间列出缓存")
+    subparsers.add_parser('stats', help="缓存数量和占用空间")
+    show_parser = subparsers.add_parser('show', help="查看一条缓存")
+    show_parser.add_argument('key', help="缓存key（可以只写前缀）")
+    subparsers.add_parser('clear', help="清空缓存")
+    args = parser.parse_args()
+    
+    cache = TranscriptionCache(config.TRANSCRIPTION_CACHE_DIR, config.TRANSCRIPTION_CACHE_MAX_BYTES)
+    
+    if args.command == 'list':
+        for entry in cache.entries():
+            last_used = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(entry['last_used']))
+            print(f"{entry['key'][:12]}  {last_used}  {entry.get('engine', '-')}/{entry.get('model', '-')}  {entry['text'][:40]}")
+    elif args.command == 'stats':
+        entries = cache.entries()
+        total = sum(entry['size'] for entry in entries)
+        print(f"缓存目录: {cache.directory}")
+        print(f"条目数: {len(entries)}")
+        print(f"占用空间: {total / 1024:.1f} KB / {cache.max_bytes / 1024 / 1024:.0f} MB")
+    elif args.command == 'show':
+        matches = [entry for entry in cache.entries() if entry['key'].startswith(args.key)]
+        if not matches:
+            print(f"未找到缓存: {args.key}")
+            return 1
+        for entry in matches:
+            print(json.dumps(entry, ensure_ascii=False, indent=2))
+    elif args.command == 'clear':
+        print(f"已删除 {cache.clear()} 条缓存")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
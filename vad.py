@@ -0,0 +1,117 @@
+import numpy as np
+from typing import List, Optional, Tuple
+
+def frame_features(samples: np.ndarray, frame_len: int) -> Tuple[np.ndarray, np.ndarray]:
+    """按帧计算能量(dBFS)和过零率，多声道先混为单声道"""
+    mono = samples.mean(axis=1) if samples.ndim > 1 else samples
+    count = len(mono) // frame_len
+    frames = mono[:count * frame_len].reshape(count, frame_len).astype(np.float32) / 32768.0
+    
+    rms = np.sqrt(np.mean(frames * frames, axis=1))
+    energy_db = 20 * np.log10(np.maximum(rms, 1e-6))
+    signs = np.signbit(frames)
+    zcr = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / (frame_len - 1)
+    return energy_db, zcr
+
+def detect_speech(samples: np.ndarray, sample_rate: int, frame_ms: int = 20, min_energy_db: float = -50.0,
+                  max_energy_db: float = -30.0, margin_db: float = 12.0, zcr_threshold: float = 0.25,
+                  hangover_ms: int = 200) -> np.ndarray:
+    """返回每帧是否为语音：能量高于自适应底噪阈值，或能量稍低但过零率高（清辅音）"""
+    frame_len = int(sample_rate * frame_ms / 1000)
+    energy_db, zcr = frame_features(samples, frame_len)
+    if not len(energy_db):
+        return np.zeros(0, dtype=bool)
+    
+    # 底噪取能量最低的10%帧；阈值限制在[min_energy_db, max_energy_db]之间，整段都在说话时也不会被判为静音
+    threshold = np.clip(np.percentile(energy_db, 10) + margin_db, min_energy_db, max_energy_db)
+    speech = (energy_db > threshold) | ((energy_db > threshold - margin_db / 2) & (zcr > zcr_threshold))
+    return dilate(speech, int(hangover_ms / frame_ms))
+
+def dilate(speech: np.ndarray, frames: int) -> np.ndarray:
+    """语音帧前后各扩展frames帧，避免切掉字头字尾和短暂停顿"""
+    if not frames or not speech.any():
+        return speech
+    kernel = np.ones(2 * frames + 1, dtype=np.int32)
+    return np.convolve(speech.astype(np.int32), kernel, mode='same') > 0
+
+def speech_segments(speech: np.ndarray) -> List[Tuple[int, int]]:
+    """把逐帧标记转换为[(起始帧, 结束帧), ...]"""
+    edges = np.diff(np.concatenate(([0], speech.astype(np.int8), [0])))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+    return list(zip(starts.tolist(), ends.tolist()))
+
+def trim_silence(samples: np.ndarray, sample_rate: int, max_pause_ms: Optional[int] = None,
+                 min_speech_ms: int = 300, hangover_ms: int = 200, frame_ms: int = 20) -> Optional[np.ndarray]:
+    """去掉首尾静音，可选地把超过max_pause_ms的停顿压缩到max_pause_ms，纯静音时返回None"""
+    speech = detect_speech(samples, sample_rate, frame_ms=frame_ms, hangover_ms=0)
+    # 按扩展前的语音帧数判断是否有足够的语音
+    if speech.sum() * frame_ms < min_speech_ms:
+        return None
+    
+    segments = speech_segments(dilate(speech, int(hangover_ms / frame_ms)))
+    frame_len = int(sample_rate * frame_ms / 1000)
+    
+    if not max_pause_ms:
+        start, end = segments[0][0], segments[-1][1]
+        return samples[start * frame_len:end * frame_len]
+    
+    max_pause = int(max_pause_ms / frame_ms)
+    pieces = []
+    for i, (start, end) in enumerate(segments):
+        if i > 0:
+            gap_start = segments[i - 1][1]
+            # 长停顿只保留前后各一半
+            keep = min(start - gap_start, max_pause)
+            pieces.append(samples[gap_start * frame_len:(gap_start + keep // 2) * frame_len])
+            pieces.append(samples[(start - (keep - keep // 2)) * frame_len:start * frame_len])
+        pieces.append(samples[start * frame_len:end * frame_len])
+    return np.concatenate(pieces, axis=0)
+
+def split_at_pauses(samples: np.ndarray, sample_rate: int, chunk_seconds: float = 60, max_seconds: float = 90,
+                    overlap_ms: int = 1000, min_pause_ms: int = 300, frame_ms: int = 20) -> List[Tuple[int, int]]:
+    """
+    把长录音切成不超过max_seconds的片段，返回[(起始采样, 结束采样), ...]。
+    优先在chunk_seconds附近的停顿处切开，相邻片段共享停顿中间最多overlap_ms的静音；
+    附近没有停顿时在chunk_seconds处硬切，前后片段重叠overlap_ms，重复识别的内容在拼接文本时去掉。
+    overlap_ms最多取chunk_seconds的一半
+    """
+    total = len(samples)
+    if total <= max_seconds * sample_rate:
+        return [(0, total)]
+    
+    frame_len = int(sample_rate * frame_ms / 1000)
+    speech = detect_speech(samples, sample_rate, frame_ms=frame_ms, hangover_ms=100)
+    pauses = speech_segments(~speech)
+    frames = len(speech)
+    target = int(chunk_seconds * 1000 / frame_ms)
+    limit = int(max_seconds * 1000 / frame_ms)
+    min_pause = int(min_pause_ms / frame_ms)
+    # 重叠不超过目标长度的一半，否则下一段的起点不会前进
+    half_overlap = min(int(overlap_ms / frame_ms) // 2, target // 4)
+    
+    ranges = []
+    start = 0
+    while frames - start > limit:
+        # 切分点（停顿中点）的可选范围：片段不短于chunk_seconds的一半，加上重叠后不超过max_seconds
+        low, high = start + target // 2, start + limit - half_overlap
+        candidates = [(pause_start, pause_end) for pause_start, pause_end in pauses
+                      if low <= (pause_start + pause_end) // 2 <= high]
+        long_pauses = [pause for pause in candidates if pause[1] - pause[0] >= min_pause]
+        if long_pauses:
+            pause = min(long_pauses, key=lambda p: abs((p[0] + p[1]) // 2 - (start + target)))
+        elif candidates:
+            pause = max(candidates, key=lambda p: p[1] - p[0])
+        else:
+            pause = None
+        
+        if pause:
+            middle = (pause[0] + pause[1]) // 2
+            end, next_start = min(pause[1], middle + half_overlap), max(pause[0], middle - half_overlap)
+        else:
+            middle = start + target
+            end, next_start = middle + half_overlap, middle - half_overlap
+        ranges.append((start * frame_len, end * frame_len))
+        start = max(next_start, start + 1)
+    ranges.append((start * frame_len, total))
+    return ranges